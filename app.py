@@ -1,19 +1,128 @@
+import utilities.config  # noqa: F401  (loads .env once, before anything reads settings)
+import json
+import os
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from workflow.rag_workflow import rag_agent_orchestrator
+from utilities.metrics import get_logger, render_prometheus
 
-app = FastAPI(title="RAG Agent API")
+# Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# "background": start serving at once and warm up in a thread (default)
+# "eager": warm up before accepting requests; "off": build on first request
+WARM_UP = os.getenv("WARM_UP", "background")
+
+logger = get_logger("app")
+
+
+# ============================================================
+# Pipeline (imported on first use)
+# ============================================================
+def _pipeline():
+    """
+    The workflow module. Importing it loads langgraph, langchain and the
+    SDK clients, so it is deferred until warm-up or the first request.
+    """
+    import workflow.rag_workflow as rag_workflow
+    return rag_workflow
+
+
+async def arag_agent_orchestrator(query: str):
+    return await _pipeline().arag_agent_orchestrator(query)
+
+
+def astream_rag_agent_orchestrator(query: str):
+    return _pipeline().astream_rag_agent_orchestrator(query)
+
+
+def abatch_rag_agent_orchestrator(queries, max_concurrency: int = None, ordered: bool = True):
+    return _pipeline().abatch_rag_agent_orchestrator(queries, max_concurrency=max_concurrency, ordered=ordered)
+
+
+def _warm_up(freeze=False):
+    try:
+        _pipeline().warm_up(freeze=freeze)
+    except Exception as e:
+        logger.warning("event=warm_up_failed error=%r", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the graph, clients and prompts before (or while) the first requests arrive
+    if WARM_UP == "eager":
+        # Nothing is served yet, so the heap can be collected and frozen too
+        _warm_up(freeze=True)
+    elif WARM_UP == "background":
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="RAG Agent API", lifespan=lifespan)
 
 class QueryRequest(BaseModel):
     query: str
 
+
+class BatchRequest(BaseModel):
+    queries: List[str]
+    ordered: bool = True                     # False: stream results as they complete
+    max_concurrency: Optional[int] = None
+
 @app.post("/rag/query")
 async def rag_query(request: QueryRequest):
     """
     API that calls the RAG pipeline with a user query.
     """
     try:
-        response = rag_agent_orchestrator(request.query)
+        response = await arag_agent_orchestrator(request.query)
         return {"query": request.query, "result": response}
     except Exception as e:
         return {"error": str(e)}
+
+
+@app.post("/rag/query/stream")
+async def rag_query_stream(request: QueryRequest):
+    """
+    Streaming variant of /rag/query (NDJSON, one event per line):
+    route -> retrieval -> token* -> done, or a single error event.
+    """
+    async def events():
+        try:
+            async for event in astream_rag_agent_orchestrator(request.query):
+                yield json.dumps(event) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@app.post("/rag/batch")
+async def rag_batch(request: BatchRequest):
+    """
+    Answer many queries in one call (NDJSON, one line per query):
+    {"index", "query", "result"} or {"index", "query", "error"}.
+    """
+    async def results():
+        try:
+            async for item in abatch_rag_agent_orchestrator(
+                request.queries, max_concurrency=request.max_concurrency, ordered=request.ordered
+            ):
+                yield json.dumps(item) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "error": str(e)}) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.get("/metrics")
+def metrics():
+    """
+    Prometheus scrape endpoint: node and upstream latency histograms,
+    LLM token counts, cache hit rates and coalescing counters.
+    """
+    _pipeline()     # registers the cache and coalescing collectors
+    return PlainTextResponse(render_prometheus(), media_type=METRICS_CONTENT_TYPE)
@@ -0,0 +1,453 @@
+"""
+Offline load test of the RAG pipeline against local stub services.
+
+Starts the stubs from ``benchmark.stub_services``, points the real
+clients (Kong token, Azure OpenAI chat/embeddings, Azure AI Search,
+OpenWeatherMap) at them, then drives ``/rag/query`` (in-process ASGI)
+or ``rag_agent_orchestrator`` (threads) at a fixed concurrency.
+
+Reports p50/p95/p99 latency, throughput, error count and a per-stage
+breakdown taken from the pipeline's own metrics, and compares the run
+with the stored baseline:
+
+    python -m benchmark.run_benchmark --target api --concurrency 8 --requests 200
+    python -m benchmark.run_benchmark --profile degraded --runs 5 --save-baseline
+    python -m benchmark.run_benchmark --check      # exit 1 on regression
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Dict, List
+from unittest import mock
+
+from benchmark.stub_services import Fault, StubServices
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Allowed relative change before a run counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+# Injected upstream behaviour per profile
+PROFILES = {
+    "default": {
+        "token": Fault(latency=0.02),
+        "chat": Fault(latency=0.15, jitter=0.05),
+        "embeddings": Fault(latency=0.04, jitter=0.01),
+        "search": Fault(latency=0.06, jitter=0.02),
+        "weather": Fault(latency=0.08, jitter=0.02),
+    },
+    "degraded": {
+        "token": Fault(latency=0.05),
+        "chat": Fault(latency=0.4, jitter=0.2, error_rate=0.02),
+        "embeddings": Fault(latency=0.1, jitter=0.05, error_rate=0.02),
+        "search": Fault(latency=0.15, jitter=0.1, error_rate=0.05),
+        "weather": Fault(latency=0.3, jitter=0.2, error_rate=0.05),
+    },
+    "zero": {},
+}
+
+# Weather lookups settled by the rules, PDF questions, and ambiguous ones routed by the LLM
+QUERIES = [
+    "What's the weather in Mumbai?",
+    "temperature in Indore",
+    "Is it humid in Chennai today?",
+    "What was the total revenue in the financial statements?",
+    "Summarize the operating expenses section of the PDF",
+    "How did net income change compared to last year?",
+    "List the main items on the balance sheet",
+    "What does the cash flow statement say about investing activities?",
+    "Tell me about it",
+    "Give me the highlights",
+]
+
+STAGE_METRICS = ("node", "upstream")
+
+
+def warmup_queries(queries: List[str], count: int) -> List[str]:
+    """
+    The first query of each route (rules weather, rules PDF, LLM-routed),
+    then more queries in order up to ``count``. A prefix of ``queries``
+    could warm only the weather path and leave the PDF path's first-use
+    costs inside the measured run.
+    """
+    from workflow.query_router import fast_route, ROUTER_CONFIDENCE_THRESHOLD
+
+    def route(query):
+        decision = fast_route(query)
+        return decision["data_type"] if decision["confidence"] >= ROUTER_CONFIDENCE_THRESHOLD else "llm"
+
+    firsts = {}
+    for query in queries:
+        firsts.setdefault(route(query), query)
+    chosen = list(firsts.values())
+    chosen += [q for q in queries if q not in chosen][:max(count - len(chosen), 0)]
+    return chosen
+
+
+# ============================================================
+# Environment
+# ============================================================
+class PassThroughFlight:
+    """Stands in for a SingleFlight group: every call runs, nothing is shared."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def in_flight(self, key) -> bool:
+        return False
+
+    def do(self, key, fn):
+        return fn()
+
+    def start(self, key, coro_fn):
+        return asyncio.ensure_future(coro_fn())
+
+    async def ado(self, key, coro_fn):
+        return await coro_fn()
+
+
+@contextmanager
+def stubbed_pipeline(url: str, coalesce: bool = False):
+    """
+    Point the pipeline's clients at the stubs for the duration of the block.
+    Answer, embedding and weather caches are bypassed, and unless
+    ``coalesce`` so is single-flight coalescing, so every request reaches
+    the (stubbed) upstreams. Yields a function that rebuilds the shared
+    clients, for switching event loops.
+    """
+    import utilities.create_llm_client as llm_client
+    import utilities.embedding_batcher as embedding_batcher
+    import workflow.orchestration_agent as orchestration_agent
+    import workflow.rag_workflow as rag_workflow
+    import workflow.retrieval_backends as retrieval_backends
+    import workflow.search_handler as search_handler
+    import workflow.summary_handler as summary_handler
+    import workflow.weather_api_handler as weather_api_handler
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+    from utilities.loop_local import loop_local
+
+    index = "testonepdf"
+    search_client = SearchClient(url, index, AzureKeyCredential("stub"))
+
+    @loop_local
+    def async_search_client():
+        return AsyncSearchClient(url, index, AzureKeyCredential("stub"))
+
+    def reset_clients():
+        # The shared chat client keeps its async pool on the first loop that used it
+        llm_client._llm_client = None
+        llm_client._embedding_client = None
+        orchestration_agent.get_orchestration_chain.cache_clear()
+        summary_handler.get_summary_chain.cache_clear()
+
+    with ExitStack() as stack:
+        patch = lambda target, name, value: stack.enter_context(mock.patch.object(target, name, value))
+        patch(llm_client.config, "kong_base_url", url)
+        patch(llm_client.config, "url", f"{url}/token")
+        patch(llm_client.config, "api_version", "2024-06-01")
+        patch(llm_client.config, "api_deployment_name", "gpt-4o")
+        patch(llm_client, "embedding_cache", None)
+        patch(embedding_batcher, "embedding_cache", None)
+        patch(rag_workflow, "answer_cache", None)
+        patch(retrieval_backends, "RETRIEVAL_BACKEND", "azure")
+        patch(retrieval_backends, "get_search_client", lambda: search_client)
+        patch(retrieval_backends, "get_async_search_client", async_search_client)
+        patch(weather_api_handler, "WEATHER_URL", f"{url}/data/2.5/weather")
+        patch(weather_api_handler, "weather_cache", weather_api_handler.WeatherCache(ttl=0, stale_ttl=0))
+        stack.enter_context(mock.patch.dict(os.environ, {"weather_secret": "stub"}))
+        if not coalesce:
+            # Identical concurrent queries would otherwise collapse into one execution
+            for module, name in ((rag_workflow, "pipeline_flight"), (search_handler, "search_flight"),
+                                 (llm_client, "embedding_flight"), (weather_api_handler, "weather_flight")):
+                patch(module, name, PassThroughFlight(name))
+        reset_clients()
+        llm_client.token_provider.invalidate()
+        stack.callback(reset_clients)
+        stack.callback(llm_client.token_provider.invalidate)
+        yield reset_clients
+
+
+# ============================================================
+# Drivers
+# ============================================================
+def _failed(output) -> bool:
+    """A request fails when it raised or came back with a fallback answer."""
+    from workflow.summary_handler import NO_RESULTS, SUMMARY_ERROR
+    summary = (output or {}).get("summary")
+    return not summary or summary in (SUMMARY_ERROR, NO_RESULTS["summary"])
+
+
+def _run_orchestrator(queries: List[str], concurrency: int):
+    """Call rag_agent_orchestrator from ``concurrency`` threads; returns (latencies, errors)."""
+    from workflow.rag_workflow import rag_agent_orchestrator
+
+    def one(query):
+        start = time.perf_counter()
+        try:
+            failed = _failed(rag_agent_orchestrator(query))
+        except Exception:
+            failed = True
+        return time.perf_counter() - start, failed
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, queries))
+    return [r[0] for r in results], sum(r[1] for r in results)
+
+
+async def _close_loop_clients():
+    """Close the loop-bound async clients before asyncio.run tears the loop down."""
+    import utilities.create_llm_client as llm_client
+    import workflow.retrieval_backends as retrieval_backends
+    from workflow.weather_api_handler import get_async_weather_client
+
+    if llm_client._llm_client is not None:
+        await llm_client._llm_client.root_async_client.close()
+    await retrieval_backends.get_async_search_client().close()
+    await llm_client.get_async_embedding_client().close()
+    await get_async_weather_client().aclose()
+
+
+def _run_api(queries: List[str], concurrency: int):
+    """POST /rag/query through the ASGI app with ``concurrency`` workers; returns (latencies, errors)."""
+    import httpx
+    from app import app
+
+    async def drive():
+        latencies, errors = [], 0
+        pending = list(reversed(queries))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            async def worker():
+                nonlocal errors
+                while pending:
+                    query = pending.pop()
+                    start = time.perf_counter()
+                    try:
+                        response = await client.post("/rag/query", json={"query": query})
+                        failed = response.status_code != 200 or _failed(response.json().get("result"))
+                    except Exception:
+                        failed = True
+                    latencies.append(time.perf_counter() - start)
+                    errors += failed
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        await _close_loop_clients()
+        return latencies, errors
+
+    return asyncio.run(drive())
+
+
+DRIVERS = {"orchestrator": _run_orchestrator, "api": _run_api}
+
+
+# ============================================================
+# Measurement
+# ============================================================
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _stage_totals():
+    from utilities.metrics import NODE_LATENCY, UPSTREAM_LATENCY
+    totals = {}
+    for kind, metric in zip(STAGE_METRICS, (NODE_LATENCY, UPSTREAM_LATENCY)):
+        for (label,), value in metric.totals().items():
+            totals[f"{kind}:{label}"] = value
+    return totals
+
+
+def stage_breakdown(before: Dict, after: Dict) -> Dict[str, Dict]:
+    """Calls and mean latency per stage between two _stage_totals snapshots."""
+    stages = {}
+    for stage, (count, total) in sorted(after.items()):
+        prev_count, prev_total = before.get(stage, (0, 0.0))
+        calls = count - prev_count
+        if calls:
+            stages[stage] = {"calls": calls, "mean_ms": round((total - prev_total) / calls * 1000, 2)}
+    return stages
+
+
+def _speculation_totals():
+    from workflow.rag_workflow import SPECULATIVE_SEARCHES
+    return {outcome: SPECULATIVE_SEARCHES.value(outcome=outcome) for outcome in ("used", "cancelled", "discarded")}
+
+
+def run_benchmark(target: str = "orchestrator", requests: int = 100, concurrency: int = 8,
+                  profile: str = "default", seed: int = 0, warmup: int = 3, queries: List[str] = None,
+                  speculative: bool = False, coalesce: bool = False):
+    """Run one scenario and return its report dict."""
+    import workflow.rag_workflow as rag_workflow
+    queries = queries or QUERIES
+    workload = [queries[i % len(queries)] for i in range(requests)]
+
+    with ExitStack() as stack:
+        stubs = stack.enter_context(StubServices(faults=PROFILES[profile], seed=seed))
+        reset_clients = stack.enter_context(stubbed_pipeline(stubs.url, coalesce))
+        stack.enter_context(mock.patch.object(rag_workflow, "_rag_app", rag_workflow.rag_app_builder(speculative)))
+        driver = DRIVERS[target]
+        if warmup:
+            # As the API does at startup with WARM_UP=eager, then one request down each route
+            rag_workflow.warm_up(freeze=True)
+            driver(warmup_queries(queries, warmup), 1)
+            reset_clients()
+
+        before, speculation = _stage_totals(), _speculation_totals()
+        stub_requests = dict(stubs.requests)
+        started = time.perf_counter()
+        latencies, errors = driver(workload, concurrency)
+        elapsed = time.perf_counter() - started
+        stages = stage_breakdown(before, _stage_totals())
+        upstream = {name: stubs.requests[name] - stub_requests[name] for name in stubs.requests}
+        speculation = {k: v - speculation[k] for k, v in _speculation_totals().items()}
+
+    return {
+        "scenario": f"{target}/{profile}/c{concurrency}" + ("/speculative" if speculative else "")
+                    + ("/coalesced" if coalesce else ""),
+        "requests": requests,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 1),
+            "p95": round(percentile(latencies, 95) * 1000, 1),
+            "p99": round(percentile(latencies, 99) * 1000, 1),
+            "max": round(max(latencies, default=0) * 1000, 1),
+        },
+        "stages": stages,
+        "upstream_requests": upstream,
+        "speculative_searches": speculation,
+    }
+
+
+def combine_runs(reports: List[Dict]) -> Dict:
+    """
+    One report for several runs of a scenario: median latency quantiles and
+    throughput, summed requests and errors, stage and upstream details of
+    the last run. Single runs swing too much (p50 by ~30%) to gate on.
+    """
+    if len(reports) == 1:
+        return reports[0]
+    median = lambda values: sorted(values)[len(values) // 2]
+    combined = dict(reports[-1])
+    combined.update(
+        runs=len(reports),
+        requests=sum(r["requests"] for r in reports),
+        errors=sum(r["errors"] for r in reports),
+        throughput_rps=median([r["throughput_rps"] for r in reports]),
+        latency_ms={q: median([r["latency_ms"][q] for r in reports]) for q in reports[0]["latency_ms"]},
+    )
+    return combined
+
+
+# ============================================================
+# Baseline
+# ============================================================
+def load_baseline(path: str = BASELINE_PATH) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(report: Dict, path: str = BASELINE_PATH):
+    baseline = load_baseline(path)
+    baseline[report["scenario"]] = {
+        "throughput_rps": report["throughput_rps"],
+        "latency_ms": report["latency_ms"],
+        "errors": report["errors"],
+        "requests": report["requests"],
+        "runs": report.get("runs", 1),
+    }
+    with open(path, "w") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, tolerance: float = DEFAULT_TOLERANCE) -> List[str]:
+    """Regressions of ``report`` against its scenario's baseline entry, as messages."""
+    reference = baseline.get(report["scenario"])
+    if reference is None:
+        return []
+    regressions = []
+    for q in ("p50", "p95", "p99"):
+        old, new = reference["latency_ms"][q], report["latency_ms"][q]
+        if old and new > old * (1 + tolerance):
+            regressions.append(f"{q} latency {new:.1f} ms vs baseline {old:.1f} ms")
+    old, new = reference["throughput_rps"], report["throughput_rps"]
+    if old and new < old * (1 - tolerance):
+        regressions.append(f"throughput {new:.2f} rps vs baseline {old:.2f} rps")
+    old_rate = reference["errors"] / max(reference["requests"], 1)
+    new_rate = report["errors"] / max(report["requests"], 1)
+    if new_rate > old_rate + tolerance * max(old_rate, 0.01):
+        regressions.append(f"error rate {new_rate:.1%} vs baseline {old_rate:.1%}")
+    return regressions
+
+
+def format_report(report: Dict) -> str:
+    latency = report["latency_ms"]
+    runs = f" (median of {report['runs']} runs)" if report.get("runs", 1) > 1 else ""
+    lines = [
+        f"📊 [benchmark] {report['scenario']}: {report['requests']} requests, {report['errors']} errors{runs}",
+        f"   throughput {report['throughput_rps']} rps | p50 {latency['p50']} ms | "
+        f"p95 {latency['p95']} ms | p99 {latency['p99']} ms | max {latency['max']} ms",
+        "   stage                               calls    mean ms",
+    ]
+    for stage, row in report["stages"].items():
+        lines.append(f"   {stage:<34} {row['calls']:>6} {row['mean_ms']:>10}")
+    lines.append("   upstream requests: " + ", ".join(f"{k}={v}" for k, v in report["upstream_requests"].items()))
+    if any(report["speculative_searches"].values()):
+        lines.append("   speculative searches: "
+                     + ", ".join(f"{k}={v}" for k, v in report["speculative_searches"].items()))
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline RAG pipeline benchmark against local stubs.")
+    parser.add_argument("--target", choices=sorted(DRIVERS), default="orchestrator")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="default")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--warmup", type=int, default=3,
+                        help="unmeasured requests before the run, at least one per route (0 to skip)")
+    parser.add_argument("--speculative", action="store_true", help="search while the LLM router decides")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="keep single-flight coalescing of identical in-flight queries on")
+    parser.add_argument("--runs", type=int, default=1, help="repeat the run and report the medians")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--save-baseline", action="store_true", help="record this run as the scenario's baseline")
+    parser.add_argument("--check", action="store_true", help="exit 1 when the run regresses against the baseline")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = combine_runs([
+        run_benchmark(args.target, args.requests, args.concurrency, args.profile, args.seed + run, args.warmup,
+                      speculative=args.speculative, coalesce=args.coalesce)
+        for run in range(max(args.runs, 1))
+    ])
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+    if args.save_baseline:
+        save_baseline(report, args.baseline)
+        print(f"💾 [benchmark] Baseline saved for {report['scenario']}")
+        return 0
+
+    regressions = compare_to_baseline(report, load_baseline(args.baseline), args.tolerance)
+    for message in regressions:
+        print(f"⚠️ [benchmark] Regression: {message}")
+    return 1 if regressions and args.check else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,308 @@
+"""
+Local stand-ins for the pipeline's upstream services.
+
+One threaded HTTP server answers, on distinct paths:
+
+- token:      POST /token                                   (Kong client-credentials grant)
+- chat:       POST /openai/deployments/<d>/chat/completions (Azure OpenAI, plain or streamed)
+- embeddings: POST /openai/deployments/<d>/embeddings       (float or base64 vectors)
+- search:     POST /indexes('<index>')/docs/search.post.search (Azure AI Search)
+- weather:    GET  /data/2.5/weather                        (OpenWeatherMap)
+
+Each service has its own Fault (latency, jitter, error rate), drawn
+from a seeded RNG so runs are repeatable. Responses are synthetic but
+shaped like the real APIs, so the production clients parse them unchanged.
+"""
+import base64
+import hashlib
+import json
+import random
+import re
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+from urllib.parse import parse_qs, urlparse
+
+SERVICES = ("token", "chat", "embeddings", "search", "weather")
+
+EMBEDDING_DIM = 64
+SEARCH_DOCUMENTS = 40
+
+_ROUTES = [
+    ("token", "POST", re.compile(r"^/token$")),
+    ("chat", "POST", re.compile(r"^/openai/deployments/[^/]+/chat/completions$")),
+    ("embeddings", "POST", re.compile(r"^/openai/deployments/[^/]+/embeddings$")),
+    ("search", "POST", re.compile(r"^/indexes(\('[^']+'\)|/[^/]+)/docs/search(\.post\.search)?$")),
+    ("weather", "GET", re.compile(r"^/data/2\.5/weather$")),
+]
+
+
+class Fault:
+    """Injected behaviour of one service: ``latency`` ± ``jitter`` seconds, ``error_rate`` of ``error_status``."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter))
+
+    def fails(self, rng: random.Random) -> bool:
+        return self.error_rate > 0 and rng.random() < self.error_rate
+
+
+# ============================================================
+# Synthetic payloads
+# ============================================================
+def stub_embedding(text: str, dim: int = EMBEDDING_DIM):
+    """Deterministic unit vector for a text."""
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def _token(body: bytes):
+    return {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600}
+
+
+def _messages_text(body: dict) -> str:
+    parts = []
+    for message in body.get("messages") or []:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(p.get("text", "") for p in content if isinstance(p, dict))
+        parts.append(content or "")
+    return "\n".join(parts)
+
+
+def _chat_content(prompt: str) -> str:
+    if "strict classification assistant" in prompt:
+        query = prompt.rsplit("User Query:", 1)[-1].lower()
+        if any(word in query for word in ("weather", "temperature", "rain", "humid", "forecast")):
+            return json.dumps({"data_type": "weather", "city": None})
+        return json.dumps({"data_type": "pdf", "city": None})
+    return ("Based on the provided documents, revenue grew year over year while operating "
+            "costs stayed flat, which lifted the operating margin. [stub summary]")
+
+
+def _usage(prompt: str, completion: str):
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(completion) // 4)
+    return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens}
+
+
+def _chat(body: dict):
+    prompt = _messages_text(body)
+    content = _chat_content(prompt)
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model") or "stub",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}],
+        "usage": _usage(prompt, content),
+    }
+
+
+def _chat_stream(body: dict):
+    """Server-sent event lines for a streamed completion (word by word, usage last)."""
+    prompt = _messages_text(body)
+    content = _chat_content(prompt)
+    base = {"id": "chatcmpl-stub", "object": "chat.completion.chunk",
+            "created": int(time.time()), "model": body.get("model") or "stub"}
+    words = content.split(" ")
+    for i, word in enumerate(words):
+        delta = {"content": word if i == 0 else " " + word}
+        if i == 0:
+            delta["role"] = "assistant"
+        yield {**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]}
+    yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield {**base, "choices": [], "usage": _usage(prompt, content)}
+
+
+def _embeddings(body: dict):
+    inputs = body.get("input")
+    if isinstance(inputs, str):
+        inputs = [inputs]
+    data = []
+    for i, text in enumerate(inputs or []):
+        vector = stub_embedding(str(text))
+        if body.get("encoding_format") == "base64":
+            vector = base64.b64encode(struct.pack(f"<{len(vector)}f", *vector)).decode("ascii")
+        data.append({"object": "embedding", "index": i, "embedding": vector})
+    tokens = sum(max(1, len(str(t)) // 4) for t in inputs or [])
+    return {"object": "list", "data": data, "model": body.get("model") or "stub",
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+
+def _search(body: dict):
+    top = int(body.get("top") or 20)
+    query = body.get("search") or ""
+    rng = random.Random(query)
+    hits = []
+    for rank in range(min(top, SEARCH_DOCUMENTS)):
+        doc = rng.randrange(SEARCH_DOCUMENTS)
+        hits.append({
+            "@search.score": round(0.05 / (1 + rank * 0.15), 6),
+            "chunk_id": f"stub-{doc}-{rank}",
+            "file_name": f"report-{doc % 4}.pdf",
+            "chunk_text": f"Section {doc}: revenue, margin and cash-flow figures for period {doc % 8}. "
+                          f"Relevant to: {query}",
+            "file_path": f"/stub/report-{doc % 4}.pdf",
+            "page_start": doc % 20 + 1,
+            "page_end": doc % 20 + 1,
+            "chunk_index": rank,
+        })
+    return {"value": hits}
+
+
+def _weather(query: str):
+    return {
+        "weather": [{"description": "scattered clouds"}],
+        "main": {"temp": 27.5, "humidity": 61},
+        "name": query,
+    }
+
+
+# ============================================================
+# Server
+# ============================================================
+class _StubServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 overflows under concurrent clients, and the
+    # kernel's one-second SYN retry then shows up as a ~1.3 s p99/max outlier
+    request_queue_size = 128
+    daemon_threads = True
+
+
+class StubServices:
+    """
+    Run every stub on one local port::
+
+        with StubServices(faults={"chat": Fault(latency=0.3)}) as stubs:
+            stubs.url  # http://127.0.0.1:<port>
+    """
+
+    def __init__(self, faults: Dict[str, Fault] = None, seed: int = 0, host: str = "127.0.0.1",
+                 port: int = 0):
+        unknown = set(faults or {}) - set(SERVICES)
+        if unknown:
+            raise ValueError(f"Unknown stub services: {sorted(unknown)}")
+        self.faults = {name: Fault() for name in SERVICES}
+        self.faults.update(faults or {})
+        self.requests = {name: 0 for name in SERVICES}
+        self.errors = {name: 0 for name in SERVICES}
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _StubServer((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-services", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _draw(self, service: str):
+        """Count the request and return (delay, failed) under the shared seeded RNG."""
+        fault = self.faults[service]
+        with self._lock:
+            self.requests[service] += 1
+            delay, failed = fault.delay(self._rng), fault.fails(self._rng)
+            if failed:
+                self.errors[service] += 1
+        return delay, failed
+
+    def _handler_class(self):
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send_json(self, status: int, payload):
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_events(self, events):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event in events:
+                    self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.close_connection = True
+
+            def _dispatch(self, method: str):
+                parsed = urlparse(self.path)
+                service = next((name for name, m, pattern in _ROUTES
+                                if m == method and pattern.match(parsed.path)), None)
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                if service is None:
+                    self._send_json(404, {"error": f"no stub for {method} {parsed.path}"})
+                    return
+
+                delay, failed = stubs._draw(service)
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    self._send_json(stubs.faults[service].error_status,
+                                    {"error": {"code": "stub_error", "message": f"injected {service} failure"}})
+                    return
+
+                if service == "token":
+                    self._send_json(200, _token(raw))
+                    return
+                if service == "weather":
+                    city = (parse_qs(parsed.query).get("q") or [""])[0]
+                    self._send_json(200, _weather(city))
+                    return
+
+                body = json.loads(raw or b"{}")
+                if service == "chat" and body.get("stream"):
+                    self._send_events(_chat_stream(body))
+                elif service == "chat":
+                    self._send_json(200, _chat(body))
+                elif service == "embeddings":
+                    self._send_json(200, _embeddings(body))
+                else:
+                    self._send_json(200, _search(body))
+
+            def do_GET(self):
+                self._dispatch("GET")
+
+            def do_POST(self):
+                self._dispatch("POST")
+
+        return Handler
@@ -0,0 +1,202 @@
+"""
+Pluggable chunkers.
+
+A chunker takes a stream of (page_number, text) and yields
+(chunk_text, page_start, page_end). Two are available:
+
+- "tokens" (default): sizes chunks in tiktoken tokens and cuts at
+  paragraph, table-row/line or sentence boundaries, in that order of
+  preference, with a token overlap made of whole units.
+- "chars": the original fixed 800/200 character windows.
+"""
+import os
+import re
+from functools import partial
+
+from utilities.tokens import DEFAULT_MODEL, count_tokens, split_by_tokens
+
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 200
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "64"))
+DEFAULT_CHUNKER = os.getenv("CHUNKER", "tokens")
+
+# A cut is only moved back to a stronger boundary if the chunk stays at least this full
+MIN_FILL = 0.5
+
+# Boundary strengths of the separator that ends a unit
+HARD, SENTENCE, LINE, PARAGRAPH = 0, 1, 2, 3
+
+_SEPARATOR = re.compile(r"[ \t]*\n[ \t]*\n\s*|[ \t]*\n|(?<=[.!?;:])[ \t]+")
+
+
+# ============================================================
+# Character windows
+# ============================================================
+def iter_text_chunks(pages, size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
+    """
+    Chunk a stream of (page_number, text) into overlapping windows.
+
+    Yields (chunk, page_start, page_end). Only the current window and the
+    page being read are held in memory, and chunks span page boundaries.
+    """
+    step = size - overlap
+    buffer = ""
+    marks = []          # (offset in buffer where a page starts, page number)
+    uncovered = 0       # chars at the end of buffer not yet in any chunk
+
+    def page_range(end):
+        start_page = marks[0][1]
+        end_page = start_page
+        for offset, page_number in marks:
+            if offset < end:
+                end_page = page_number
+        return start_page, end_page
+
+    for page_number, text in pages:
+        text = text + "\n"
+        if not buffer:
+            # Match the old whole-document strip() at the very start
+            text = text.lstrip()
+            if not text:
+                continue
+        marks.append((len(buffer), page_number))
+        buffer += text
+        uncovered += len(text)
+
+        while len(buffer) > size and uncovered > 0:
+            yield (buffer[:size], *page_range(size))
+            uncovered = len(buffer) - size
+            buffer = buffer[step:]
+            marks = [(offset - step, p) for offset, p in marks]
+            # Keep the page the new window starts on
+            while len(marks) > 1 and marks[1][0] <= 0:
+                marks.pop(0)
+            marks[0] = (0, marks[0][1])
+
+    tail = buffer.rstrip()
+    if tail and uncovered - (len(buffer) - len(tail)) > 0:
+        yield (tail, *page_range(len(tail)))
+
+
+# ============================================================
+# Token-aware, boundary-respecting chunks
+# ============================================================
+def _split_units(text):
+    """Split page text into (piece, strength) units; pieces keep their separators."""
+    units, pos = [], 0
+    for match in _SEPARATOR.finditer(text):
+        separator = match.group(0)
+        strength = PARAGRAPH if separator.count("\n") >= 2 else LINE if "\n" in separator else SENTENCE
+        piece = text[pos:match.end()]
+        if piece.strip():
+            units.append((piece, strength))
+        elif units:
+            # Blank run: attach to the previous unit and keep the stronger boundary
+            last_piece, last_strength = units[-1]
+            units[-1] = (last_piece + piece, max(last_strength, strength))
+        pos = match.end()
+    if text[pos:].strip():
+        units.append((text[pos:] + "\n", PARAGRAPH))
+    return units
+
+
+def _page_units(page_number, text, max_tokens, model):
+    """Units of one page with token counts, computed in one batched tokenizer call."""
+    units = _split_units(text)
+    counts = count_tokens([piece for piece, _ in units], model)
+    for (piece, strength), n_tokens in zip(units, counts):
+        if n_tokens <= max_tokens:
+            yield piece, n_tokens, strength, page_number
+            continue
+        # Oversized sentence/row: fall back to hard token slices
+        parts = split_by_tokens(piece, max_tokens, model)
+        for i, part in enumerate(parts):
+            last = i == len(parts) - 1
+            yield part, count_tokens([part], model)[0], strength if last else HARD, page_number
+
+
+def _choose_cut(window, protected, max_tokens):
+    """Index to cut the window at: the strongest late boundary past MIN_FILL."""
+    best, best_strength, total = len(window), -1, 0
+    for k, (_, n_tokens, strength, _) in enumerate(window, start=1):
+        total += n_tokens
+        if k <= protected or total < max_tokens * MIN_FILL:
+            continue
+        if strength >= best_strength:
+            best, best_strength = k, strength
+    return max(best, protected + 1)
+
+
+def iter_token_chunks(pages, max_tokens=CHUNK_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS, model=None):
+    """
+    Chunk a stream of (page_number, text) into chunks of at most
+    ``max_tokens`` tokens, cut at the strongest nearby boundary.
+
+    Each unit is tokenized once; packing is a single pass over units.
+    Consecutive chunks share up to ``overlap_tokens`` of whole units.
+    """
+    window = []       # (piece, n_tokens, strength, page)
+    total = 0
+    protected = 0     # leading overlap units already emitted in the previous chunk
+
+    def emit(units):
+        text = "".join(piece for piece, _, _, _ in units).strip()
+        return text, units[0][3], units[-1][3]
+
+    for page_number, text in pages:
+        for unit in _page_units(page_number, text, max_tokens, model):
+            n_tokens = unit[1]
+            while window and total + n_tokens > max_tokens:
+                if len(window) <= protected:
+                    # Only overlap left and it doesn't fit with the new unit
+                    window, total, protected = [], 0, 0
+                    break
+
+                cut = _choose_cut(window, protected, max_tokens)
+                head, rest = window[:cut], window[cut:]
+                yield emit(head)
+
+                overlap, overlap_total = [], 0
+                for candidate in reversed(head):
+                    if overlap_total + candidate[1] > overlap_tokens:
+                        break
+                    overlap.insert(0, candidate)
+                    overlap_total += candidate[1]
+
+                rest_total = sum(u[1] for u in rest)
+                if overlap_total + rest_total + n_tokens > max_tokens:
+                    overlap, overlap_total = [], 0
+                window = overlap + rest
+                total = overlap_total + rest_total
+                protected = len(overlap)
+
+            window.append(unit)
+            total += n_tokens
+
+    if len(window) > protected:
+        yield emit(window)
+
+
+# ============================================================
+# Registry
+# ============================================================
+CHUNKERS = {
+    "tokens": iter_token_chunks,
+    "chars": iter_text_chunks,
+}
+
+
+def get_chunker(name=None, **options):
+    """Return a chunker by name, with any size/overlap options bound."""
+    chunker = CHUNKERS[name or DEFAULT_CHUNKER]
+    return partial(chunker, **options) if options else chunker
+
+
+def chunker_config(name=None) -> str:
+    """Name and size settings of a chunker; stored per file so new settings re-chunk it."""
+    name = name or DEFAULT_CHUNKER
+    if name == "chars":
+        return f"chars:{CHUNK_SIZE}:{CHUNK_OVERLAP}"
+    return f"tokens:{CHUNK_TOKENS}:{CHUNK_OVERLAP_TOKENS}:{DEFAULT_MODEL}"
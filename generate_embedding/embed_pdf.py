@@ -1,28 +1,26 @@
 import sys
 import os
-import uuid
-from datetime import datetime
+import asyncio
+import argparse
+import hashlib
+import json
+from contextlib import asynccontextmanager
+from functools import lru_cache
 
 # Make project root visible
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from utilities.create_llm_client import get_embedding  # your embedding function
-
-import fitz  # PyMuPDF for reliable text extraction
-from azure.identity import ClientSecretCredential
-from azure.search.documents.indexes import SearchIndexClient
-from azure.search.documents import SearchClient
-from azure.search.documents.indexes.models import (
-    SearchIndex,
-    SearchField,
-    SearchFieldDataType,
-    SemanticSearch,
-    SemanticConfiguration,
-    SemanticField,
-    SemanticPrioritizedFields,
-    VectorSearch,
-    HnswAlgorithmConfiguration,
-    VectorSearchProfile
+from generate_embedding.index_uploader import UploadProgress, aindex_chunks, adelete_chunks  # pipelined embed + upload
+from generate_embedding.index_manifest import IndexManifest, source_digest
+from generate_embedding.chunkers import chunker_config
+from utilities.index_generation import bump_index_generation  # invalidates cached answers
+from utilities.vector_store import LocalVectorStore, LocalIndexClient
+from workflow.retrieval_backends import RETRIEVAL_BACKEND, write_keyword_index
+
+from generate_embedding.pdf_extraction import (  # PyMuPDF extraction + chunking
+    ExtractionFailed,
+    iter_pdf_chunks,
+    stream_pdf_chunks,
 )
 
 # -------------------------------------------------------
@@ -38,27 +36,41 @@ INDEX_NAME = "testonepdf"
 PDF_PATH = r"generate_embedding\Sample-Financial-Statements-1.pdf"
 
 EMBED_DIM = 1536           # ada-002 dimension
-CHUNK_SIZE = 800
-CHUNK_OVERLAP = 200
 
 # -------------------------------------------------------
 # CLIENTS
 # -------------------------------------------------------
-credential = ClientSecretCredential(
-    tenant_id=TENANT_ID,
-    client_id=CLIENT_ID,
-    client_secret=CLIENT_SECRET
-)
-
-index_client = SearchIndexClient(endpoint=SEARCH_ENDPOINT, credential=credential)
-search_client = SearchClient(endpoint=SEARCH_ENDPOINT, index_name=INDEX_NAME, credential=credential)
+# Built on first use by the azure branches only: the local backend needs
+# neither the credentials nor the (slow to import) azure SDK.
+@lru_cache(maxsize=None)
+def get_index_client():
+    from azure.identity import ClientSecretCredential
+    from azure.search.documents.indexes import SearchIndexClient
+
+    credential = ClientSecretCredential(
+        tenant_id=TENANT_ID,
+        client_id=CLIENT_ID,
+        client_secret=CLIENT_SECRET
+    )
+    return SearchIndexClient(endpoint=SEARCH_ENDPOINT, credential=credential)
 
 
 # ============================================================
 # CREATE/UPDATE AI SEARCH INDEX
 # ============================================================
-def create_search_index():
-    print("\n=== Creating/Updating AI Search Index ===")
+def build_search_index():
+    from azure.search.documents.indexes.models import (
+        SearchIndex,
+        SearchField,
+        SearchFieldDataType,
+        SemanticSearch,
+        SemanticConfiguration,
+        SemanticField,
+        SemanticPrioritizedFields,
+        VectorSearch,
+        HnswAlgorithmConfiguration,
+        VectorSearchProfile
+    )
 
     fields = [
         SearchField(name="chunk_id", type=SearchFieldDataType.String, key=True, filterable=True),
@@ -72,6 +84,8 @@ def create_search_index():
         SearchField(name="total_chunks", type=SearchFieldDataType.Int32, filterable=True),
         SearchField(name="chunk_text", type=SearchFieldDataType.String, searchable=True),
         SearchField(name="chunk_size", type=SearchFieldDataType.Int32, filterable=True),
+        SearchField(name="page_start", type=SearchFieldDataType.Int32, filterable=True, sortable=True),
+        SearchField(name="page_end", type=SearchFieldDataType.Int32, filterable=True, sortable=True),
 
         SearchField(
             name="embedding",
@@ -101,13 +115,47 @@ def create_search_index():
 
     semantic_search = SemanticSearch(configurations=[semantic_config])
 
-    index = SearchIndex(
+    return SearchIndex(
         name=INDEX_NAME,
         fields=fields,
         vector_search=vector_search,
         semantic_search=semantic_search
     )
 
+
+def schema_hash(index):
+    return hashlib.sha256(json.dumps(index.as_dict(), sort_keys=True, default=str).encode()).hexdigest()
+
+
+def index_exists():
+    from azure.core.exceptions import ResourceNotFoundError
+
+    try:
+        get_index_client().get_index(INDEX_NAME)
+        return True
+    except ResourceNotFoundError:
+        return False
+
+
+def create_search_index(manifest=None, force=False):
+    """
+    Create the index, recreating it only when forced or when the schema
+    differs from the one recorded in the manifest. Returns True if the
+    index was (re)created.
+    """
+    if RETRIEVAL_BACKEND == "local":
+        return create_local_store(manifest, force)
+
+    print("\n=== Creating/Updating AI Search Index ===")
+    index_client = get_index_client()
+
+    index = build_search_index()
+    fingerprint = schema_hash(index)
+
+    if not force and manifest and manifest.get_schema_hash() == fingerprint and index_exists():
+        print(f"✔ Index '{INDEX_NAME}' schema unchanged, keeping existing documents.")
+        return False
+
     try:
         index_client.delete_index(INDEX_NAME)
         print("Old index deleted.")
@@ -117,91 +165,214 @@ def create_search_index():
     index_client.create_index(index)
     print(f"✔ Index '{INDEX_NAME}' created successfully.")
 
+    if manifest:
+        manifest.reset()
+        manifest.set_schema_hash(fingerprint)
+    bump_index_generation()
+    return True
 
-# ============================================================
-# PDF → TEXT → CHUNKS
-# ============================================================
-def extract_pdf_text(pdf_path):
-    """
-    Use PyMuPDF for robust text extraction.
-    """
-    doc = fitz.open(pdf_path)
-    extracted = ""
 
-    for page in doc:
-        extracted += page.get_text("text") + "\n"
+def create_local_store(manifest=None, force=False):
+    """Local-backend counterpart of create_search_index: wipe the store when forced or when switching backends."""
+    store = LocalVectorStore()
+    fingerprint = f"local:{store.dtype}"
 
-    return extracted.strip()
+    if not force and manifest and manifest.get_schema_hash() == fingerprint:
+        print(f"✔ Local vector store at {store.path} unchanged, keeping existing vectors.")
+        return False
 
+    store.clear()
+    store.save(on_write=write_keyword_index)
+    print(f"✔ Local vector store created at {store.path}.")
 
-def chunk_text(text):
-    chunks = []
-    start = 0
-    length = len(text)
+    if manifest:
+        manifest.reset()
+        manifest.set_schema_hash(fingerprint)
+    bump_index_generation()
+    return True
 
-    while start < length:
-        end = min(start + CHUNK_SIZE, length)
-        chunks.append(text[start:end])
-        start += CHUNK_SIZE - CHUNK_OVERLAP
 
-    return chunks
-
-
-def extract_pdf_chunks(pdf_path):
-    text = extract_pdf_text(pdf_path)
+# ============================================================
+# GENERATE EMBEDDINGS + UPLOAD
+# ============================================================
+@asynccontextmanager
+async def async_search_client():
+    """Document client of the configured backend: Azure AI Search or the local store."""
+    if RETRIEVAL_BACKEND == "local":
+        store = LocalVectorStore().load()
+        try:
+            yield LocalIndexClient(store)
+        finally:
+            # Keep whatever was accepted; the manifest already recorded it.
+            # The BM25 index is rebuilt from the saved chunks and swapped in with them.
+            store.save(on_write=write_keyword_index)
+        return
+
+    from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+    async with AsyncClientSecretCredential(
+        tenant_id=TENANT_ID, client_id=CLIENT_ID, client_secret=CLIENT_SECRET
+    ) as async_credential:
+        async with AsyncSearchClient(
+            endpoint=SEARCH_ENDPOINT, index_name=INDEX_NAME, credential=async_credential
+        ) as client:
+            yield client
+
+
+async def aupload_chunks(chunks, action="upload", on_uploaded=None):
+    """Stream chunks through embedding into batched, concurrent index uploads."""
+    async with async_search_client() as client:
+        return await aindex_chunks(chunks, client, action=action, on_uploaded=on_uploaded)
 
-    if not text:
-        print("⚠️ WARNING: PDF contains no extractable text (likely scanned).")
-        return []
 
-    all_chunks = []
-    file_name = os.path.basename(pdf_path)
-    chunks = chunk_text(text)
-    total_chunks = len(chunks)
-    now = datetime.utcnow().isoformat()
+def upload_to_search():
+    print("Extracting chunks… embedding and uploading in batches…")
 
-    for idx, chunk in enumerate(chunks, start=1):
-        all_chunks.append({
-            "chunk_id": str(uuid.uuid4()),
-            "source_system": "local-pdf",
-            "subfolder": "",
-            "file_name": file_name,
-            "file_path": pdf_path,
-            "file_extension": ".pdf",
-            "last_modified": now,
-            "chunk_index": idx,
-            "total_chunks": total_chunks,
-            "chunk_text": chunk,
-            "chunk_size": len(chunk),
-        })
+    # Chunks are consumed lazily, so embedded documents never pile up in memory
+    progress = asyncio.run(aupload_chunks(iter_pdf_chunks(PDF_PATH)))
+    bump_index_generation()
 
-    return all_chunks
+    print("Upload result:", progress.summary())
+    for failure in progress.failed:
+        print("❌ Failed:", failure)
+    print("✔ Upload completed.")
 
 
 # ============================================================
-# GENERATE EMBEDDINGS + UPLOAD
+# INCREMENTAL RE-INDEXING
 # ============================================================
-def upload_to_search():
-    chunks = extract_pdf_chunks(PDF_PATH)
+def _is_under(path, root):
+    root = os.path.abspath(root)
+    return os.path.commonpath([os.path.abspath(path), root]) == root
 
-    print(f"Extracted {len(chunks)} chunks… generating embeddings…")
 
-    enriched = []
-    for doc in chunks:
-        doc["embedding"] = get_embedding(doc["chunk_text"])
-        enriched.append(doc)
+def sequential_extract(paths):
+    """Default extractor: yield (path, chunk documents) one file at a time, streamed via a spill file."""
+    for path in paths:
+        yield path, stream_pdf_chunks(path)
 
-    print("Uploading to Azure Search…")
-    result = search_client.upload_documents(enriched)
 
-    print("Upload result:", result)
-    print("✔ Upload completed.")
+async def aincremental_upload(pdf_paths, manifest, prune=False, extract_many=sequential_extract, embed=None,
+                              prune_root=None, chunking=None):
+    """
+    Upload only what changed since the last run.
+
+    Unchanged files (same file hash and chunker settings, ``chunking``
+    defaulting to the configured chunker's) are skipped. For changed files only
+    chunks with new content-hash IDs are embedded and merge_or_upload'ed,
+    and IDs that no longer exist are deleted. With ``prune``, files that
+    are in the manifest but not in ``pdf_paths`` are removed from the index;
+    ``prune_root`` limits that to files under one directory, so ingesting
+    one root leaves the files of other roots alone.
+    ``extract_many(paths)`` yields (path, chunk documents) in any order,
+    and each file's documents are consumed before the next file is asked
+    for; the documents may be an ExtractionFailed instead. A file whose extraction
+    fails is reported in ``progress.failed`` and keeps its indexed chunks
+    and manifest entry, so the next run retries it.
+    """
+    progress = UploadProgress()
+    # Manifest keys are absolute, so relative and absolute spellings of a path agree
+    pdf_paths = [os.path.abspath(p) for p in pdf_paths]
+
+    # The manifest diff happens here, on the loop thread. new_chunks() runs on
+    # aindex_chunks' worker thread and only reads ``changed`` and fills ``outcomes``,
+    # which is read back once streaming has finished.
+    chunking = chunker_config() if chunking is None else chunking
+    changed = {}     # file_path -> (source digest, chunk ids already indexed)
+    for path in pdf_paths:
+        digest = source_digest(path, chunking)
+        if manifest.is_file_unchanged(path, digest):
+            print(f"⏭️  Unchanged: {path}")
+            continue
+        changed[path] = (digest, manifest.chunk_ids(path))
+    outcomes = {}    # file_path -> (current chunk ids, new chunk ids) or the extraction error
+
+    def new_chunks():
+        for path, docs in extract_many(list(changed)):
+            existing = changed[path][1]
+            current, fresh = set(), set()
+            try:
+                if isinstance(docs, ExtractionFailed):
+                    raise docs
+                for doc in docs:
+                    current.add(doc["chunk_id"])
+                    if doc["chunk_id"] not in existing:
+                        fresh.add(doc["chunk_id"])
+                        yield doc
+            except Exception as e:
+                outcomes[path] = e
+                continue
+            outcomes[path] = (current, fresh)
+
+    async with async_search_client() as client:
+        await aindex_chunks(
+            new_chunks(), client, action="merge_or_upload", on_uploaded=manifest.add_chunks,
+            embed=embed, progress=progress,
+        )
+
+        planned = {}     # file_path -> (source digest, new chunk ids)
+        orphans = []
+        for path, outcome in outcomes.items():
+            digest, existing = changed[path]
+            if isinstance(outcome, Exception):
+                # Without the full chunk list there is no telling which IDs are orphans
+                print(f"❌ Extraction failed for {path}: {outcome}")
+                progress.failed.append({"key": path, "error": f"extraction failed: {outcome}"})
+                continue
+            current, fresh = outcome
+            orphans.extend(existing - current)
+            planned[path] = (digest, fresh)
+            print(f"🔄 {path}: {len(fresh)} new/changed chunks, {len(existing - current)} orphaned")
+
+        if prune:
+            for missing in sorted(manifest.indexed_files() - set(pdf_paths)):
+                if prune_root and not _is_under(missing, prune_root):
+                    continue
+                print(f"🗑️  Removed from source: {missing}")
+                orphans.extend(manifest.forget_file(missing))
+
+        deleted = []
+        if orphans:
+            deleted = await adelete_chunks(orphans, client)
+            manifest.remove_chunks(deleted)
+            print(f"🗑️  Deleted {len(deleted)} orphaned chunks")
+
+    if progress.uploaded or deleted:
+        # Answers cached by the API were built from the old index content
+        bump_index_generation()
+
+    failed_keys = {f["key"] for f in progress.failed}
+    for path, (digest, fresh) in planned.items():
+        # Files with failed chunks stay "changed" so the next run retries them
+        if not fresh & failed_keys:
+            manifest.mark_file(path, digest)
+
+    return progress
+
+
+def incremental_upload(pdf_paths, manifest, prune=False, extract_many=sequential_extract, embed=None,
+                       prune_root=None, chunking=None):
+    progress = asyncio.run(aincremental_upload(pdf_paths, manifest, prune=prune, extract_many=extract_many,
+                                               embed=embed, prune_root=prune_root, chunking=chunking))
+    print("Upload result:", progress.summary())
+    for failure in progress.failed:
+        print("❌ Failed:", failure)
+    return progress
 
 
 # ============================================================
 # MAIN
 # ============================================================
 if __name__ == "__main__":
-    create_search_index()
-    upload_to_search()
+    parser = argparse.ArgumentParser(description="Chunk, embed and index a PDF into Azure AI Search.")
+    parser.add_argument("--full", action="store_true",
+                        help="Recreate the index and re-upload everything instead of syncing changes.")
+    args = parser.parse_args()
+
+    manifest = IndexManifest()
+    create_search_index(manifest, force=args.full)
+    progress = incremental_upload([PDF_PATH], manifest)
+    if progress.failed:
+        sys.exit(1)
     print("\n🎉 PDF processed, chunked, embedded and indexed successfully!")
@@ -0,0 +1,143 @@
+"""
+Local SQLite manifest of what is already in the search index.
+
+Chunk IDs are derived from absolute file path, chunk position and content hash,
+so an unchanged chunk always maps to the same document key. The manifest
+remembers which keys each file produced (and a digest of the whole file
+plus the chunker settings), letting ingestion skip unchanged files, upload only new chunks and
+delete the ones that disappeared.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Set
+
+MANIFEST_PATH = os.getenv(
+    "INDEX_MANIFEST_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "index_manifest.sqlite3"),
+)
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def make_chunk_id(file_path: str, chunk_index: int, text: str) -> str:
+    """
+    Deterministic, key-safe chunk ID (hex only). The path is made absolute,
+    so a file gets the same IDs whether it was given relative or absolute.
+    """
+    raw = f"{os.path.abspath(file_path)}|{chunk_index}|{content_hash(text)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def source_digest(path: str, chunking: str = "") -> str:
+    """
+    File hash combined with the chunker settings that produced the chunks,
+    so a file re-chunked with different settings no longer counts as unchanged.
+    """
+    return hashlib.sha256(f"{file_hash(path)}|{chunking}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    SQLite-backed record of indexed files and chunk keys; every query holds the lock.
+    Files are keyed by absolute path (see aincremental_upload).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or MANIFEST_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE TABLE IF NOT EXISTS files (
+                file_path TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS chunks (
+                chunk_id TEXT PRIMARY KEY,
+                file_path TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chunks_by_file ON chunks (file_path);
+        """)
+        self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    # ------------------------------------------------------------
+    # Schema
+    # ------------------------------------------------------------
+    def get_schema_hash(self):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_hash'").fetchone()
+        return row[0] if row else None
+
+    def set_schema_hash(self, value: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_hash', ?)", (value,)
+            )
+
+    def reset(self):
+        """Forget everything (the index was recreated)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM chunks")
+
+    # ------------------------------------------------------------
+    # Files and chunks
+    # ------------------------------------------------------------
+    def is_file_unchanged(self, file_path: str, digest: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT file_hash FROM files WHERE file_path = ?", (file_path,)
+            ).fetchone()
+        return bool(row) and row[0] == digest
+
+    def chunk_ids(self, file_path: str) -> Set[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT chunk_id FROM chunks WHERE file_path = ?", (file_path,))
+            return {r[0] for r in rows}
+
+    def indexed_files(self) -> Set[str]:
+        with self._lock:
+            return {r[0] for r in self._conn.execute("SELECT file_path FROM files")}
+
+    def add_chunks(self, documents: Iterable[Dict]):
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (chunk_id, file_path) VALUES (?, ?)",
+                [(d["chunk_id"], d["file_path"]) for d in documents],
+            )
+
+    def remove_chunks(self, chunk_ids: Iterable[str]):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM chunks WHERE chunk_id = ?", [(c,) for c in chunk_ids])
+
+    def mark_file(self, file_path: str, digest: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (file_path, file_hash) VALUES (?, ?)", (file_path, digest)
+            )
+
+    def forget_file(self, file_path: str) -> List[str]:
+        """Drop a file and return the chunk IDs it owned."""
+        ids = sorted(self.chunk_ids(file_path))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM chunks WHERE file_path = ?", (file_path,))
+            self._conn.execute("DELETE FROM files WHERE file_path = ?", (file_path,))
+        return ids
@@ -0,0 +1,177 @@
+"""
+Pipelined embedding + upload of chunk documents into Azure AI Search.
+
+Chunks are pulled from an iterator one batch at a time. Each batch is
+embedded and then uploaded by its own task, and at most
+``max_inflight`` batches exist at any moment, so memory stays flat no
+matter how large the corpus is. Documents the service rejects with a
+transient status are retried; permanent failures are reported.
+"""
+import asyncio
+import itertools
+import os
+import random
+import time
+from typing import Callable, Dict, Iterable, List
+
+from utilities.embedding_batcher import aembed_texts
+
+UPLOAD_BATCH_SIZE = int(os.getenv("UPLOAD_BATCH_SIZE", "256"))
+UPLOAD_MAX_INFLIGHT = int(os.getenv("UPLOAD_MAX_INFLIGHT", "4"))
+UPLOAD_MAX_RETRIES = int(os.getenv("UPLOAD_MAX_RETRIES", "5"))
+UPLOAD_BACKOFF_BASE = 1.0    # seconds
+
+# Per-document statuses worth retrying (conflict, throttling, server errors)
+RETRYABLE_STATUS = {409, 422, 429, 500, 502, 503, 504}
+
+
+class UploadProgress:
+    """Running counters with periodic throughput reporting."""
+
+    def __init__(self, report_every: float = 5.0):
+        self.started = time.monotonic()
+        self.report_every = report_every
+        self._last_report = self.started
+        self.extracted = 0
+        self.embedded = 0
+        self.uploaded = 0
+        self.retried = 0
+        self.failed: List[Dict] = []
+
+    def maybe_report(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last_report < self.report_every:
+            return
+        self._last_report = now
+        elapsed = max(now - self.started, 1e-9)
+        print(
+            f"📤 [index_uploader] extracted={self.extracted} embedded={self.embedded} "
+            f"uploaded={self.uploaded} retried={self.retried} failed={len(self.failed)} "
+            f"({self.uploaded / elapsed:.1f} docs/s)"
+        )
+
+    def summary(self):
+        return {
+            "extracted": self.extracted,
+            "embedded": self.embedded,
+            "uploaded": self.uploaded,
+            "retried": self.retried,
+            "failed": len(self.failed),
+            "seconds": round(time.monotonic() - self.started, 2),
+        }
+
+
+async def _upload_with_retry(search_client, documents: List[Dict], action: str, key_field: str,
+                             progress: UploadProgress, on_uploaded: Callable = None):
+    """Upload a batch; retry the documents that come back with a transient status."""
+    pending = documents
+    send = getattr(search_client, f"{action}_documents")
+
+    for attempt in range(UPLOAD_MAX_RETRIES + 1):
+        try:
+            results = await send(documents=pending)
+        except Exception as e:
+            # Whole-request failure (throttled, network); 413 is already split by the SDK
+            if attempt == UPLOAD_MAX_RETRIES:
+                progress.failed.extend({"key": d[key_field], "error": str(e)} for d in pending)
+                return
+            await asyncio.sleep(random.uniform(0, UPLOAD_BACKOFF_BASE * 2 ** attempt))
+            progress.retried += len(pending)
+            continue
+
+        by_key = {d[key_field]: d for d in pending}
+        retry, succeeded = [], []
+        for result in results:
+            if result.succeeded:
+                progress.uploaded += 1
+                succeeded.append(by_key[result.key])
+            elif result.status_code in RETRYABLE_STATUS and attempt < UPLOAD_MAX_RETRIES:
+                retry.append(by_key[result.key])
+            else:
+                progress.failed.append({"key": result.key, "status": result.status_code,
+                                        "error": result.error_message})
+
+        if on_uploaded and succeeded:
+            on_uploaded(succeeded)
+        if not retry:
+            return
+        progress.retried += len(retry)
+        pending = retry
+        await asyncio.sleep(random.uniform(0, UPLOAD_BACKOFF_BASE * 2 ** attempt))
+
+
+async def _process_batch(batch: List[Dict], search_client, action: str, key_field: str,
+                         progress: UploadProgress, embed: Callable, on_uploaded: Callable):
+    try:
+        vectors = await embed([doc["chunk_text"] for doc in batch])
+        for doc, vector in zip(batch, vectors):
+            doc["embedding"] = vector
+        progress.embedded += len(batch)
+
+        await _upload_with_retry(search_client, batch, action, key_field, progress, on_uploaded)
+    except Exception as e:
+        # One bad batch (embedding retries exhausted, unexpected client error) is
+        # reported like rejected documents; the other batches keep going
+        progress.failed.extend({"key": d[key_field], "error": f"{type(e).__name__}: {e}"} for d in batch)
+    progress.maybe_report()
+
+
+async def aindex_chunks(chunks: Iterable[Dict], search_client, action: str = "upload",
+                        batch_size: int = None, max_inflight: int = None, key_field: str = "chunk_id",
+                        embed: Callable = None, progress: UploadProgress = None,
+                        on_uploaded: Callable = None):
+    """
+    Embed and index chunk documents streamed from ``chunks``.
+
+    ``action`` is the SearchClient document verb: "upload" or "merge_or_upload".
+    ``on_uploaded(documents)`` is called with every group the service accepted.
+    ``embed(texts)`` defaults to the shared batched embedder (aembed_texts).
+    Returns the UploadProgress with counters and any permanent failures.
+    """
+    batch_size = batch_size or UPLOAD_BATCH_SIZE
+    max_inflight = max_inflight or UPLOAD_MAX_INFLIGHT
+    embed = embed or aembed_texts
+    progress = progress or UploadProgress()
+
+    iterator = iter(chunks)
+    inflight = set()
+
+    try:
+        while True:
+            # Extraction is blocking; keep it off the loop so uploads progress meanwhile
+            batch = await asyncio.to_thread(lambda: list(itertools.islice(iterator, batch_size)))
+            if not batch:
+                break
+            progress.extracted += len(batch)
+
+            if len(inflight) >= max_inflight:
+                done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+                inflight.difference_update(done)
+
+            inflight.add(asyncio.create_task(
+                _process_batch(batch, search_client, action, key_field, progress, embed, on_uploaded)
+            ))
+
+        if inflight:
+            await asyncio.gather(*inflight)
+    finally:
+        # If extraction raises, don't leave uploads running in the background
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+        progress.maybe_report(force=True)
+
+    return progress
+
+
+async def adelete_chunks(chunk_ids: List[str], search_client, key_field: str = "chunk_id",
+                         batch_size: int = None):
+    """Delete documents by key in batches; returns the keys the service confirmed."""
+    batch_size = batch_size or UPLOAD_BATCH_SIZE
+    deleted = []
+    for start in range(0, len(chunk_ids), batch_size):
+        keys = chunk_ids[start:start + batch_size]
+        results = await search_client.delete_documents(documents=[{key_field: k} for k in keys])
+        # Deleting a missing key still succeeds, so orphans never get stuck
+        deleted.extend(r.key for r in results if r.succeeded)
+    return deleted
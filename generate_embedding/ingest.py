@@ -0,0 +1,126 @@
+"""
+Directory ingestion CLI.
+
+Crawls a directory tree, extracts and chunks documents on a process pool
+(PyMuPDF extraction is CPU-bound) and feeds every changed file into the
+shared embedding/upload pipeline from embed_pdf.py.
+
+    python generate_embedding/ingest.py <root> [--workers N] [--full] [--prune]
+"""
+import sys
+import os
+import argparse
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Make project root visible
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from generate_embedding.pdf_extraction import ExtractionFailed, read_spilled_chunks, spill_pdf_chunks
+from generate_embedding.index_manifest import IndexManifest
+
+DEFAULT_EXTENSIONS = (".pdf",)
+
+
+def crawl(root, extensions=DEFAULT_EXTENSIONS):
+    """Return matching files under root, sorted for stable runs."""
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if os.path.splitext(name)[1].lower() in extensions:
+                found.append(os.path.join(dirpath, name))
+    return found
+
+
+def subfolder_of(path, root):
+    rel = os.path.relpath(os.path.dirname(path), root)
+    return "" if rel == "." else rel.replace(os.sep, "/")
+
+
+def _extract_file(path, root, source_system, spill_dir):
+    # Runs in a worker process. The chunks go to a spill file instead of being
+    # pickled back as one list, so a huge PDF never sits whole in the parent.
+    # A failure must not look like an empty file, which would delete
+    # everything already indexed for it.
+    fd, spill_path = tempfile.mkstemp(suffix=".jsonl", dir=spill_dir)
+    os.close(fd)
+    try:
+        return path, (spill_path, spill_pdf_chunks(path, spill_path, source_system, subfolder_of(path, root)))
+    except Exception as e:
+        os.remove(spill_path)
+        return path, ExtractionFailed(f"{type(e).__name__}: {e}")
+
+
+def parallel_extractor(root, source_system, workers, prefetch=None):
+    """
+    Build an ``extract_many`` for embed_pdf.aincremental_upload that runs
+    extraction on a process pool. Workers write each file's chunks to a
+    spill file that is streamed back one document at a time, so memory
+    stays flat however large a file is; at most ``prefetch`` files are
+    extracted ahead of the upload stage, which bounds the disk used.
+    Each file's documents must be consumed before asking for the next file.
+    """
+    prefetch = prefetch or workers * 2
+
+    def extract_many(paths):
+        pending = iter(paths)
+        with tempfile.TemporaryDirectory(prefix="ingest-") as spill_dir, \
+                ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = set()
+            for path in pending:
+                futures.add(pool.submit(_extract_file, path, root, source_system, spill_dir))
+                if len(futures) >= prefetch:
+                    break
+
+            while futures:
+                done, futures = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path, result = future.result()
+                    if isinstance(result, ExtractionFailed):
+                        yield path, result
+                    else:
+                        yield path, read_spilled_chunks(*result)
+                    next_path = next(pending, None)
+                    if next_path is not None:
+                        futures.add(pool.submit(_extract_file, next_path, root, source_system, spill_dir))
+
+    return extract_many
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a directory of documents into Azure AI Search.")
+    parser.add_argument("root", help="Directory to crawl")
+    parser.add_argument("--extensions", nargs="+", default=list(DEFAULT_EXTENSIONS),
+                        help="File extensions to ingest (default: .pdf)")
+    parser.add_argument("--source-system", default="local-pdf")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Extraction processes")
+    parser.add_argument("--full", action="store_true",
+                        help="Recreate the index and re-upload everything")
+    parser.add_argument("--prune", action="store_true",
+                        help="Remove indexed files under root that no longer exist (other roots are never touched)")
+    args = parser.parse_args(argv)
+
+    # Imported here so worker processes (spawned re-imports) never load the upload pipeline
+    from generate_embedding.embed_pdf import create_search_index, incremental_upload
+
+    root = os.path.abspath(args.root)
+    extensions = tuple(e.lower() if e.startswith(".") else f".{e.lower()}" for e in args.extensions)
+    paths = crawl(root, extensions)
+    print(f"📂 Found {len(paths)} file(s) under {root}")
+
+    manifest = IndexManifest()
+    create_search_index(manifest, force=args.full)
+    progress = incremental_upload(
+        paths,
+        manifest,
+        prune=args.prune,
+        prune_root=root,
+        extract_many=parallel_extractor(root, args.source_system, args.workers),
+    )
+    return 1 if progress.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
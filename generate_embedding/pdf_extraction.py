@@ -0,0 +1,129 @@
+"""
+PDF → text → chunk documents.
+
+Kept free of Azure clients so it can run inside worker processes.
+"""
+import json
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import fitz  # PyMuPDF for reliable text extraction
+
+from generate_embedding.index_manifest import make_chunk_id
+from generate_embedding.chunkers import get_chunker
+
+
+class ExtractionFailed(Exception):
+    """
+    A file could not be extracted. Worker processes return it in place of
+    the chunk list, so a bad file doesn't stop the rest of the run.
+    """
+
+
+# ============================================================
+# PDF → PAGES → CHUNKS (streaming)
+# ============================================================
+def iter_pdf_pages(pdf_path):
+    """Yield (page_number, text) one page at a time; page numbers start at 1."""
+    with fitz.open(pdf_path) as doc:
+        for page_number, page in enumerate(doc, start=1):
+            yield page_number, page.get_text("text")
+
+
+def extract_pdf_text(pdf_path):
+    """
+    Use PyMuPDF for robust text extraction.
+    """
+    return "\n".join(text for _, text in iter_pdf_pages(pdf_path)).strip()
+
+
+def chunk_text(text, chunker=None):
+    return [chunk for chunk, _, _ in (chunker or get_chunker())([(1, text)])]
+
+
+def iter_pdf_chunks(pdf_path, source_system="local-pdf", subfolder="", chunker=None):
+    """
+    Yield chunk documents page by page (embeddings are added downstream).
+    total_chunks is unknown while streaming and is left as None.
+    file_path is absolute, matching the chunk IDs and the manifest keys.
+    """
+    pdf_path = os.path.abspath(pdf_path)
+    chunker = chunker or get_chunker()
+    file_name = os.path.basename(pdf_path)
+    file_extension = os.path.splitext(pdf_path)[1].lower()
+    last_modified = datetime.fromtimestamp(os.path.getmtime(pdf_path), timezone.utc).isoformat()
+
+    idx = 0
+    for idx, (chunk, page_start, page_end) in enumerate(chunker(iter_pdf_pages(pdf_path)), start=1):
+        yield {
+            "chunk_id": make_chunk_id(pdf_path, idx, chunk),
+            "source_system": source_system,
+            "subfolder": subfolder,
+            "file_name": file_name,
+            "file_path": pdf_path,
+            "file_extension": file_extension,
+            "last_modified": last_modified,
+            "chunk_index": idx,
+            "total_chunks": None,
+            "chunk_text": chunk,
+            "chunk_size": len(chunk),
+            "page_start": page_start,
+            "page_end": page_end,
+        }
+
+    if idx == 0:
+        print(f"⚠️ WARNING: {pdf_path} contains no extractable text (likely scanned).")
+
+
+def extract_pdf_chunks(pdf_path, source_system="local-pdf", subfolder="", chunker=None):
+    chunks = list(iter_pdf_chunks(pdf_path, source_system, subfolder, chunker))
+    for chunk in chunks:
+        chunk["total_chunks"] = len(chunks)
+    return chunks
+
+
+# ============================================================
+# Spill files: a known total_chunks without holding the chunks
+# ============================================================
+def spill_pdf_chunks(pdf_path, spill_path, source_system="local-pdf", subfolder="", chunker=None):
+    """
+    Write a PDF's chunk documents to ``spill_path`` as JSON lines, one chunk
+    in memory at a time, and return how many there were.
+    """
+    count = 0
+    with open(spill_path, "w", encoding="utf-8") as f:
+        for doc in iter_pdf_chunks(pdf_path, source_system, subfolder, chunker):
+            f.write(json.dumps(doc) + "\n")
+            count += 1
+    return count
+
+
+def read_spilled_chunks(spill_path, total_chunks):
+    """Yield the documents of a spill file with total_chunks filled in, then delete it."""
+    try:
+        with open(spill_path, encoding="utf-8") as f:
+            for line in f:
+                doc = json.loads(line)
+                doc["total_chunks"] = total_chunks
+                yield doc
+    finally:
+        try:
+            os.remove(spill_path)
+        except OSError:
+            pass
+
+
+def stream_pdf_chunks(pdf_path, source_system="local-pdf", subfolder="", chunker=None, spill_dir=None):
+    """
+    Like iter_pdf_chunks, but with total_chunks set: the chunks go through a
+    temporary spill file, so memory stays flat however large the PDF is.
+    """
+    fd, spill_path = tempfile.mkstemp(suffix=".jsonl", dir=spill_dir)
+    os.close(fd)
+    try:
+        total = spill_pdf_chunks(pdf_path, spill_path, source_system, subfolder, chunker)
+    except BaseException:
+        os.remove(spill_path)
+        raise
+    yield from read_spilled_chunks(spill_path, total)
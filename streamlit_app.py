@@ -1,9 +1,27 @@
+import utilities.config  # noqa: F401  (loads .env once, before anything reads settings)
+import threading
+
 import streamlit as st
-from workflow.rag_workflow import rag_agent_orchestrator
-st.write("Streamlit UI Loaded!")   # DEBUG LINE
 
 st.set_page_config(page_title="RAG Assistant Demo", layout="centered")
 
+
+def _pipeline():
+    # Imported on first use so the page renders before langgraph and the SDKs load
+    import workflow.rag_workflow as rag_workflow
+    return rag_workflow
+
+
+@st.cache_resource
+def _warm_up():
+    # Runs once per server process, not on every rerun; questions join the thread before querying
+    thread = threading.Thread(target=lambda: _pipeline().warm_up(), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+warm_up_thread = _warm_up()
+
 st.title("🤖 RAG Agent Demo")
 st.write("Ask a question and the agent will fetch weather or answer from PDF.")
 
@@ -24,10 +42,31 @@ if user_input:
     st.session_state.messages.append({"role": "user", "content": user_input})
     st.chat_message("user").write(user_input)
 
-    # Call your RAG pipeline
-    with st.spinner("Thinking..."):
-        response = rag_agent_orchestrator(user_input)
+    # Stream the RAG pipeline: progress first, then summary tokens as they arrive
+    with st.chat_message("assistant"):
+        status = st.empty()
+        final = {}
+
+        def summary_tokens():
+            # A question asked during start-up waits for the warm-up instead of racing it
+            warm_up_thread.join()
+            for event in _pipeline().stream_rag_agent_orchestrator(user_input):
+                if event["event"] == "route":
+                    status.caption(f"Routing → {event['data_type']}" + (f" ({event['city']})" if event.get("city") else ""))
+                elif event["event"] == "retrieval":
+                    status.caption(f"Retrieved {event['chunks']} chunk(s) from {', '.join(event['sources']) or 'no sources'}")
+                elif event["event"] == "token":
+                    yield event["text"]
+                elif event["event"] == "done":
+                    final.update(event)
+
+        streamed = st.write_stream(summary_tokens())
+        status.empty()
+
+        response = final.get("summary") or streamed
+        if not streamed:
+            # Nothing reached the LLM (e.g. no chunks), so show the final summary directly
+            st.write(response)
 
     # Add assistant message
     st.session_state.messages.append({"role": "assistant", "content": response})
-    st.chat_message("assistant").write(response)
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+
+import workflow.rag_workflow as rag_workflow
+from workflow.answer_cache import AnswerCache
+
+ANSWER = {"summary": "Net income rose 12%.", "metadata": []}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(**kwargs):
+    generation = {"value": "g1"}
+    clock = Clock()
+    cache = AnswerCache(max_entries=4, similarity=0.95, ttl={"weather": 60, "pdf": 3600},
+                        generation=lambda: generation["value"], clock=clock, **kwargs)
+    return cache, clock, generation
+
+
+def test_exact_hit_ignores_case_whitespace_and_punctuation():
+    cache, _, _ = make_cache()
+    cache.put("What was net income?", ANSWER, "pdf")
+
+    assert cache.get("  what was   NET income ") == ANSWER
+    assert cache.get("what was revenue?") is None
+    assert cache.stats()["exact_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_near_duplicate_pdf_query_reuses_answer():
+    cache, _, _ = make_cache()
+    cache.put("what was net income", ANSWER, "pdf", vector=[1.0, 0.0, 0.0])
+
+    assert cache.get("how much net income was there") is None
+    assert cache.get_similar([0.99, 0.05, 0.0]) == ANSWER
+    assert cache.get_similar([0.6, 0.8, 0.0]) is None
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_near_duplicate_with_a_different_year_is_not_reused():
+    cache, _, _ = make_cache()
+    cache.put("What was net income in 2022?", ANSWER, "pdf", vector=[1.0, 0.0, 0.0])
+
+    # ada-002 puts these two queries above the similarity threshold
+    assert cache.get_similar([0.99, 0.05, 0.0], "What was net income in 2023?") is None
+    assert cache.get_similar([0.99, 0.05, 0.0], "how much net income was there in 2022") == ANSWER
+    assert cache.get_similar([0.99, 0.05, 0.0], "net income for Q3 2022") is None
+
+
+def test_weather_answers_never_match_by_similarity():
+    cache, _, _ = make_cache()
+    cache.put("weather in Pune", ANSWER, "weather", vector=[1.0, 0.0])
+
+    assert cache.get_similar([1.0, 0.0]) is None
+
+
+def test_ttl_depends_on_route():
+    cache, clock, _ = make_cache()
+    cache.put("weather in Pune", ANSWER, "weather")
+    cache.put("net income", ANSWER, "pdf")
+
+    clock.now = 120
+    assert cache.get("weather in Pune") is None
+    assert cache.get("net income") == ANSWER
+
+
+def test_new_index_generation_invalidates_pdf_answers_only():
+    cache, _, generation = make_cache()
+    cache.put("weather in Pune", ANSWER, "weather")
+    cache.put("net income", ANSWER, "pdf", vector=[1.0, 0.0])
+
+    generation["value"] = "g2"
+    assert cache.get("net income") is None
+    assert cache.get_similar([1.0, 0.0]) is None
+    assert cache.get("weather in Pune") == ANSWER
+
+
+def test_lru_bound_recycles_vector_slots():
+    cache, _, _ = make_cache()
+    for i in range(6):
+        cache.put(f"query {i}", {"summary": str(i)}, "pdf", vector=[float(i + 1), 1.0])
+
+    assert cache.stats()["entries"] == 4
+    assert cache.get("query 0") is None
+    assert cache.get_similar([6.0, 1.0]) == {"summary": "5"}
+
+
+@pytest.fixture
+def fresh_cache(monkeypatch):
+    cache, _, _ = make_cache()
+    monkeypatch.setattr(rag_workflow, "answer_cache", cache)
+    return cache
+
+
+def test_orchestrator_serves_repeat_and_skips_failures(monkeypatch, fresh_cache):
+    calls = []
+
+    async def route(query):
+        return {"data_type": "weather", "city": "Pune"}
+
+    async def weather(query, city, api_key):
+        calls.append(query)
+        if len(calls) == 1:
+            return [{"content": "Exception occurred: timeout", "file_name": "openweathermap"}]
+        return [{"content": f"weather for {city}", "file_name": "openweathermap"}]
+
+    async def summarize(chunks, query):
+        return {"summary": chunks[0]["content"], "metadata": []}
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "aweather_api", weather)
+    monkeypatch.setattr(rag_workflow, "asummary_logic", summarize)
+
+    async def ask():
+        return await rag_workflow.arag_agent_orchestrator("weather in Pune")
+
+    assert asyncio.run(ask())["summary"].startswith("Exception occurred")
+    assert asyncio.run(ask())["summary"] == "weather for Pune"
+    assert asyncio.run(ask())["summary"] == "weather for Pune"
+    assert len(calls) == 2
+
+
+def test_stream_serves_near_duplicate_as_single_done_event(monkeypatch, fresh_cache):
+    async def embed(query):
+        return [1.0, 0.1] if "net income" in query else [0.0, 1.0]
+
+    monkeypatch.setattr(rag_workflow, "aget_embedding", embed)
+    fresh_cache.put("what was the net income", ANSWER, "pdf", vector=[1.0, 0.1])
+
+    async def collect():
+        return [e async for e in rag_workflow.astream_rag_agent_orchestrator("net income for the year?")]
+
+    events = asyncio.run(collect())
+
+    assert events == [{"event": "done", **ANSWER, "cached": True}]
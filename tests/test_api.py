@@ -1,4 +1,10 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
 from fastapi.testclient import TestClient
+import app as app_module
 from app import app
 
 client = TestClient(app)
@@ -13,3 +19,60 @@ def test_rag_query_api():
     data = response.json()
     assert "result" in data or "error" in data
     assert data["query"] == payload["query"]
+
+
+def test_rag_query_stream_api(monkeypatch):
+    async def fake_stream(query):
+        yield {"event": "route", "data_type": "weather", "city": "Indore"}
+        yield {"event": "token", "text": "Sunny"}
+        yield {"event": "done", "summary": "Sunny", "metadata": []}
+
+    monkeypatch.setattr(app_module, "astream_rag_agent_orchestrator", fake_stream)
+
+    response = client.post("/rag/query/stream", json={"query": "temperature in Indore"})
+
+    assert response.status_code == 200
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [e["event"] for e in events] == ["route", "token", "done"]
+
+
+def test_rag_batch_api(monkeypatch):
+    async def fake_batch(queries, max_concurrency=None, ordered=True):
+        for i, query in enumerate(queries):
+            yield {"index": i, "query": query, "result": {"summary": query.upper(), "metadata": []}}
+
+    monkeypatch.setattr(app_module, "abatch_rag_agent_orchestrator", fake_batch)
+
+    response = client.post("/rag/batch", json={"queries": ["a", "b"], "ordered": False})
+
+    assert response.status_code == 200
+    items = [json.loads(line) for line in response.text.splitlines()]
+    assert [item["result"]["summary"] for item in items] == ["A", "B"]
+
+
+def test_metrics_api():
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE rag_node_latency_seconds histogram" in response.text
+    assert "rag_cache_hit_ratio" in response.text
+
+
+def test_only_eager_warm_up_freezes_the_heap(monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, "_pipeline", lambda: SimpleNamespace(warm_up=lambda freeze: calls.append(freeze)))
+
+    async def start(mode):
+        monkeypatch.setattr(app_module, "WARM_UP", mode)
+        async with app_module.lifespan(app):
+            pass
+
+    asyncio.run(start("eager"))
+    asyncio.run(start("background"))
+    deadline = time.monotonic() + 2
+    while len(calls) < 2 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    # A background warm-up overlaps live requests, so it must not run a full collection
+    assert calls == [True, False]
@@ -0,0 +1,87 @@
+import json
+import urllib.request
+
+from benchmark.run_benchmark import (
+    QUERIES, combine_runs, compare_to_baseline, load_baseline, percentile, run_benchmark, save_baseline, warmup_queries,
+)
+from benchmark.stub_services import Fault, StubServices
+
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), method="POST",
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_stubs_answer_like_the_real_apis_and_inject_errors():
+    with StubServices(faults={"search": Fault(error_rate=1.0, error_status=503)}) as stubs:
+        status, body = _post(f"{stubs.url}/token", {})
+        assert status == 200 and body["access_token"]
+
+        status, body = _post(f"{stubs.url}/openai/deployments/emb/embeddings", {"input": ["a", "b"]})
+        assert status == 200 and [d["index"] for d in body["data"]] == [0, 1]
+
+        status, body = _post(f"{stubs.url}/openai/deployments/gpt/chat/completions", {"messages": [
+            {"role": "user", "content": "You are a strict classification assistant.\nUser Query: \"rain today?\""}]})
+        assert json.loads(body["choices"][0]["message"]["content"])["data_type"] == "weather"
+
+        status, _ = _post(f"{stubs.url}/indexes('idx')/docs/search.post.search", {"search": "x"})
+        assert status == 503
+        assert stubs.errors["search"] == 1 and stubs.requests["chat"] == 1
+
+
+def test_percentile_and_baseline_comparison(tmp_path):
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile(list(range(1, 101)), 99) == 99
+
+    report = {"scenario": "api/default/c8", "requests": 100, "errors": 0, "throughput_rps": 20.0,
+              "latency_ms": {"p50": 100.0, "p95": 200.0, "p99": 300.0, "max": 320.0}}
+    path = str(tmp_path / "baseline.json")
+    save_baseline(report, path)
+    baseline = load_baseline(path)
+
+    assert compare_to_baseline(report, baseline) == []
+    slower = dict(report, throughput_rps=10.0, latency_ms=dict(report["latency_ms"], p95=400.0))
+    regressions = compare_to_baseline(slower, baseline)
+    assert any("p95" in r for r in regressions) and any("throughput" in r for r in regressions)
+    # Unknown scenarios have nothing to regress against
+    assert compare_to_baseline(dict(report, scenario="other"), baseline) == []
+
+    runs = [dict(report, errors=e, throughput_rps=t, latency_ms=dict(report["latency_ms"], p50=p50))
+            for e, t, p50 in [(0, 20.0, 100.0), (2, 10.0, 300.0), (0, 30.0, 90.0)]]
+    combined = combine_runs(runs)
+    assert combined["latency_ms"]["p50"] == 100.0 and combined["throughput_rps"] == 20.0
+    assert (combined["runs"], combined["requests"], combined["errors"]) == (3, 300, 2)
+
+
+def test_warmup_covers_every_route():
+    chosen = warmup_queries(QUERIES, 2)
+
+    # Weather (rules), PDF (rules) and LLM-routed, even when fewer were asked for
+    assert chosen == ["What's the weather in Mumbai?",
+                      "What was the total revenue in the financial statements?",
+                      "Tell me about it"]
+    assert warmup_queries(QUERIES, 5)[3:] == ["temperature in Indore", "Is it humid in Chennai today?"]
+
+
+def test_benchmark_runs_offline_end_to_end():
+    report = run_benchmark(target="orchestrator", requests=6, concurrency=2, profile="zero", warmup=1)
+
+    assert report["errors"] == 0 and report["requests"] == 6
+    assert report["latency_ms"]["p50"] > 0
+    assert report["stages"]["node:llm_summary_handler"]["calls"] >= 1
+    assert report["upstream_requests"]["chat"] >= 1
+
+
+def test_identical_queries_are_not_coalesced_unless_asked():
+    def pipeline_runs(coalesce):
+        report = run_benchmark(target="orchestrator", requests=6, concurrency=3, profile="zero", warmup=1,
+                               queries=["Tell me about it"], coalesce=coalesce)
+        return report["stages"]["node:orchestration_agent"]["calls"]
+
+    assert pipeline_runs(coalesce=False) == 6
+    assert pipeline_runs(coalesce=True) < 6
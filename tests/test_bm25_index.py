@@ -0,0 +1,51 @@
+import numpy as np
+
+from utilities.bm25_index import BM25Index, reciprocal_rank_fusion, tokenize
+from utilities.vector_store import LocalVectorStore
+from workflow.retrieval_backends import LocalVectorBackend, write_keyword_index
+
+TEXTS = [
+    "Accounts receivable increased to 4,200 due to slower collections.",
+    "EBITDA margin improved by 3 points year over year.",
+    "The board approved a dividend of 2.50 per share.",
+    "Accounts payable and accrued liabilities were stable.",
+]
+
+
+def test_tokenize_folds_case_plurals_and_stopwords():
+    assert tokenize("The Accounts Receivables of S&P") == ["account", "receivable", "s&p"]
+
+
+def test_bm25_ranks_exact_line_items_first(tmp_path):
+    index = BM25Index.build(TEXTS)
+
+    ids, scores = index.top("accounts receivable", top=3)
+    assert ids[0] == 0 and scores[0] > scores[-1]
+    assert set(ids) == {0, 3}                       # only docs sharing a term match
+    assert index.top("EBITDA", top=3)[0].tolist() == [1]
+
+    index.save(str(tmp_path / "bm25"))
+    loaded = BM25Index.load(str(tmp_path / "bm25"))
+    assert isinstance(loaded.doc_ids, np.memmap)
+    np.testing.assert_allclose(loaded.scores("accounts receivable"), index.scores("accounts receivable"))
+
+
+def test_reciprocal_rank_fusion_respects_weights():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]])[0][0] == "b"
+    assert reciprocal_rank_fusion([["a", "b"], ["c"]], weights=[0.1, 1.0], k=1)[0] == ("c", 0.5)
+
+
+def test_local_backend_fuses_keyword_and_vector_rankings(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path / "store"))
+    # Vectors alone prefer the dividend chunk for this query
+    vectors = [[0.2, 1.0], [0.0, 1.0], [1.0, 0.0], [0.1, 1.0]]
+    store.upsert([{"chunk_id": f"c{i}", "chunk_text": text, "file_name": "report.pdf", "embedding": v}
+                  for i, (text, v) in enumerate(zip(TEXTS, vectors))])
+    store.save(on_write=write_keyword_index)
+
+    query_vector = [1.0, 0.0]
+    vector_only = LocalVectorBackend(LocalVectorStore(path=store.path), keyword_weight=0)
+    hybrid = LocalVectorBackend(LocalVectorStore(path=store.path), keyword_weight=2.0)
+
+    assert vector_only.search("accounts receivable", query_vector, top=1)[0]["chunk_id"] == "c2"
+    assert hybrid.search("accounts receivable", query_vector, top=1)[0]["chunk_id"] == "c0"
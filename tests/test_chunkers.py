@@ -0,0 +1,54 @@
+from generate_embedding.chunkers import get_chunker, iter_token_chunks
+from utilities.tokens import count_tokens
+
+PARAGRAPH = "Revenue for the year increased on higher volumes. " * 6
+
+
+def test_chunks_stay_within_token_budget():
+    pages = [(1, "\n\n".join([PARAGRAPH] * 20))]
+
+    chunks = list(iter_token_chunks(pages, max_tokens=200, overlap_tokens=30))
+
+    assert len(chunks) > 1
+    assert max(count_tokens([text for text, _, _ in chunks])) <= 200 + 5
+
+
+def test_cuts_prefer_paragraph_boundaries():
+    pages = [(1, "\n\n".join(f"Note {i}. " + PARAGRAPH for i in range(10)))]
+
+    chunks = list(iter_token_chunks(pages, max_tokens=250, overlap_tokens=0))
+
+    # Every chunk ends at the end of a paragraph rather than mid-sentence
+    assert all(text.endswith("volumes.") for text, _, _ in chunks)
+    assert all(text.startswith("Note") for text, _, _ in chunks)
+
+
+def test_table_rows_are_not_split():
+    rows = "\n".join(f"Accounts receivable {i} | {i * 1000:,} | {i * 900:,}" for i in range(200))
+
+    chunks = list(iter_token_chunks([(1, rows)], max_tokens=120, overlap_tokens=0))
+
+    for text, _, _ in chunks:
+        assert all(line.startswith("Accounts receivable") for line in text.splitlines())
+
+
+def test_overlap_repeats_whole_trailing_units():
+    sentences = " ".join(f"Sentence number {i} is here." for i in range(200))
+
+    chunks = [text for text, _, _ in iter_token_chunks([(1, sentences)], max_tokens=100, overlap_tokens=20)]
+
+    first_of_next = chunks[1].split(". ", 1)[0] + "."
+    last_of_first = chunks[0].rsplit(". ", 1)[-1]
+    assert first_of_next in chunks[0]
+    assert last_of_first in chunks[1]
+    assert first_of_next != chunks[0].split(". ", 1)[0] + "."
+
+
+def test_chunks_track_pages_and_char_chunker_is_available():
+    pages = [(1, PARAGRAPH), (2, PARAGRAPH), (3, PARAGRAPH)]
+
+    token_chunks = list(get_chunker("tokens", max_tokens=1000)(pages))
+    char_chunks = list(get_chunker("chars")(pages))
+
+    assert token_chunks[0][1:] == (1, 3)
+    assert char_chunks[0][1] == 1 and char_chunks[-1][2] == 3
@@ -0,0 +1,51 @@
+from generate_embedding.chunkers import iter_text_chunks
+from utilities.metrics import render_prometheus
+from workflow.context_packer import CONTEXT_TOKENS_SAVED, overlap_length, pack_context
+from workflow.summary_handler import _prepare_summary_inputs
+
+TEXT = " ".join(f"Line item {i} reported revenue of {i * 37} thousand." for i in range(120))
+
+
+def file_chunks(path="/docs/report.pdf"):
+    return [
+        {"chunk_id": f"{path}-{i}", "chunk_index": i, "file_path": path, "file_name": path.rsplit("/", 1)[-1],
+         "content": text, "page_start": 1, "page_end": 1}
+        for i, (text, _, _) in enumerate(iter_text_chunks([(1, TEXT)]))
+    ]
+
+
+def test_overlap_length_finds_shared_boundary():
+    assert overlap_length("alpha beta gamma delta epsilon zeta eta", "gamma delta epsilon zeta eta theta") == 0
+    left = "x" * 10 + "the shared overlap text between both chunks"
+    right = "the shared overlap text between both chunks and more"
+    assert overlap_length(left, right) == len("the shared overlap text between both chunks")
+
+
+def test_adjacent_chunks_merge_without_duplicated_overlap():
+    chunks = file_chunks()[:4]
+    ranked = [chunks[2], chunks[0], chunks[1], chunks[3]]
+    saved_before = CONTEXT_TOKENS_SAVED.value()
+
+    context, used, stats = pack_context(ranked, budget=10_000)
+
+    assert stats["spans"] == 1 and len(used) == 4
+    assert context == "Document 1:\n" + TEXT[:len(context) - len("Document 1:\n")]
+    assert stats["saved_tokens"] > 0
+    # The saving is reported on /metrics, not just in the returned stats
+    assert CONTEXT_TOKENS_SAVED.value() == saved_before + stats["saved_tokens"]
+    assert "rag_context_tokens_saved_total " in render_prometheus()
+
+
+def test_budget_keeps_best_spans_and_metadata_follows():
+    chunks = file_chunks()
+    ranked = [chunks[5], chunks[0], chunks[9], chunks[9]]       # duplicate id retrieved twice
+    weather = {"chunk_id": "w", "file_name": "openweathermap", "content": "Sunny, 31°C", "file_path": ""}
+
+    context, used, stats = pack_context(ranked + [weather], budget=420)
+
+    # Two ~200-token chunks fit, the third does not, the tiny weather chunk still does
+    assert [c["chunk_id"] for c in used] == [chunks[5]["chunk_id"], chunks[0]["chunk_id"], "w"]
+    assert stats["context_tokens"] <= 420 < stats["raw_tokens"]
+
+    _, metadata = _prepare_summary_inputs(ranked)
+    assert metadata[0]["pages"] == [1]
@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+
+from utilities import embedding_batcher
+from utilities.embedding_batcher import aembed_texts, backoff_delay, count_tokens, make_batches
+
+
+class FakeEmbeddings:
+    def __init__(self, fail_first=0):
+        self.calls = []
+        self.fail_first = fail_first
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        if len(self.calls) <= self.fail_first:
+            request = httpx.Request("POST", "http://test/embeddings")
+            response = httpx.Response(429, headers={"retry-after": "0"}, request=request)
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        # Return out of order to check that results are re-sorted by index
+        data = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(input)]
+        return SimpleNamespace(data=list(reversed(data)))
+
+
+def test_batches_respect_item_and_token_caps():
+    texts = ["word " * 50] * 10
+
+    per_text = count_tokens(texts[:1])[0]
+
+    by_items = make_batches(texts, max_tokens=10_000, max_items=3)
+    by_tokens = make_batches(texts, max_tokens=per_text * 2, max_items=100)
+
+    assert [len(b) for b in by_items] == [3, 3, 3, 1]
+    assert [len(b) for b in by_tokens] == [2] * 5
+    assert sum(by_tokens, []) == list(range(10))
+
+
+def test_embeddings_come_back_in_input_order(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "embedding_cache", None)
+    fake = FakeEmbeddings()
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+    vectors = asyncio.run(aembed_texts(texts, client=SimpleNamespace(embeddings=fake), max_items=2))
+
+    assert vectors == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+    assert len(fake.calls) == 3
+
+
+def test_rate_limited_batch_is_retried(monkeypatch):
+    monkeypatch.setattr(embedding_batcher, "EMBED_BACKOFF_BASE", 0.001)
+    monkeypatch.setattr(embedding_batcher, "embedding_cache", None)
+    fake = FakeEmbeddings(fail_first=2)
+
+    vectors = asyncio.run(aembed_texts(["x", "yy"], client=SimpleNamespace(embeddings=fake)))
+
+    assert vectors == [[1.0], [2.0]]
+    assert len(fake.calls) == 3
+
+
+def test_backoff_honours_retry_after():
+    request = httpx.Request("POST", "http://test/embeddings")
+    response = httpx.Response(429, headers={"retry-after": "7"}, request=request)
+    error = openai.RateLimitError("rate limited", response=response, body=None)
+
+    assert backoff_delay(0, error) >= 7
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from utilities import embedding_batcher
+from utilities.embedding_batcher import aembed_texts
+from utilities.embedding_cache import EmbeddingCache, cache_key
+
+
+def test_key_ignores_whitespace_but_not_model():
+    assert cache_key("  net   income\n", "ada") == cache_key("net income", "ada")
+    assert cache_key("net income", "ada") != cache_key("net income", "small-3")
+
+
+def test_memory_then_disk_tier(tmp_path):
+    path = str(tmp_path / "emb.sqlite3")
+    cache = EmbeddingCache(path=path, memory_items=1)
+
+    cache.put("a", [0.5, 1.0], "ada")
+    cache.put("b", [2.0, 3.0], "ada")   # pushes "a" out of memory
+
+    assert cache.get("b", "ada") == [2.0, 3.0]
+    assert cache.get("a", "ada") == [0.5, 1.0]
+    assert cache.get("c", "ada") is None
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["disk_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+    # A second process sees the same disk tier
+    other = EmbeddingCache(path=path)
+    assert other.get("b", "ada") == [2.0, 3.0]
+
+
+def test_memory_tier_holds_float32_and_returns_lists(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"))
+    cache.put("a", [0.5] * 1536, "ada")
+
+    stored = next(iter(cache._memory.values()))
+    assert stored.typecode == "f" and stored.itemsize * len(stored) == 1536 * 4
+    vector = cache.get("a", "ada")
+    assert isinstance(vector, list) and vector == [0.5] * 1536
+    vector[0] = 9.0     # callers get a copy, not the cached row
+    assert cache.get("a", "ada")[0] == 0.5
+
+
+def test_async_lookups_do_disk_io_off_the_event_loop(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"), memory_items=1)
+    cache.put("a", [0.5], "ada")
+    cache.put("b", [1.5], "ada")     # "a" now only on disk
+    disk_threads = []
+    read_disk, write_disk = cache._read_disk, cache._write_disk
+    cache._read_disk = lambda keys: disk_threads.append(threading.get_ident()) or read_disk(keys)
+    cache._write_disk = lambda rows: disk_threads.append(threading.get_ident()) or write_disk(rows)
+
+    async def lookups():
+        return (await cache.aget("b", "ada"), await cache.aget("a", "ada"),
+                await cache.aput("c", [2.5], "ada"))
+
+    assert asyncio.run(lookups())[:2] == ([1.5], [0.5])
+    # The memory hit needed no disk access; the disk read and write ran on worker threads
+    assert len(disk_threads) == 2 and threading.get_ident() not in disk_threads
+    assert EmbeddingCache(path=cache.path).get("c", "ada") == [2.5]
+
+
+def test_disk_tier_is_evicted_by_size(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"), memory_items=0, max_bytes=64 * 1024)
+
+    for i in range(200):
+        cache.put(f"text {i}", [float(i)] * 256, "ada")
+
+    count, = cache._db().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    assert count < 200
+    assert cache.get("text 199", "ada") is not None
+
+
+def test_batcher_only_embeds_cache_misses(tmp_path):
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"))
+    cache.put("known", [9.0], "ada")
+    sent = []
+
+    async def create(model, input):
+        sent.extend(input)
+        return SimpleNamespace(data=[SimpleNamespace(index=i, embedding=[1.0]) for i in range(len(input))])
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    vectors = asyncio.run(aembed_texts(["known", "new"], model="ada", client=client, cache=cache))
+
+    assert vectors == [[9.0], [1.0]]
+    assert sent == ["new"]
+    assert cache.get("new", "ada") == [1.0]
+
+
+def test_batcher_uses_the_current_module_cache(tmp_path, monkeypatch):
+    cache = EmbeddingCache(path=str(tmp_path / "emb.sqlite3"))
+    cache.put("known", [9.0], "ada")
+    monkeypatch.setattr(embedding_batcher, "embedding_cache", cache)
+
+    async def create(model, input):
+        raise AssertionError("cached text was sent upstream")
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    assert asyncio.run(aembed_texts(["known"], model="ada", client=client)) == [[9.0]]
@@ -0,0 +1,67 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-import budgets in seconds; override on slow CI hosts
+APP_IMPORT_BUDGET = float(os.getenv("APP_IMPORT_BUDGET", "0.6"))
+STREAMLIT_IMPORT_BUDGET = float(os.getenv("STREAMLIT_IMPORT_BUDGET", "3.0"))
+
+# Loaded on first request / during warm-up, never by the import itself
+DEFERRED_MODULES = [
+    "workflow.rag_workflow", "langgraph", "langchain_core", "langchain_openai", "openai",
+    "azure.search.documents", "azure.identity", "tiktoken", "numpy",
+]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def _cold_import(module):
+    """Import ``module`` in a fresh interpreter; returns (seconds, deferred modules it loaded)."""
+    code = PROBE.format(module=module, deferred=DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True,
+                            timeout=120, check=True)
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    return report["seconds"], report["loaded"]
+
+
+def test_app_import_is_light_and_within_budget():
+    seconds, loaded = _cold_import("app")
+
+    assert loaded == []
+    assert seconds < APP_IMPORT_BUDGET, f"import app took {seconds:.2f}s (budget {APP_IMPORT_BUDGET}s)"
+
+
+def test_streamlit_app_import_is_light_and_within_budget():
+    pytest.importorskip("streamlit")
+    seconds, _ = _cold_import("streamlit_app")
+
+    # The pipeline itself loads in the background warm-up thread, so only the budget is checked
+    assert seconds < STREAMLIT_IMPORT_BUDGET, f"import streamlit_app took {seconds:.2f}s (budget {STREAMLIT_IMPORT_BUDGET}s)"
+
+
+def test_warm_up_loads_the_search_sdk():
+    # Left for the first PDF request, these imports cost ~0.3 s inside its latency
+    code = (
+        "import json, sys\n"
+        "import workflow.rag_workflow as rag_workflow\n"
+        "rag_workflow.warm_up()\n"
+        "print(json.dumps([m for m in ('azure.search.documents.aio', 'azure.search.documents.models')"
+        " if m in sys.modules]))\n"
+    )
+    env = dict(os.environ, RETRIEVAL_BACKEND="azure")
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True,
+                            timeout=120, check=True)
+
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == [
+        "azure.search.documents.aio", "azure.search.documents.models"]
@@ -0,0 +1,154 @@
+from generate_embedding.index_manifest import IndexManifest, file_hash, make_chunk_id, source_digest
+
+
+def test_chunk_ids_are_stable_and_content_sensitive():
+    a = make_chunk_id("docs/report.pdf", 1, "Revenue grew 10%")
+
+    assert a == make_chunk_id("docs/report.pdf", 1, "Revenue grew 10%")
+    assert a != make_chunk_id("docs/report.pdf", 1, "Revenue grew 12%")
+    assert a != make_chunk_id("docs/report.pdf", 2, "Revenue grew 10%")
+    assert a != make_chunk_id("docs/other.pdf", 1, "Revenue grew 10%")
+
+
+def test_chunk_ids_ignore_how_the_path_was_spelled(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    assert make_chunk_id("docs/report.pdf", 1, "x") == make_chunk_id(str(tmp_path / "docs" / "report.pdf"), 1, "x")
+    assert make_chunk_id("./docs/report.pdf", 1, "x") == make_chunk_id("docs/report.pdf", 1, "x")
+
+
+def test_manifest_tracks_files_and_chunks(tmp_path):
+    pdf = tmp_path / "report.pdf"
+    pdf.write_bytes(b"%PDF-1.4 v1")
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+
+    digest = file_hash(str(pdf))
+    assert not manifest.is_file_unchanged(str(pdf), digest)
+
+    manifest.add_chunks([{"chunk_id": "a", "file_path": str(pdf)}, {"chunk_id": "b", "file_path": str(pdf)}])
+    manifest.mark_file(str(pdf), digest)
+
+    assert manifest.is_file_unchanged(str(pdf), digest)
+    assert manifest.chunk_ids(str(pdf)) == {"a", "b"}
+
+    pdf.write_bytes(b"%PDF-1.4 v2")
+    assert not manifest.is_file_unchanged(str(pdf), file_hash(str(pdf)))
+
+    manifest.remove_chunks(["a"])
+    assert manifest.forget_file(str(pdf)) == ["b"]
+    assert manifest.indexed_files() == set()
+
+
+def test_schema_hash_survives_reset(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.set_schema_hash("abc")
+    manifest.add_chunks([{"chunk_id": "a", "file_path": "x.pdf"}])
+
+    manifest.reset()
+
+    assert manifest.get_schema_hash() == "abc"
+    assert manifest.chunk_ids("x.pdf") == set()
+
+
+def test_incremental_upload_syncs_only_changes(tmp_path, monkeypatch):
+    import utilities.index_generation as index_generation
+    import utilities.vector_store as vector_store
+    from generate_embedding import embed_pdf
+    from generate_embedding.pdf_extraction import ExtractionFailed
+    from utilities.vector_store import IndexResult, LocalIndexClient, LocalVectorStore
+
+    monkeypatch.setattr(embed_pdf, "RETRIEVAL_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(index_generation, "INDEX_GENERATION_PATH", str(tmp_path / "generation"))
+
+    rejected, broken = set(), set()
+
+    class FlakyIndexClient(LocalIndexClient):
+        async def merge_or_upload_documents(self, documents):
+            accepted = [d for d in documents if d["chunk_text"] not in rejected]
+            results = await super().upload_documents(accepted)
+            return results + [IndexResult(d["chunk_id"], succeeded=False, status_code=400, error_message="bad")
+                              for d in documents if d["chunk_text"] in rejected]
+
+    monkeypatch.setattr(embed_pdf, "LocalIndexClient", FlakyIndexClient)
+
+    embedded = []
+
+    async def fake_embed(texts):
+        embedded.extend(texts)
+        return [[1.0, float(len(t))] for t in texts]
+
+    def extract_many(paths):
+        for path in paths:
+            if path in broken:
+                yield path, ExtractionFailed("damaged")
+                continue
+            with open(path) as f:
+                lines = f.read().splitlines()
+            yield path, [{"chunk_id": make_chunk_id(path, i, text), "file_path": path, "chunk_text": text}
+                         for i, text in enumerate(lines, start=1)]
+
+    def sync(paths, prune=False, chunking="lines"):
+        embedded.clear()
+        return embed_pdf.incremental_upload(paths, manifest, prune=prune, extract_many=extract_many, embed=fake_embed,
+                                            chunking=chunking)
+
+    def stored_texts():
+        return sorted(c["chunk_text"] for c in LocalVectorStore().load().chunks)
+
+    a, b, c = (str(tmp_path / name) for name in ("a.txt", "b.txt", "c.txt"))
+    for path, text in ((a, "A1\nA2"), (b, "B1"), (c, "C1")):
+        with open(path, "w") as f:
+            f.write(text)
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+
+    sync([a, b, c])
+    assert stored_texts() == ["A1", "A2", "B1", "C1"]
+
+    # Unchanged files are skipped, an edited one uploads only its new chunk, a removed one is pruned
+    with open(a, "w") as f:
+        f.write("A1\nA2 edited")
+    progress = sync([a, b], prune=True)
+    assert embedded == ["A2 edited"]
+    assert progress.uploaded == 1 and not progress.failed
+    assert stored_texts() == ["A1", "A2 edited", "B1"]
+    assert manifest.indexed_files() == {a, b}
+    assert len(manifest.chunk_ids(a)) == 2
+
+    # New chunker settings re-extract files whose bytes did not change
+    extracted = []
+    plain_extract = extract_many
+
+    def extract_many(paths):
+        extracted.extend(paths)
+        return plain_extract(paths)
+
+    sync([a, b], chunking="lines-v2")
+    assert extracted == [a, b]
+    extracted.clear()
+    sync([a, b], chunking="lines-v2")
+    assert extracted == []
+    sync([a, b])
+
+    # A rejected upload keeps the file "changed" so the next run retries just that chunk
+    rejected.add("B2")
+    with open(b, "w") as f:
+        f.write("B1\nB2")
+    progress = sync([a, b])
+    assert [f["key"] for f in progress.failed] == [make_chunk_id(b, 2, "B2")]
+    assert not manifest.is_file_unchanged(b, source_digest(b, "lines"))
+
+    rejected.clear()
+    sync([a, b])
+    assert embedded == ["B2"]
+    assert stored_texts() == ["A1", "A2 edited", "B1", "B2"]
+    assert manifest.is_file_unchanged(b, source_digest(b, "lines"))
+
+    # A file that fails to extract must not lose what is already indexed for it
+    broken.add(a)
+    with open(a, "w") as f:
+        f.write("garbled")
+    progress = sync([a, b])
+    assert [f["key"] for f in progress.failed] == [a]
+    assert stored_texts() == ["A1", "A2 edited", "B1", "B2"]
+    assert not manifest.is_file_unchanged(a, source_digest(a, "lines"))
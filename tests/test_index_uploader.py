@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+from generate_embedding import index_uploader
+from generate_embedding.index_uploader import aindex_chunks
+
+
+class FakeSearchClient:
+    def __init__(self, flaky_keys=(), broken_keys=()):
+        self.flaky_keys = set(flaky_keys)
+        self.broken_keys = set(broken_keys)
+        self.batches = []
+        self.active = 0
+        self.max_active = 0
+
+    async def upload_documents(self, documents):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.01)
+        self.active -= 1
+
+        self.batches.append([d["chunk_id"] for d in documents])
+        results = []
+        for d in documents:
+            key = d["chunk_id"]
+            if key in self.broken_keys:
+                results.append(SimpleNamespace(key=key, succeeded=False, status_code=400, error_message="bad"))
+            elif key in self.flaky_keys:
+                self.flaky_keys.discard(key)
+                results.append(SimpleNamespace(key=key, succeeded=False, status_code=503, error_message="busy"))
+            else:
+                results.append(SimpleNamespace(key=key, succeeded=True, status_code=201, error_message=None))
+        return results
+
+
+async def fake_embed(texts):
+    return [[float(len(t))] for t in texts]
+
+
+def make_chunks(n):
+    for i in range(n):
+        yield {"chunk_id": f"c{i}", "chunk_text": "x" * i}
+
+
+def test_chunks_are_uploaded_in_bounded_batches():
+    client = FakeSearchClient()
+
+    progress = asyncio.run(aindex_chunks(make_chunks(25), client, batch_size=10, max_inflight=2, embed=fake_embed))
+
+    assert sorted(len(b) for b in client.batches) == [5, 10, 10]
+    assert client.max_active <= 2
+    assert progress.summary()["uploaded"] == 25
+    assert progress.failed == []
+
+
+def test_transient_document_failures_are_retried(monkeypatch):
+    monkeypatch.setattr(index_uploader, "UPLOAD_BACKOFF_BASE", 0.001)
+    client = FakeSearchClient(flaky_keys={"c1", "c3"}, broken_keys={"c4"})
+
+    progress = asyncio.run(aindex_chunks(make_chunks(5), client, batch_size=5, embed=fake_embed))
+
+    assert client.batches[1] == ["c1", "c3"]
+    assert progress.uploaded == 4
+    assert progress.retried == 2
+    assert [f["key"] for f in progress.failed] == ["c4"]
+
+
+def test_a_failing_batch_is_reported_and_the_rest_still_upload():
+    client = FakeSearchClient()
+
+    async def embed(texts):
+        if "x" * 12 in texts:
+            raise RuntimeError("embedding retries exhausted")
+        return await fake_embed(texts)
+
+    progress = asyncio.run(aindex_chunks(make_chunks(25), client, batch_size=10, max_inflight=2, embed=embed))
+
+    # Batch c10..c19 failed as a whole; the batches around it were uploaded
+    assert sorted(k for b in client.batches for k in b) == sorted([f"c{i}" for i in range(10)] + [f"c{i}" for i in range(20, 25)])
+    assert [f["key"] for f in progress.failed] == [f"c{i}" for i in range(10, 20)]
+    assert "embedding retries exhausted" in progress.failed[0]["error"]
+    assert progress.uploaded == 15
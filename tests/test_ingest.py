@@ -0,0 +1,154 @@
+import fitz
+
+import utilities.index_generation as index_generation
+import utilities.vector_store as vector_store
+from generate_embedding import embed_pdf, index_manifest, index_uploader
+from generate_embedding.chunkers import chunker_config
+from generate_embedding.index_manifest import IndexManifest, source_digest
+from generate_embedding.ingest import crawl, main, parallel_extractor, subfolder_of
+from generate_embedding.chunkers import iter_text_chunks
+from generate_embedding.pdf_extraction import ExtractionFailed, extract_pdf_chunks, stream_pdf_chunks
+
+
+def make_pdf(path, text):
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), text)
+    doc.save(str(path))
+
+
+def test_crawl_and_parallel_extraction_fill_metadata(tmp_path):
+    (tmp_path / "2023" / "q4").mkdir(parents=True)
+    make_pdf(tmp_path / "annual.pdf", "Total revenue 100")
+    make_pdf(tmp_path / "2023" / "q4" / "interim.PDF", "Net income 20")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    paths = crawl(str(tmp_path))
+    assert [p.rsplit("/", 1)[-1] for p in paths] == ["annual.pdf", "interim.PDF"]
+
+    extract_many = parallel_extractor(str(tmp_path), "filings", workers=2)
+    results = {path: list(docs) for path, docs in extract_many(paths)}
+
+    interim = results[paths[1]][0]
+    assert interim["subfolder"] == "2023/q4"
+    assert interim["file_extension"] == ".pdf"
+    assert interim["source_system"] == "filings"
+    assert "Net income 20" in interim["chunk_text"]
+    assert results[paths[0]][0]["subfolder"] == ""
+
+
+def test_subfolder_of_root_file_is_empty(tmp_path):
+    assert subfolder_of(str(tmp_path / "a.pdf"), str(tmp_path)) == ""
+
+
+def test_chunks_stream_across_pages_with_page_range():
+    pages = [(1, "A" * 500), (2, "B" * 500), (3, "C" * 900)]
+
+    chunks = list(iter_text_chunks(pages, size=800, overlap=200))
+
+    assert [(start, end) for _, start, end in chunks] == [(1, 2), (2, 3), (3, 3)]
+    assert all(len(text) <= 800 for text, _, _ in chunks)
+    # Consecutive windows overlap by 200 characters
+    assert chunks[0][0][-200:] == chunks[1][0][:200]
+
+
+def test_pdf_chunks_record_pages(tmp_path):
+    doc = fitz.open()
+    for word in ("Revenue", "Expenses", "Net income"):
+        doc.new_page().insert_text((72, 72), f"{word} " * 40)
+    doc.save(str(tmp_path / "report.pdf"))
+
+    chunks = extract_pdf_chunks(str(tmp_path / "report.pdf"))
+
+    assert chunks[0]["page_start"] == 1
+    assert chunks[-1]["page_end"] == 3
+    assert {c["total_chunks"] for c in chunks} == {len(chunks)}
+
+
+def test_streamed_and_pooled_extraction_agree_and_clean_up(tmp_path):
+    root, spill = tmp_path / "docs", tmp_path / "spill"
+    root.mkdir()
+    spill.mkdir()
+    doc = fitz.open()
+    for _ in range(3):
+        doc.new_page().insert_text((72, 72), "\n".join(["Revenue grew ten percent this quarter."] * 50), fontsize=8)
+    doc.save(str(root / "report.pdf"))
+    path = str(root / "report.pdf")
+
+    streamed = list(stream_pdf_chunks(path, "filings", spill_dir=str(spill)))
+    pooled = [list(docs) for _, docs in parallel_extractor(str(root), "filings", workers=1)([path])][0]
+
+    assert len(streamed) > 1
+    assert {c["total_chunks"] for c in streamed} == {c["total_chunks"] for c in pooled} == {len(streamed)}
+    assert [c["chunk_id"] for c in streamed] == [c["chunk_id"] for c in pooled]
+    assert list(spill.iterdir()) == []
+
+
+async def fake_embed(texts):
+    return [[1.0, float(len(t))] for t in texts]
+
+
+def test_failed_extraction_keeps_indexed_chunks_and_is_retried(tmp_path, monkeypatch):
+    monkeypatch.setattr(embed_pdf, "RETRIEVAL_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(index_generation, "INDEX_GENERATION_PATH", str(tmp_path / "generation"))
+    root = tmp_path / "docs"
+    root.mkdir()
+    pdf = root / "annual.pdf"
+    make_pdf(pdf, "Total revenue 100")
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    extract_many = parallel_extractor(str(root), "filings", workers=1)
+
+    progress = embed_pdf.incremental_upload([str(pdf)], manifest, extract_many=extract_many, embed=fake_embed)
+    assert progress.uploaded == 1 and not progress.failed
+
+    pdf.write_bytes(b"not a pdf any more")
+    progress = embed_pdf.incremental_upload([str(pdf)], manifest, extract_many=extract_many, embed=fake_embed)
+
+    assert [f["key"] for f in progress.failed] == [str(pdf)]
+    assert isinstance(dict(extract_many([str(pdf)]))[str(pdf)], ExtractionFailed)
+    # Nothing was orphaned, and the file stays "changed" for the next run
+    assert len(vector_store.LocalVectorStore().load()) == 1
+    assert len(manifest.chunk_ids(str(pdf))) == 1
+    assert not manifest.is_file_unchanged(str(pdf), source_digest(str(pdf), chunker_config()))
+
+
+def test_relative_and_absolute_paths_index_the_same_file_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(embed_pdf, "RETRIEVAL_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(index_generation, "INDEX_GENERATION_PATH", str(tmp_path / "generation"))
+    monkeypatch.chdir(tmp_path)
+    make_pdf(tmp_path / "annual.pdf", "Total revenue 100")
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+
+    # embed_pdf.py passes a relative PDF_PATH, ingest.py absolute crawl paths
+    embed_pdf.incremental_upload(["annual.pdf"], manifest, embed=fake_embed)
+    progress = embed_pdf.incremental_upload([str(tmp_path / "annual.pdf")], manifest, embed=fake_embed, prune=True)
+
+    assert progress.uploaded == 0
+    assert manifest.indexed_files() == {str(tmp_path / "annual.pdf")}
+    chunks = vector_store.LocalVectorStore().load().chunks
+    assert len(chunks) == 1 and chunks[0]["file_path"] == str(tmp_path / "annual.pdf")
+
+
+def test_ingesting_a_second_root_keeps_the_first_roots_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(embed_pdf, "RETRIEVAL_BACKEND", "local")
+    monkeypatch.setattr(vector_store, "LOCAL_VECTOR_STORE_PATH", str(tmp_path / "store"))
+    monkeypatch.setattr(index_generation, "INDEX_GENERATION_PATH", str(tmp_path / "generation"))
+    monkeypatch.setattr(index_manifest, "MANIFEST_PATH", str(tmp_path / "manifest.sqlite3"))
+    monkeypatch.setattr(index_uploader, "aembed_texts", fake_embed)
+    for name, text in (("filings", "Total revenue 100"), ("memos", "Net income 20")):
+        (tmp_path / name).mkdir()
+        make_pdf(tmp_path / name / f"{name}.pdf", text)
+
+    def stored_files():
+        return sorted(c["file_name"] for c in vector_store.LocalVectorStore().load().chunks)
+
+    assert main([str(tmp_path / "filings"), "--workers", "1"]) == 0
+    make_pdf(tmp_path / "memos" / "old.pdf", "Old memo")
+    assert main([str(tmp_path / "memos"), "--workers", "1"]) == 0
+    assert stored_files() == ["filings.pdf", "memos.pdf", "old.pdf"]
+
+    # Pruning only looks under the root being ingested
+    (tmp_path / "memos" / "old.pdf").unlink()
+    assert main([str(tmp_path / "memos"), "--workers", "1", "--prune"]) == 0
+    assert stored_files() == ["filings.pdf", "memos.pdf"]
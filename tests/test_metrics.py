@@ -0,0 +1,121 @@
+import asyncio
+import uuid
+
+import pytest
+from langchain_core.outputs import ChatGeneration, LLMResult
+from langchain_core.messages import AIMessage, HumanMessage
+
+import workflow.rag_workflow as rag_workflow
+from utilities.create_llm_client import stream_usage_enabled
+from utilities.metrics import (
+    LLM_TOKENS,
+    LLM_TOKENS_ESTIMATED,
+    NODE_LATENCY,
+    UPSTREAM_ERRORS,
+    UPSTREAM_LATENCY,
+    LLMMetricsHandler,
+    counter,
+    histogram,
+    render_prometheus,
+    upstream_timer,
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    latency = histogram("test_latency_seconds", "Test latency.", ["op"], buckets=(0.1, 1.0))
+    latency.observe(0.05, op="a")
+    latency.observe(0.5, op="a")
+    latency.observe(5, op="a")
+    hits = counter("test_hits_total", "Test hits.", ["cache"])
+    hits.inc(cache="x")
+    hits.inc(2, cache="x")
+
+    text = render_prometheus()
+
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{op="a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{op="a",le="1.0"} 2' in text
+    assert 'test_latency_seconds_bucket{op="a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{op="a"} 3' in text
+    assert 'test_hits_total{cache="x"} 3' in text
+    with pytest.raises(ValueError):
+        hits.inc(other="y")
+
+
+def test_upstream_timer_records_latency_and_errors():
+    @upstream_timer("test_sync")
+    def fails():
+        raise RuntimeError("down")
+
+    @upstream_timer("test_async")
+    async def works():
+        return "ok"
+
+    with pytest.raises(RuntimeError):
+        fails()
+    assert asyncio.run(works()) == "ok"
+
+    assert UPSTREAM_LATENCY.count(call="test_sync") == 1
+    assert UPSTREAM_ERRORS.value(call="test_sync") == 1
+    assert UPSTREAM_LATENCY.count(call="test_async") == 1
+    assert UPSTREAM_ERRORS.value(call="test_async") == 0
+
+
+def test_llm_handler_counts_tokens():
+    handler = LLMMetricsHandler()
+    before = LLM_TOKENS.value(kind="prompt"), LLM_TOKENS.value(kind="completion")
+    calls = UPSTREAM_LATENCY.count(call="llm")
+
+    # Non-streamed: usage in llm_output
+    run_id = uuid.uuid4()
+    handler.on_chat_model_start({}, [[]], run_id=run_id)
+    handler.on_llm_end(LLMResult(generations=[[]], llm_output={
+        "token_usage": {"prompt_tokens": 100, "completion_tokens": 20}}), run_id=run_id)
+
+    # Streamed: usage on the message
+    run_id = uuid.uuid4()
+    handler.on_chat_model_start({}, [[]], run_id=run_id)
+    message = AIMessage(content="hi", usage_metadata={"input_tokens": 10, "output_tokens": 2, "total_tokens": 12})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+
+    assert LLM_TOKENS.value(kind="prompt") == before[0] + 110
+    assert LLM_TOKENS.value(kind="completion") == before[1] + 22
+    assert UPSTREAM_LATENCY.count(call="llm") == calls + 2
+
+
+def test_llm_handler_estimates_tokens_when_a_stream_reports_none():
+    handler = LLMMetricsHandler()
+    before = LLM_TOKENS.value(kind="prompt"), LLM_TOKENS.value(kind="completion")
+    estimated = LLM_TOKENS_ESTIMATED.value(kind="completion")
+
+    run_id = uuid.uuid4()
+    handler.on_chat_model_start({}, [[HumanMessage(content="Summarize the revenue section")]], run_id=run_id)
+    message = AIMessage(content="Revenue rose 10% to 5 million.")
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=run_id)
+
+    assert LLM_TOKENS.value(kind="prompt") > before[0]
+    assert LLM_TOKENS.value(kind="completion") > before[1]
+    assert LLM_TOKENS_ESTIMATED.value(kind="completion") == estimated + LLM_TOKENS.value(kind="completion") - before[1]
+
+
+def test_stream_usage_follows_the_api_version():
+    assert stream_usage_enabled("auto", "2024-10-21")
+    assert stream_usage_enabled("auto", "2025-01-01-preview")
+    assert not stream_usage_enabled("auto", "2024-06-01")
+    assert not stream_usage_enabled("auto", None)
+    assert stream_usage_enabled("1", "2024-06-01")
+    assert not stream_usage_enabled("0", "2024-10-21")
+
+
+def test_graph_nodes_are_timed(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "orchestration_logic",
+                        lambda q: {"data_type": "weather", "city": "Indore"})
+    monkeypatch.setattr(rag_workflow, "weather_api", lambda q, c, k: [{"content": "sunny"}])
+    monkeypatch.setattr(rag_workflow, "summary_logic",
+                        lambda chunks, query: {"summary": "Sunny", "metadata": []})
+    before = NODE_LATENCY.count(node="weather_handler")
+
+    rag_workflow.rag_app_builder().invoke({"query": "weather in Indore"})
+
+    assert NODE_LATENCY.count(node="weather_handler") == before + 1
+    assert 'rag_single_flight_calls_total{group="pipeline"}' in render_prometheus()
@@ -0,0 +1,69 @@
+import pytest
+
+from workflow.orchestration_agent import orchestration_logic
+from workflow.query_router import fast_route, get_route_stats, ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_weather_query_with_known_city():
+    decision = fast_route("weather in Pune")
+
+    assert decision["data_type"] == "weather"
+    assert decision["city"] == "Pune"
+    assert decision["confidence"] >= ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_multi_word_city_prefers_longest_name():
+    assert fast_route("temperature in New Delhi today")["city"] == "New Delhi"
+
+
+def test_financial_query_routes_to_pdf():
+    decision = fast_route("What was the total revenue in the income statement?")
+
+    assert decision["data_type"] == "pdf"
+    assert decision["confidence"] >= ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_ambiguous_query_falls_below_threshold():
+    assert fast_route("What is the revenue forecast?")["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+    assert fast_route("Tell me something")["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_unknown_place_is_left_to_llm():
+    assert fast_route("weather in Timbuktu")["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+    assert fast_route("weather in springfield")["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_lower_case_known_city_is_resolved():
+    decision = fast_route("is it raining in pune")
+
+    assert decision["city"] == "Pune"
+    assert decision["confidence"] >= ROUTER_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("query", [
+    "What is the company's exposure to climate risk?",
+    "What were the cold storage costs?",
+    "How did the storm affect operations?",
+    "What was the wind-down cost of the subsidiary?",
+    "Which segment is running hot",
+])
+def test_finance_questions_with_weather_words_are_left_to_llm(query):
+    assert fast_route(query)["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+
+
+@pytest.mark.parametrize("query", [
+    "temp staffing costs in Pune",
+    "hot selling products in Mumbai",
+    "storm of layoffs in Bangalore",
+])
+def test_ambiguous_weather_words_with_known_city_are_left_to_llm(query):
+    assert fast_route(query)["confidence"] < ROUTER_CONFIDENCE_THRESHOLD
+
+
+def test_orchestration_records_rules_stage():
+    before = get_route_stats()["rules"]
+
+    result = orchestration_logic("temperature in Indore")
+
+    assert result == {"data_type": "weather", "city": "Indore", "route_stage": "rules"}
+    assert get_route_stats()["rules"] == before + 1
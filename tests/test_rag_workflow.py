@@ -0,0 +1,247 @@
+import asyncio
+import threading
+
+import pytest
+
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import PromptTemplate
+
+import workflow.rag_workflow as rag_workflow
+import workflow.summary_handler as summary_handler
+from workflow.rag_workflow import get_rag_app
+
+
+@pytest.fixture(autouse=True)
+def no_answer_cache(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "answer_cache", None)
+
+
+def test_rag_app_is_compiled_once():
+    apps = []
+    threads = [threading.Thread(target=lambda: apps.append(get_rag_app())) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len({id(a) for a in apps}) == 1
+    assert get_rag_app() is apps[0]
+
+
+def test_async_orchestrator_runs_async_nodes(monkeypatch):
+    async def route(query):
+        return {"data_type": "weather", "city": "Pune"}
+
+    async def weather(query, city, api_key):
+        return [{"content": f"weather for {city}", "file_name": "openweathermap"}]
+
+    async def summarize(chunks, query):
+        return {"summary": chunks[0]["content"], "metadata": []}
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "aweather_api", weather)
+    monkeypatch.setattr(rag_workflow, "asummary_logic", summarize)
+
+    result = asyncio.run(rag_workflow.arag_agent_orchestrator("weather in Pune"))
+
+    assert result == {"summary": "weather for Pune", "metadata": []}
+
+
+def test_stream_emits_route_retrieval_tokens_and_done(monkeypatch):
+    fake_llm = GenericFakeChatModel(messages=iter([AIMessage(content="net income rose")]))
+    chain = PromptTemplate.from_template(summary_handler.SUMMARY_PROMPT) | fake_llm | StrOutputParser()
+
+    async def route(query):
+        return {"data_type": "pdf", "city": None}
+
+    async def search(query):
+        return [{"content": "Net income: 120", "file_name": "report.pdf"}]
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "ahybrid_search_logic", search)
+    monkeypatch.setattr(summary_handler, "get_summary_chain", lambda: chain)
+
+    async def collect():
+        return [e async for e in rag_workflow.astream_rag_agent_orchestrator("net income?")]
+
+    events = asyncio.run(collect())
+    kinds = [e["event"] for e in events]
+
+    assert kinds[0] == "route" and kinds[1] == "retrieval" and kinds[-1] == "done"
+    assert "".join(e["text"] for e in events if e["event"] == "token") == "net income rose"
+    assert events[-1]["summary"] == "net income rose"
+
+
+def test_batch_embeds_pdf_queries_once_and_limits_concurrency(monkeypatch):
+    embed_calls, active, peak = [], [0], [0]
+
+    async def route(query):
+        if "weather" in query:
+            return {"data_type": "weather", "city": "Pune", "route_stage": "rules"}
+        if "broken" in query:
+            raise RuntimeError("router down")
+        return {"data_type": "pdf", "city": None, "route_stage": "rules"}
+
+    async def embed(texts):
+        embed_calls.append(list(texts))
+        return [[float(i)] for i in range(len(texts))]
+
+    async def search(query, embedding_vector=None):
+        assert embedding_vector is not None
+        return [{"content": f"{query} -> {embedding_vector}", "file_name": "report.pdf"}]
+
+    async def weather(query, city, api_key):
+        return [{"content": f"weather for {city}", "file_name": "openweathermap"}]
+
+    async def summarize(chunks, query):
+        active[0] += 1
+        peak[0] = max(peak[0], active[0])
+        await asyncio.sleep(0.01)
+        active[0] -= 1
+        return {"summary": chunks[0]["content"], "metadata": []}
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "aembed_texts", embed)
+    monkeypatch.setattr(rag_workflow, "ahybrid_search_logic", search)
+    monkeypatch.setattr(rag_workflow, "aweather_api", weather)
+    monkeypatch.setattr(rag_workflow, "asummary_logic", summarize)
+
+    queries = [f"net income q{i}" for i in range(6)] + ["weather in Pune", "broken query"]
+    items = rag_workflow.batch_rag_agent_orchestrator(queries, max_concurrency=2)
+
+    assert [item["index"] for item in items] == list(range(len(queries)))
+    assert embed_calls == [queries[:6]]
+    assert items[3]["result"]["summary"] == "net income q3 -> [3.0]"
+    assert items[6]["result"]["summary"] == "weather for Pune"
+    assert items[7]["error"] == "router down"
+    assert peak[0] <= 2
+
+
+def test_speculative_search_overlaps_routing(monkeypatch):
+    started = []
+
+    async def route(query):
+        await asyncio.sleep(0.05)
+        # The search is already running while the router decides
+        assert started == [query]
+        return {"data_type": "pdf", "city": None}
+
+    async def search(query):
+        started.append(query)
+        return [{"content": "Net income: 120", "file_name": "report.pdf"}]
+
+    async def summarize(chunks, query):
+        return {"summary": chunks[0]["content"], "metadata": []}
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "ahybrid_search_logic", search)
+    monkeypatch.setattr(rag_workflow, "asummary_logic", summarize)
+    used = rag_workflow.SPECULATIVE_SEARCHES.value(outcome="used")
+
+    app = rag_workflow.rag_app_builder(speculative=True)
+    state = asyncio.run(app.ainvoke({"query": "tell me about it"}))
+
+    assert state["final_answer"] == "Net income: 120" and started == ["tell me about it"]
+    assert rag_workflow.SPECULATIVE_SEARCHES.value(outcome="used") == used + 1
+    assert not rag_workflow._speculations
+
+
+def test_speculative_search_is_dropped_for_weather(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "orchestration_logic", lambda q: {"data_type": "weather", "city": "Pune"})
+    monkeypatch.setattr(rag_workflow, "hybrid_search_logic", lambda q: pytest.fail("result must not be used"))
+    monkeypatch.setattr(rag_workflow, "weather_api", lambda q, c, k: [{"content": f"weather for {c}"}])
+    monkeypatch.setattr(rag_workflow, "summary_logic", lambda chunks, query: {"summary": chunks[0]["content"], "metadata": []})
+    before = {o: rag_workflow.SPECULATIVE_SEARCHES.value(outcome=o) for o in ("cancelled", "discarded")}
+
+    state = rag_workflow.rag_app_builder(speculative=True).invoke({"query": "is it nice out there?"})
+
+    assert state["final_answer"] == "weather for Pune"
+    wasted = sum(rag_workflow.SPECULATIVE_SEARCHES.value(outcome=o) - before[o] for o in before)
+    assert wasted == 1 and not rag_workflow._speculations
+
+
+def test_speculation_is_dropped_when_the_run_ends_early(monkeypatch):
+    gate = threading.Event()
+
+    def search(query):
+        gate.wait(5)
+        return [{"content": "Net income: 120"}]
+
+    monkeypatch.setattr(rag_workflow, "orchestration_logic", lambda q: {"data_type": "pdf", "city": None})
+    monkeypatch.setattr(rag_workflow, "hybrid_search_logic", search)
+    monkeypatch.setattr(rag_workflow, "_rag_app", rag_workflow.rag_app_builder(speculative=True))
+    abandoned = rag_workflow.SPECULATIVE_SEARCHES.value(outcome="abandoned")
+
+    # The client disconnects right after the route event
+    events = rag_workflow.stream_rag_agent_orchestrator("tell me about it")
+    assert next(events)["event"] == "route"
+    assert len(rag_workflow._speculations) == 1
+    events.close()
+    gate.set()
+
+    assert not rag_workflow._speculations
+    assert rag_workflow.SPECULATIVE_SEARCHES.value(outcome="abandoned") == abandoned + 1
+
+    # A node failing before retrieval leaves nothing behind either
+    monkeypatch.setattr(rag_workflow, "_take_speculation", lambda speculation_id: 1 / 0)
+    with pytest.raises(ZeroDivisionError):
+        rag_workflow.rag_agent_orchestrator("tell me about it")
+    assert not rag_workflow._speculations
+
+
+def test_confident_routes_do_not_speculate(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "hybrid_search_logic", lambda q: [{"content": "Revenue: 10"}])
+    monkeypatch.setattr(rag_workflow, "summary_logic", lambda chunks, query: {"summary": "ok", "metadata": []})
+    before = rag_workflow.SPECULATIVE_SEARCHES.value(outcome="used")
+
+    rag_workflow.rag_app_builder(speculative=True).invoke({"query": "summarize the revenue section of the report"})
+
+    assert rag_workflow.SPECULATIVE_SEARCHES.value(outcome="used") == before
+
+
+def _weather_chunks(query, city, api_key):
+    report = {"city": city, "condition": "light rain", "temperature": 24, "humidity": 88}
+    return [{"content": "Weather report", "file_name": "openweathermap", "weather": report}]
+
+
+def test_plain_weather_answer_skips_the_summary(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "orchestration_logic", lambda q: {"data_type": "weather", "city": "Pune"})
+    monkeypatch.setattr(rag_workflow, "weather_api", _weather_chunks)
+    monkeypatch.setattr(rag_workflow, "summary_logic", lambda chunks, query: pytest.fail("LLM summary called"))
+
+    result = rag_workflow.rag_agent_orchestrator("weather in Pune")
+
+    assert result["summary"] == "Current weather in Pune: light rain, 24°C with 88% humidity."
+    assert result["metadata"][0]["file_name"] == "openweathermap"
+
+
+def test_weather_questions_needing_reasoning_are_summarized(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "orchestration_logic", lambda q: {"data_type": "weather", "city": "Pune"})
+    monkeypatch.setattr(rag_workflow, "weather_api", _weather_chunks)
+    monkeypatch.setattr(rag_workflow, "summary_logic",
+                        lambda chunks, query: {"summary": "Yes, take an umbrella.", "metadata": []})
+
+    result = rag_workflow.rag_agent_orchestrator("should I carry an umbrella in Pune?")
+
+    assert result["summary"] == "Yes, take an umbrella."
+
+
+def test_stream_of_templated_weather_answer(monkeypatch):
+    async def route(query):
+        return {"data_type": "weather", "city": "Pune"}
+
+    async def weather(query, city, api_key):
+        return _weather_chunks(query, city, api_key)
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "aweather_api", weather)
+
+    async def collect():
+        return [e async for e in rag_workflow.astream_rag_agent_orchestrator("weather in Pune")]
+
+    events = asyncio.run(collect())
+
+    assert [e["event"] for e in events] == ["route", "retrieval", "token", "done"]
+    assert events[-1]["summary"] == events[2]["text"]
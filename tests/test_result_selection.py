@@ -0,0 +1,42 @@
+from workflow.result_selection import cut_by_score, mmr_select, query_k, select_chunks
+
+
+def chunk(i, score, content=None):
+    return {"chunk_id": f"c{i}", "score": score, "content": content or f"unique topic number {i} text"}
+
+
+def test_k_grows_with_query_breadth():
+    easy = query_k("net income")
+    broad = query_k("compare revenue and EBITDA margin trend between 2022 and 2023")
+    assert easy == 2
+    assert broad > easy
+
+
+def test_conjunctions_do_not_make_a_query_broad():
+    assert query_k("revenue and margin in Q3") == query_k("revenue margin in Q3")
+    assert query_k("all revenue in Q3") == query_k("revenue in Q3")
+    assert query_k("compare revenue and margin in Q3") > query_k("revenue and margin in Q3")
+
+
+def test_cut_at_score_gap_and_ratio():
+    chunks = [chunk(0, 0.9), chunk(1, 0.88), chunk(2, 0.86), chunk(3, 0.4), chunk(4, 0.39)]
+    assert [c["chunk_id"] for c in cut_by_score(chunks, min_keep=2)] == ["c0", "c1", "c2"]
+
+    # The minimum is kept even across a gap
+    assert len(cut_by_score([chunk(0, 1.0), chunk(1, 0.1)], min_keep=2)) == 2
+
+
+def test_mmr_skips_near_duplicates():
+    text = "accounts receivable increased to 4200 due to slower collections in the fourth quarter"
+    chunks = [chunk(0, 0.95, text), chunk(1, 0.94, text + " overall"), chunk(2, 0.80, "dividend approved per share")]
+
+    picked = mmr_select(chunks, k=2)
+
+    assert [c["chunk_id"] for c in picked] == ["c0", "c2"]
+
+
+def test_select_chunks_sends_fewer_chunks_for_easy_lookups():
+    candidates = [chunk(i, 1.0 - i * 0.01) for i in range(20)]
+
+    assert len(select_chunks("net income", candidates)) == 2
+    assert len(select_chunks("list all expenses and compare each quarter", candidates)) == 8
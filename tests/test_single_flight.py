@@ -0,0 +1,93 @@
+import asyncio
+import threading
+import time
+
+import workflow.rag_workflow as rag_workflow
+from utilities.single_flight import SingleFlight, get_single_flight_stats
+
+
+def test_threads_share_one_execution():
+    flight = SingleFlight("test-threads")
+    calls = []
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", work))) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == ["value"] * 6 and len(calls) == 1
+    assert get_single_flight_stats()["test-threads"] == {"calls": 6, "executions": 1, "saved": 5}
+    # Finished keys run again
+    assert flight.do("k", lambda: "fresh") == "fresh"
+
+
+def test_coroutines_share_result_and_errors():
+    flight = SingleFlight("test-async")
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(*[flight.ado("k", work) for _ in range(4)], return_exceptions=True)
+
+    errors = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("test-cancel")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return 42
+
+    async def run():
+        first = asyncio.ensure_future(flight.ado("k", work))
+        second = asyncio.ensure_future(flight.ado("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == 42
+
+
+def test_identical_concurrent_queries_run_the_pipeline_once(monkeypatch):
+    monkeypatch.setattr(rag_workflow, "answer_cache", None)
+    routed = []
+
+    async def route(query):
+        routed.append(query)
+        await asyncio.sleep(0.05)
+        return {"data_type": "weather", "city": "Pune"}
+
+    async def weather(query, city, api_key):
+        return [{"content": f"weather for {city}", "file_name": "openweathermap"}]
+
+    async def summarize(chunks, query):
+        return {"summary": chunks[0]["content"], "metadata": []}
+
+    monkeypatch.setattr(rag_workflow, "aorchestration_logic", route)
+    monkeypatch.setattr(rag_workflow, "aweather_api", weather)
+    monkeypatch.setattr(rag_workflow, "asummary_logic", summarize)
+
+    async def run():
+        return await asyncio.gather(*[rag_workflow.arag_agent_orchestrator(q)
+                                      for q in ["Weather in Pune?", "weather in pune"] * 3])
+
+    results = asyncio.run(run())
+
+    assert len(routed) == 1
+    assert all(r == {"summary": "weather for Pune", "metadata": []} for r in results)
+    assert results[0] is not results[1]
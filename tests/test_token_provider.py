@@ -0,0 +1,66 @@
+import threading
+import time
+
+from utilities.create_llm_client import KongTokenProvider
+
+
+def make_fetch(expires_in=3600, delay=0.0):
+    calls = []
+
+    def fetch(client_id, client_secret):
+        calls.append(time.monotonic())
+        time.sleep(delay)
+        return f"token-{len(calls)}", expires_in
+
+    return fetch, calls
+
+
+def test_token_is_cached_until_expiry():
+    fetch, calls = make_fetch()
+    provider = KongTokenProvider("id", "secret", refresh_margin=60, fetch=fetch)
+
+    assert provider() == "token-1"
+    assert provider() == "token-1"
+    assert len(calls) == 1
+
+
+def test_concurrent_callers_share_one_fetch():
+    fetch, calls = make_fetch(delay=0.05)
+    provider = KongTokenProvider("id", "secret", refresh_margin=60, fetch=fetch)
+
+    tokens = []
+    threads = [threading.Thread(target=lambda: tokens.append(provider())) for _ in range(20)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert set(tokens) == {"token-1"}
+
+
+def test_token_inside_margin_is_refreshed_in_background():
+    fetch, calls = make_fetch()
+    provider = KongTokenProvider("id", "secret", refresh_margin=60, fetch=fetch)
+
+    assert provider() == "token-1"
+    # Move into the refresh margin: the old token is still valid, so it is
+    # served while a refresh runs
+    provider._refresh_at = time.monotonic() - 1
+    assert provider() == "token-1"
+
+    deadline = time.monotonic() + 2
+    while provider._token == "token-1" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert provider._token == "token-2"
+
+
+def test_short_lived_token_is_not_refetched_on_every_call():
+    # expires_in is below the refresh margin; the margin is clamped to half the lifetime
+    fetch, calls = make_fetch(expires_in=60)
+    provider = KongTokenProvider("id", "secret", refresh_margin=120, fetch=fetch)
+
+    assert [provider() for _ in range(5)] == ["token-1"] * 5
+    time.sleep(0.05)
+    assert len(calls) == 1
@@ -0,0 +1,107 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+import workflow.search_handler as search_handler
+from generate_embedding.index_uploader import aindex_chunks
+from utilities.vector_store import LocalIndexClient, LocalVectorStore
+from workflow.retrieval_backends import LocalVectorBackend
+
+
+def doc(i, vector, **extra):
+    return {"chunk_id": f"c{i}", "file_name": "report.pdf", "chunk_text": f"chunk {i}",
+            "file_path": "/docs/report.pdf", "page_start": i, "page_end": i, "embedding": vector, **extra}
+
+
+@pytest.mark.parametrize("dtype", ["float32", "int8"])
+def test_top_k_matches_brute_force(tmp_path, dtype):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 32)).astype(np.float32)
+    store = LocalVectorStore(path=str(tmp_path / "store"), dtype=dtype)
+    store.upsert([doc(i, v) for i, v in enumerate(vectors)])
+    store.save()
+
+    query = rng.normal(size=32)
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(unit @ (query / np.linalg.norm(query))))[:5]
+
+    reopened = LocalVectorStore(path=str(tmp_path / "store")).load()
+    hits = reopened.search(query, top=5)
+
+    assert isinstance(reopened._vectors, np.memmap)
+    assert [h[1]["chunk_id"] for h in hits][:3] == [f"c{i}" for i in expected][:3]
+    assert hits[0][0] >= hits[-1][0]
+
+
+def test_upsert_delete_and_reload(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path / "store"))
+    store.upsert([doc(0, [1, 0]), doc(1, [0, 1])])
+    store.save()
+
+    store.upsert([doc(0, [0, 1], chunk_text="updated")])
+    store.delete(["c1"])
+    store.save()
+
+    assert len(store) == 1
+    score, meta = store.search([0, 1], top=5)[0]
+    assert meta["chunk_text"] == "updated" and score == pytest.approx(1.0)
+
+
+def test_upload_pipeline_fills_the_store_and_backend_serves_it(tmp_path, monkeypatch):
+    store = LocalVectorStore(path=str(tmp_path / "store"))
+
+    async def embed(texts):
+        return [[1.0, float(i)] for i in range(len(texts))]
+
+    chunks = [doc(i, None) for i in range(4)]
+    progress = asyncio.run(aindex_chunks(iter(chunks), LocalIndexClient(store),
+                                         action="merge_or_upload", batch_size=2, embed=embed))
+    store.save()
+
+    assert progress.uploaded == 4 and not progress.failed
+
+    backend = LocalVectorBackend(LocalVectorStore(path=str(tmp_path / "store")))
+    monkeypatch.setattr(search_handler, "get_retrieval_backend", lambda: backend)
+    monkeypatch.setattr(search_handler, "get_embedding", lambda query: [1.0, 0.0])
+
+    chunks = search_handler.hybrid_search_logic("net income")
+
+    assert [c["chunk_id"] for c in chunks][0] in {"c0", "c2"}
+    assert set(chunks[0]) == {"chunk_id", "file_name", "content", "file_path", "page_start", "page_end", "chunk_index", "score"}
+
+
+def test_backend_swaps_in_a_new_store_on_index_change(tmp_path, monkeypatch):
+    import workflow.retrieval_backends as retrieval_backends
+
+    writer = LocalVectorStore(path=str(tmp_path / "store"))
+    writer.upsert([doc(0, [1, 0])])
+    writer.save()
+    monkeypatch.setattr(retrieval_backends, "current_index_generation", lambda: "g1")
+    backend = LocalVectorBackend(LocalVectorStore(path=writer.path), keyword_weight=0)
+    assert [c["chunk_id"] for c in backend.search("q", [1, 0])] == ["c0"]
+    before = backend.store
+
+    writer.upsert([doc(1, [0, 1])])
+    writer.save()
+    monkeypatch.setattr(retrieval_backends, "current_index_generation", lambda: "g2")
+
+    assert {c["chunk_id"] for c in backend.search("q", [0, 1])} == {"c0", "c1"}
+    # Searches still holding the old store keep a consistent (vectors, chunks) pair
+    assert backend.store is not before and [m["chunk_id"] for m in before.chunks] == ["c0"]
+
+
+def test_local_asearch_runs_off_the_event_loop(tmp_path):
+    store = LocalVectorStore(path=str(tmp_path / "store"))
+    store.upsert([doc(0, [1, 0])])
+    store.save()
+    backend = LocalVectorBackend(LocalVectorStore(path=store.path), keyword_weight=0)
+    threads = []
+    search = backend.search
+    backend.search = lambda *args: threads.append(threading.get_ident()) or search(*args)
+
+    chunks = asyncio.run(backend.asearch("q", [1, 0], 5))
+
+    assert [c["chunk_id"] for c in chunks] == ["c0"]
+    assert threads and threads[0] != threading.get_ident()
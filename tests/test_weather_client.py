@@ -0,0 +1,135 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import workflow.weather_api_handler as weather
+from workflow.weather_api_handler import WeatherCache
+
+PAYLOAD = {"weather": [{"description": "clear sky"}], "main": {"temp": 31, "humidity": 40}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(weather, "weather_cache", WeatherCache(ttl=60, stale_ttl=600, clock=clock))
+    return clock
+
+
+def test_concurrent_lookups_for_one_city_share_a_request(monkeypatch, clock):
+    calls = []
+
+    def fetch(city, api_key):
+        calls.append(city)
+        time.sleep(0.1)
+        return PAYLOAD
+
+    monkeypatch.setattr(weather, "_fetch_weather", fetch)
+
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(weather.weather_api("q", c, "key")))
+               for c in ["Pune", "pune ", " PUNE"] * 3]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all("clear sky" in r[0]["content"] for r in results)
+
+
+def test_stale_entry_is_served_while_refreshing(monkeypatch, clock):
+    refreshed = threading.Event()
+    payloads = iter([PAYLOAD, {**PAYLOAD, "weather": [{"description": "light rain"}]}])
+
+    def fetch(city, api_key):
+        data = next(payloads)
+        if data is not PAYLOAD:
+            refreshed.set()
+        return data
+
+    monkeypatch.setattr(weather, "_fetch_weather", fetch)
+
+    assert weather.get_weather("Pune", "key") is PAYLOAD
+    clock.now = 120                                   # past the TTL, within stale_ttl
+    assert weather.get_weather("Pune", "key") is PAYLOAD
+    assert refreshed.wait(2)
+    time.sleep(0.05)
+    assert weather.get_weather("Pune", "key")["weather"][0]["description"] == "light rain"
+
+
+def test_failed_lookups_are_not_cached(monkeypatch, clock):
+    def fetch(city, api_key):
+        raise weather.WeatherFetchError('{"cod": "404", "message": "city not found"}')
+
+    monkeypatch.setattr(weather, "_fetch_weather", fetch)
+
+    chunks = weather.weather_api("q", "Atlantis", "key")
+    assert weather.is_weather_error(chunks[0])
+    assert weather.weather_cache.lookup("atlantis") == (None, False)
+
+
+def test_async_lookups_collapse_and_hit_cache(monkeypatch, clock):
+    calls = []
+
+    class FakeResponse:
+        status_code = 200
+
+        def json(self):
+            return PAYLOAD
+
+    class FakeClient:
+        async def get(self, url, params):
+            calls.append(params["q"])
+            await asyncio.sleep(0.05)
+            return FakeResponse()
+
+    monkeypatch.setattr(weather, "get_async_weather_client", lambda: FakeClient())
+
+    async def run():
+        first = await asyncio.gather(*[weather.aweather_api("q", "Pune", "key") for _ in range(10)])
+        again = await weather.aweather_api("q", "Pune", "key")
+        return first, again
+
+    first, again = asyncio.run(run())
+
+    assert calls == ["Pune"]
+    assert "clear sky" in again[0]["content"]
+
+
+def test_plain_lookups_render_from_template(monkeypatch, clock):
+    monkeypatch.setattr(weather, "_fetch_weather", lambda city, api_key: PAYLOAD)
+    chunks = weather.weather_api("temperature in Pune", "Pune", "key")
+
+    assert weather.render_weather_answer("temperature in Pune", chunks) == \
+        "Current weather in Pune: clear sky, 31°C with 40% humidity."
+    # Advice and anything beyond current conditions go to the LLM
+    assert weather.render_weather_answer("Should I carry an umbrella in Pune?", chunks) is None
+    assert weather.render_weather_answer("weather in Pune tomorrow", chunks) is None
+    # So do failed lookups, which carry no structured report
+    assert weather.render_weather_answer("weather in Pune", [{"content": "Exception occurred: timeout"}]) is None
+
+
+@pytest.mark.parametrize("query", [
+    "Will it rain in Pune?",
+    "Is it going to rain in Delhi?",
+    "Will it be sunny in Goa?",
+    "Is rain expected in Mumbai?",
+    "Weather in Pune over the next few hours",
+])
+def test_future_tense_questions_need_the_llm(query):
+    assert weather.needs_weather_reasoning(query)
+
+
+def test_current_conditions_do_not_need_the_llm():
+    assert not weather.needs_weather_reasoning("Is it raining in Pune right now?")
+    assert not weather.needs_weather_reasoning("temperature in Pune")
@@ -0,0 +1,146 @@
+"""
+In-process BM25 keyword index.
+
+Postings are stored CSR-style in flat NumPy arrays (offsets, doc ids,
+term frequencies) plus a term -> id vocabulary, and are memory-mapped
+at query time. Document ids are row numbers, so an index built from the
+LocalVectorStore's chunks lines up with its vector rows.
+"""
+import json
+import math
+import os
+import re
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:[.&'][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it",
+    "of", "on", "or", "that", "the", "this", "to", "was", "were", "what", "which", "with",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-case word tokens without stopwords; a plain plural "s" is folded."""
+    tokens = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an array-backed inverted index."""
+
+    def __init__(self, vocabulary, offsets, doc_ids, term_freqs, doc_lengths):
+        self.vocabulary = vocabulary          # term -> term id
+        self.offsets = offsets                # (V+1,) int64, postings of term t are [offsets[t], offsets[t+1])
+        self.doc_ids = doc_ids                # (P,) int32
+        self.term_freqs = term_freqs          # (P,) float32
+        self.doc_lengths = doc_lengths        # (N,) float32
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    @classmethod
+    def build(cls, texts: List[str]):
+        postings = {}                         # term -> [(doc id, tf)]
+        lengths = []
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        terms = sorted(postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        for i, term in enumerate(terms):
+            offsets[i + 1] = offsets[i] + len(postings[term])
+        pairs = [pair for term in terms for pair in postings[term]]
+        doc_ids = np.array([d for d, _ in pairs], dtype=np.int32)
+        term_freqs = np.array([tf for _, tf in pairs], dtype=np.float32)
+
+        return cls({t: i for i, t in enumerate(terms)}, offsets, doc_ids, term_freqs,
+                   np.array(lengths, dtype=np.float32))
+
+    # ------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------
+    def save(self, path: str):
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        np.save(os.path.join(path, "doc_ids.npy"), self.doc_ids)
+        np.save(os.path.join(path, "term_freqs.npy"), self.term_freqs)
+        np.save(os.path.join(path, "doc_lengths.npy"), self.doc_lengths)
+        with open(os.path.join(path, "vocabulary.json"), "w") as f:
+            json.dump(self.vocabulary, f)
+
+    @classmethod
+    def load(cls, path: str):
+        """Map a saved index; returns None when there is none."""
+        if not os.path.exists(os.path.join(path, "vocabulary.json")):
+            return None
+        with open(os.path.join(path, "vocabulary.json")) as f:
+            vocabulary = json.load(f)
+        arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+                  for name in ("offsets", "doc_ids", "term_freqs", "doc_lengths")]
+        return cls(vocabulary, *arrays)
+
+    # ------------------------------------------------------------
+    # Scoring
+    # ------------------------------------------------------------
+    def scores(self, query: str, k1: float = None, b: float = None) -> np.ndarray:
+        """BM25 score of every document for ``query`` (zeros when nothing matches)."""
+        k1 = BM25_K1 if k1 is None else k1
+        b = BM25_B if b is None else b
+        n_docs = len(self.doc_lengths)
+        scores = np.zeros(n_docs, dtype=np.float32)
+        if not n_docs:
+            return scores
+
+        norm = k1 * (1 - b + b * np.asarray(self.doc_lengths) / max(self.avg_length, 1e-9))
+        for term, weight in Counter(tokenize(query)).items():
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = int(self.offsets[term_id]), int(self.offsets[term_id + 1])
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            idf = math.log(1 + (n_docs - (end - start) + 0.5) / ((end - start) + 0.5))
+            # Doc ids are unique within one posting list, so fancy-index += is safe
+            scores[docs] += weight * idf * tf * (k1 + 1) / (tf + norm[docs])
+        return scores
+
+    def top(self, query: str, top: int = 5):
+        """Return (doc ids, scores) of the best ``top`` matching documents, best first."""
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores)
+        if not len(matched) or top <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        if len(matched) > top:
+            matched = matched[np.argpartition(-scores[matched], top - 1)[:top]]
+        matched = matched[np.argsort(-scores[matched])]
+        return matched, scores[matched]
+
+
+def reciprocal_rank_fusion(rankings, weights=None, k: int = 60):
+    """
+    Fuse ranked id lists: score(d) = sum_i weight_i / (k + rank_i(d)).
+    Returns (id, fused score) pairs, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,11 @@
+"""
+Process configuration.
+
+``.env`` is read once, here, by the first module that needs settings;
+entry points import this before anything else so every module-level
+``os.getenv`` sees it. Variables already set in the environment win, so
+container settings aren't overridden by a stray ``.env`` file.
+"""
+from dotenv import load_dotenv
+
+load_dotenv(override=False)
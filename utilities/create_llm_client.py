@@ -1,9 +1,16 @@
-from dotenv import load_dotenv
-load_dotenv(override=True) 
+import utilities.config  # noqa: F401  (loads .env once)
 import os, requests
-from langchain_openai import AzureChatOpenAI
+import asyncio
+import threading
+import time
 import json
-from openai import AzureOpenAI
+from utilities.loop_local import loop_local
+from utilities.embedding_cache import embedding_cache, cache_key
+from utilities.single_flight import SingleFlight
+from utilities import metrics
+from utilities.metrics import get_logger, upstream_timer
+
+logger = get_logger("llm_client")
 
 class Config:
     kong_client_id=os.getenv("kong_client_id")
@@ -13,13 +20,41 @@ class Config:
     api_deployment_name=os.getenv("api_deployment_name")
     url =os.getenv("url")
     embedding_model = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
-    
+    # Refresh the cached token this many seconds before it expires
+    token_refresh_margin = int(os.getenv("KONG_TOKEN_REFRESH_MARGIN", "120"))
+    # Used when the IdP response carries no expires_in
+    token_default_ttl = int(os.getenv("KONG_TOKEN_DEFAULT_TTL", "3600"))
+    # Ask for token usage on streamed completions too: "1" on, "0" off, unset/"auto"
+    # on only for API versions with stream_options (older ones reject the request).
+    # Streams without it still get locally estimated token counts on /metrics.
+    llm_stream_usage = os.getenv("LLM_STREAM_USAGE", "auto")
+
 
 config = Config()
 
-def get_kong_token_with_client_id_and_client_secret(client_id, client_secret):
-    # Endpoint URL
-    # url = os.getenv("KONG_ENDPOINT_URL")
+
+# Azure OpenAI accepts stream_options from this api_version on
+STREAM_OPTIONS_API_VERSION = "2024-09-01"
+
+
+def stream_usage_enabled(setting=None, api_version=None) -> bool:
+    setting = (config.llm_stream_usage if setting is None else setting).lower()
+    if setting in ("1", "0"):
+        return setting == "1"
+    api_version = config.api_version if api_version is None else api_version
+    return bool(api_version) and api_version[:10] >= STREAM_OPTIONS_API_VERSION
+
+
+# One pooled session for every token request
+_token_session = requests.Session()
+
+
+@upstream_timer("token")
+def request_kong_token(client_id, client_secret):
+    """
+    POST the client-credentials grant and return (access_token, expires_in).
+    Returns (None, 0) when the IdP rejects the request.
+    """
     headers = {
         'Content-Type': 'application/x-www-form-urlencoded',
     }
@@ -31,41 +66,214 @@ def get_kong_token_with_client_id_and_client_secret(client_id, client_secret):
         'scope': 'openid email profile'
     }
     # Make a POST request
-    response = requests.post(config.url, headers=headers, data=data)
-    #if response fails 
+    response = _token_session.post(config.url, headers=headers, data=data)
+    #if response fails
     if not response.ok:
-        # Print response status code and content if something went wrong
-        print(f"Error: {response.status_code}")
-        print(response.text)
-    # Check if the request was successful
-    if response.ok:
-        dict_of_response_text=json.loads(response.text)
-        return dict_of_response_text["access_token"]
-    
+        logger.error("event=token_request_failed status=%s body=%r", response.status_code, response.text)
+        return None, 0
+    dict_of_response_text=json.loads(response.text)
+    expires_in = int(dict_of_response_text.get("expires_in") or config.token_default_ttl)
+    return dict_of_response_text["access_token"], expires_in
+
+
+def get_kong_token_with_client_id_and_client_secret(client_id, client_secret):
+    token, _ = request_kong_token(client_id, client_secret)
+    return token
+
+
+# ============================================================
+# Process-wide token cache
+# ============================================================
+class KongTokenProvider:
+    """
+    Caches the Kong access token until shortly before it expires.
+
+    Inside the refresh margin the cached token is still returned and a single
+    background thread fetches the replacement. Only an expired (or missing)
+    token makes callers wait, and then only one of them hits the IdP.
+    """
+
+    def __init__(self, client_id, client_secret, refresh_margin=None, fetch=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_margin = config.token_refresh_margin if refresh_margin is None else refresh_margin
+        self._fetch = fetch or request_kong_token
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
+        self._refresh_at = 0.0
+        self._refreshing = False
+
+    def __call__(self):
+        return self.get_token()
+
+    def get_token(self):
+        now = time.monotonic()
+        token, expires_at = self._token, self._expires_at
+
+        if token and now < self._refresh_at:
+            return token
+
+        if token and now < expires_at:
+            self._refresh_in_background()
+            return token
+
+        with self._lock:
+            if not self._token or time.monotonic() >= self._expires_at:
+                self._refresh()
+            return self._token
+
+    async def aget_token(self):
+        """Async variant: cached tokens are returned inline, cold fetches run off-loop."""
+        token, expires_at = self._token, self._expires_at
+        now = time.monotonic()
+
+        if token and now < expires_at:
+            if now >= self._refresh_at:
+                self._refresh_in_background()
+            return token
+
+        return await asyncio.to_thread(self.get_token)
+
+    def invalidate(self):
+        with self._lock:
+            self._token = None
+            self._expires_at = 0.0
+            self._refresh_at = 0.0
+
+    def _refresh(self):
+        # Caller must hold self._lock
+        token, expires_in = self._fetch(self.client_id, self.client_secret)
+        if token:
+            # Short-lived tokens would sit inside the margin from the start and
+            # hit the IdP on every call, so never refresh before half their lifetime
+            margin = min(self.refresh_margin, expires_in // 2)
+            now = time.monotonic()
+            self._token = token
+            self._expires_at = now + expires_in
+            self._refresh_at = now + expires_in - margin
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def worker():
+            try:
+                with self._lock:
+                    if time.monotonic() >= self._refresh_at:
+                        self._refresh()
+            except Exception as e:
+                logger.warning("event=token_refresh_failed error=%r", e)
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=worker, name="kong-token-refresh", daemon=True).start()
+
+
+token_provider = KongTokenProvider(config.kong_client_id, config.kong_client_secret)
+
+
+# ============================================================
+# Shared clients
+# ============================================================
+_client_lock = threading.Lock()
+_llm_client = None
+_embedding_client = None
+
 
 def create_llm_client():
-    bearer_access_token = get_kong_token_with_client_id_and_client_secret(client_id =config.kong_client_id, 
-                                                          client_secret=config.kong_client_secret)
-    llm = AzureChatOpenAI(
-    temperature= 0,
-    api_version=config.api_version,
-    azure_endpoint=config.kong_base_url,
-    azure_ad_token=bearer_access_token,
-    model=config.api_deployment_name
+    """Return the shared AzureChatOpenAI client (built on first use)."""
+    global _llm_client
+    if _llm_client is None:
+        with _client_lock:
+            if _llm_client is None:
+                # Imported on first use: langchain_openai/openai are slow to import
+                from langchain_openai import AzureChatOpenAI
+                _llm_client = AzureChatOpenAI(
+                    temperature= 0,
+                    api_version=config.api_version,
+                    azure_endpoint=config.kong_base_url,
+                    azure_ad_token_provider=token_provider,
+                    azure_ad_async_token_provider=token_provider.aget_token,
+                    model=config.api_deployment_name,
+                    stream_usage=stream_usage_enabled(),
+                    callbacks=[metrics.LLMMetricsHandler()],
+                )
+    return _llm_client
+
+
+def get_embedding_client():
+    """Return the shared AzureOpenAI client used for embeddings."""
+    global _embedding_client
+    if _embedding_client is None:
+        with _client_lock:
+            if _embedding_client is None:
+                from openai import AzureOpenAI
+                _embedding_client = AzureOpenAI(
+                    api_version=config.api_version,
+                    azure_endpoint=config.kong_base_url,
+                    azure_ad_token_provider=token_provider,
+                )
+    return _embedding_client
+
+
+@loop_local
+def get_async_embedding_client():
+    """Return the AsyncAzureOpenAI embeddings client shared on the current event loop."""
+    from openai import AsyncAzureOpenAI
+    return AsyncAzureOpenAI(
+        api_version=config.api_version,
+        azure_endpoint=config.kong_base_url,
+        azure_ad_token_provider=token_provider.aget_token,
     )
-    return llm
 
-def get_embedding(query):
 
-    embedding_client = AzureOpenAI(
-    api_version=config.api_version,
-    azure_endpoint=config.kong_base_url,
-    azure_ad_token=get_kong_token_with_client_id_and_client_secret(
-        config.kong_client_id, config.kong_client_secret),)
-    
-    emb = embedding_client.embeddings.create(
+# Identical texts embedded concurrently share one request
+embedding_flight = SingleFlight("embedding")
+
+
+@upstream_timer("embedding")
+def _embed_and_cache(query):
+    emb = get_embedding_client().embeddings.create(
         model=config.embedding_model,
         input=query
     ).data[0].embedding
 
+    if embedding_cache:
+        embedding_cache.put(query, emb, config.embedding_model)
     return emb
+
+
+def get_embedding(query):
+
+    if embedding_cache:
+        cached = embedding_cache.get(query, config.embedding_model)
+        if cached is not None:
+            return cached
+
+    return embedding_flight.do(cache_key(query, config.embedding_model), lambda: _embed_and_cache(query))
+
+
+@upstream_timer("embedding")
+async def _aembed_and_cache(query):
+    response = await get_async_embedding_client().embeddings.create(
+        model=config.embedding_model,
+        input=query
+    )
+
+    emb = response.data[0].embedding
+    if embedding_cache:
+        await embedding_cache.aput(query, emb, config.embedding_model)
+    return emb
+
+
+async def aget_embedding(query):
+
+    if embedding_cache:
+        cached = await embedding_cache.aget(query, config.embedding_model)
+        if cached is not None:
+            return cached
+
+    return await embedding_flight.ado(cache_key(query, config.embedding_model), lambda: _aembed_and_cache(query))
@@ -0,0 +1,147 @@
+"""
+Batched embedding generation.
+
+Texts are packed into requests capped by item count and tiktoken token
+count, several requests are kept in flight at once, and 429/5xx
+responses are retried with jittered exponential backoff that honours
+Retry-After.
+"""
+import asyncio
+import os
+import random
+from typing import List
+
+from utilities.create_llm_client import config, get_async_embedding_client
+from utilities.tokens import count_tokens
+from utilities.embedding_cache import embedding_cache
+from utilities.metrics import get_logger, upstream_timer
+
+EMBED_BATCH_MAX_TOKENS = int(os.getenv("EMBED_BATCH_MAX_TOKENS", "32000"))
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "64"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+EMBED_BACKOFF_BASE = 1.0     # seconds
+EMBED_BACKOFF_CAP = 60.0     # seconds
+
+logger = get_logger("embedding_batcher")
+
+
+def make_batches(texts: List[str], max_tokens=None, max_items=None, model=None):
+    """
+    Split texts into consecutive batches of indexes, each under the token
+    and item caps. A single text over the token cap gets a batch of its own.
+    """
+    max_tokens = max_tokens or EMBED_BATCH_MAX_TOKENS
+    max_items = max_items or EMBED_BATCH_MAX_ITEMS
+
+    batches, current, current_tokens = [], [], 0
+    for i, n_tokens in enumerate(count_tokens(texts, model)):
+        if current and (current_tokens + n_tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(i)
+        current_tokens += n_tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+# ============================================================
+# Retry policy
+# ============================================================
+def _is_retryable(error: Exception) -> bool:
+    import openai       # already loaded by the client that raised
+    if isinstance(error, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_after(error: Exception):
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, error: Exception = None) -> float:
+    """Full-jitter exponential backoff, never shorter than Retry-After."""
+    delay = random.uniform(0, min(EMBED_BACKOFF_CAP, EMBED_BACKOFF_BASE * 2 ** attempt))
+    retry_after = _retry_after(error) if error is not None else None
+    return max(delay, retry_after or 0)
+
+
+@upstream_timer("embedding_batch")
+async def _embed_batch(client, texts: List[str], model: str):
+    for attempt in range(EMBED_MAX_RETRIES + 1):
+        try:
+            response = await client.embeddings.create(model=model, input=texts)
+            return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+        except Exception as e:
+            if attempt == EMBED_MAX_RETRIES or not _is_retryable(e):
+                raise
+            delay = backoff_delay(attempt, e)
+            logger.warning("event=embedding_retry error=%s delay=%.1f", type(e).__name__, delay)
+            await asyncio.sleep(delay)
+
+
+# ============================================================
+# Public API
+# ============================================================
+async def _aembed_uncached(texts: List[str], model: str, max_concurrency: int, max_tokens: int,
+                           max_items: int, client) -> List[List[float]]:
+    # Retries are handled here, with Retry-After, instead of by the SDK
+    client = client or get_async_embedding_client().with_options(max_retries=0)
+    semaphore = asyncio.Semaphore(max_concurrency or EMBED_MAX_CONCURRENCY)
+    results: List[List[float]] = [None] * len(texts)
+
+    async def run(indexes):
+        async with semaphore:
+            vectors = await _embed_batch(client, [texts[i] for i in indexes], model)
+        for i, vector in zip(indexes, vectors):
+            results[i] = vector
+
+    batches = make_batches(texts, max_tokens=max_tokens, max_items=max_items, model=model)
+    await asyncio.gather(*(run(indexes) for indexes in batches))
+    return results
+
+
+async def aembed_texts(texts: List[str], model: str = None, max_concurrency: int = None,
+                       max_tokens: int = None, max_items: int = None, client=None,
+                       cache=None) -> List[List[float]]:
+    """
+    Embed many texts, returning vectors in input order.
+    Texts already in ``cache`` (default: this module's ``embedding_cache``, looked
+    up per call so it can be swapped or set to None) are not sent upstream; new
+    vectors are added to it.
+    """
+    if not texts:
+        return []
+
+    model = model or config.embedding_model
+    cache = embedding_cache if cache is None else cache
+    found = await cache.aget_many(texts, model) if cache else {}
+    misses = [i for i in range(len(texts)) if i not in found]
+
+    if misses:
+        fresh = await _aembed_uncached([texts[i] for i in misses], model, max_concurrency,
+                                       max_tokens, max_items, client)
+        if cache:
+            await cache.aput_many([texts[i] for i in misses], fresh, model)
+        found.update(zip(misses, fresh))
+
+    return [found[i] for i in range(len(texts))]
+
+
+def embed_texts(texts: List[str], **kwargs) -> List[List[float]]:
+    """Synchronous wrapper around aembed_texts for scripts."""
+    return asyncio.run(aembed_texts(texts, **kwargs))
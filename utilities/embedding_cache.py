@@ -0,0 +1,230 @@
+"""
+Two-tier embedding cache.
+
+Tier 1 is a bounded in-process LRU of float32 arrays (a list of Python
+floats costs ~4x more per vector). Tier 2 is a SQLite file holding
+float32 vectors, shared by every API worker and the ingestion scripts on
+the host and evicted least-recently-used once it exceeds its byte
+budget. Entries are keyed by model name plus a hash of the normalized
+text.
+
+The ``a*`` methods serve memory hits inline and run SQLite reads and
+writes on a worker thread, so async callers never block the event loop
+on disk I/O.
+"""
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from utilities.metrics import get_logger
+
+EMBED_CACHE_ENABLED = os.getenv("EMBED_CACHE_ENABLED", "1") != "0"
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "2048"))
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+EMBED_CACHE_PATH = os.getenv(
+    "EMBED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "embeddings.sqlite3"),
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+logger = get_logger("embedding_cache")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(text: str, model: str) -> str:
+    return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """In-memory LRU in front of a size-bounded SQLite store."""
+
+    def __init__(self, path: str = None, memory_items: int = None, max_bytes: int = None):
+        self.path = path or EMBED_CACHE_PATH
+        self.memory_items = EMBED_CACHE_MEMORY_ITEMS if memory_items is None else memory_items
+        self.max_bytes = EMBED_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()        # memory tier and counters; never held across I/O
+        self._db_lock = threading.Lock()     # SQLite connection
+        self._conn = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------
+    # Disk tier
+    # ------------------------------------------------------------
+    def _db(self):
+        # Caller must hold self._db_lock
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings (last_used)")
+            self._conn.commit()
+        return self._conn
+
+    def _evict(self, db):
+        # Page accounting is O(1), unlike summing blob lengths
+        page_size, = db.execute("PRAGMA page_size").fetchone()
+        pages, = db.execute("PRAGMA page_count").fetchone()
+        free, = db.execute("PRAGMA freelist_count").fetchone()
+        size = (pages - free) * page_size
+        if size <= self.max_bytes:
+            return
+        count, = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        # Drop at least the least recently used tenth so eviction isn't run on every write
+        excess = int(count * max(0.1, 1 - self.max_bytes / size)) + 1
+        db.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+            (excess,),
+        )
+
+    def _read_disk(self, keys: List[str]):
+        """(key, blob) rows for the keys found on disk; bumps their last_used."""
+        with self._db_lock:
+            try:
+                db = self._db()
+                rows = []
+                for start in range(0, len(keys), 500):
+                    part = keys[start:start + 500]
+                    rows += db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                if rows:
+                    db.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?",
+                                   [(time.time(), key) for key, _ in rows])
+                    db.commit()
+                return rows
+            except sqlite3.Error as e:
+                logger.warning("event=disk_tier_unavailable error=%r", e)
+                return []
+
+    def _write_disk(self, rows):
+        with self._db_lock:
+            try:
+                db = self._db()
+                db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+                self._evict(db)
+                db.commit()
+            except sqlite3.Error as e:
+                logger.warning("event=disk_write_failed error=%r", e)
+
+    # ------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------
+    def _get_memory(self, texts: List[str], model: str):
+        """({position: vector} found in memory, {key: [positions]} still missing)."""
+        found, missing = {}, {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = cache_key(text, model)
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    found[i] = vector.tolist()
+                else:
+                    missing.setdefault(key, []).append(i)
+        return found, missing
+
+    def _merge_disk(self, found, missing, rows):
+        with self._lock:
+            for key, blob in rows:
+                vector = array("f", blob)
+                self._remember(key, vector)
+                values = vector.tolist()
+                for i in missing.pop(key):
+                    found[i] = values
+                    self.disk_hits += 1
+            self.misses += sum(len(positions) for positions in missing.values())
+        return found
+
+    def _put_memory(self, texts, vectors, model: str):
+        """Remember the vectors and return the rows to write to disk."""
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(text, model)
+                vector = array("f", vector)
+                self._remember(key, vector)
+                rows.append((key, model, vector.tobytes(), now))
+        return rows
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def get_many(self, texts: List[str], model: str) -> Dict[int, List[float]]:
+        """Return {position: vector} for every text found in either tier."""
+        found, missing = self._get_memory(texts, model)
+        if not missing:
+            return found
+        return self._merge_disk(found, missing, self._read_disk(list(missing)))
+
+    async def aget_many(self, texts: List[str], model: str) -> Dict[int, List[float]]:
+        found, missing = self._get_memory(texts, model)
+        if not missing:
+            return found
+        rows = await asyncio.to_thread(self._read_disk, list(missing))
+        return self._merge_disk(found, missing, rows)
+
+    def get(self, text: str, model: str) -> Optional[List[float]]:
+        return self.get_many([text], model).get(0)
+
+    async def aget(self, text: str, model: str) -> Optional[List[float]]:
+        return (await self.aget_many([text], model)).get(0)
+
+    def put_many(self, texts: List[str], vectors: List[List[float]], model: str):
+        self._write_disk(self._put_memory(texts, vectors, model))
+
+    async def aput_many(self, texts: List[str], vectors: List[List[float]], model: str):
+        await asyncio.to_thread(self._write_disk, self._put_memory(texts, vectors, model))
+
+    def put(self, text: str, vector: List[float], model: str):
+        self.put_many([text], [vector], model)
+
+    async def aput(self, text: str, vector: List[float], model: str):
+        await self.aput_many([text], [vector], model)
+
+    def _remember(self, key, vector):
+        # Caller must hold self._lock
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_items": len(self._memory),
+            }
+
+
+embedding_cache = EmbeddingCache() if EMBED_CACHE_ENABLED else None
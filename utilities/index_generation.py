@@ -0,0 +1,47 @@
+"""
+Index generation marker shared between ingestion and the API.
+
+Ingestion bumps it whenever the search index content changes; serving
+processes compare it to invalidate answers built from the old index.
+"""
+import os
+import threading
+import time
+import uuid
+
+INDEX_GENERATION_PATH = os.getenv(
+    "INDEX_GENERATION_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "index_generation"),
+)
+# Serving processes re-read the marker at most this often
+CHECK_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_cached = {"value": None, "checked": 0.0}
+
+
+def bump_index_generation(path: str = None) -> str:
+    path = path or INDEX_GENERATION_PATH
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    value = uuid.uuid4().hex
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(value)
+    os.replace(tmp, path)
+    return value
+
+
+def current_index_generation(path: str = None) -> str:
+    """Return the current marker ("" if ingestion never ran), re-read at most every CHECK_INTERVAL."""
+    path = path or INDEX_GENERATION_PATH
+    now = time.monotonic()
+    with _lock:
+        if _cached["value"] is not None and now - _cached["checked"] < CHECK_INTERVAL and path == _cached.get("path"):
+            return _cached["value"]
+        try:
+            with open(path) as f:
+                value = f.read().strip()
+        except FileNotFoundError:
+            value = ""
+        _cached.update(value=value, checked=now, path=path)
+        return value
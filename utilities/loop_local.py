@@ -0,0 +1,24 @@
+import asyncio
+import functools
+import weakref
+
+
+def loop_local(factory):
+    """
+    Cache the result of ``factory()`` once per running event loop.
+
+    Async SDK clients hold connection pools bound to the loop that created
+    them, so they can be shared between requests but not between loops.
+    """
+    instances = weakref.WeakKeyDictionary()
+
+    @functools.wraps(factory)
+    def wrapper():
+        loop = asyncio.get_running_loop()
+        instance = instances.get(loop)
+        if instance is None:
+            instance = factory()
+            instances[loop] = instance
+        return instance
+
+    return wrapper
@@ -0,0 +1,358 @@
+"""
+In-process metrics and request-path logging.
+
+Counters and latency histograms live in a small registry and are
+rendered in the Prometheus text exposition format (``render_prometheus``),
+so the API can serve ``/metrics`` without an extra dependency. Stats that
+other modules already keep (cache hit counts, coalescing counters) are
+read at scrape time through registered collectors.
+
+Logging goes through ``get_logger``: key=value lines on stderr, gated by
+``LOG_LEVEL`` (default INFO).
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s level=%(levelname)s logger=%(name)s %(message)s"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+# ============================================================
+# Logging
+# ============================================================
+_root_logger = logging.getLogger("rag")
+if not _root_logger.handlers:
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    _root_logger.addHandler(_handler)
+    _root_logger.setLevel(LOG_LEVEL)
+    _root_logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the shared ``rag`` hierarchy (one handler, one level)."""
+    return logging.getLogger(f"rag.{name}")
+
+
+logger = get_logger("metrics")
+
+
+# ============================================================
+# Metric types
+# ============================================================
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    if set(labels) != set(labelnames):
+        raise ValueError(f"expected labels {list(labelnames)}, got {sorted(labels)}")
+    return tuple(str(labels[name]) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs) -> str:
+    pairs = list(pairs)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield self.name, zip(self.labelnames, key), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}             # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            return series[-1] if series else 0
+
+    def totals(self):
+        """{label values: (count, sum)} for every series."""
+        with self._lock:
+            return {key: (series[-1], series[-2]) for key, series in self._series.items()}
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = list(zip(self.labelnames, key))
+            for bound, cumulative in zip(self.buckets, series):
+                yield f"{self.name}_bucket", labels + [("le", _format_value(float(bound)))], cumulative
+            yield f"{self.name}_bucket", labels + [("le", "+Inf")], series[-1]
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, series[-1]
+
+
+# ============================================================
+# Registry
+# ============================================================
+_metrics: List = []
+_collectors: List[Callable] = []
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, documentation, labelnames)
+    with _registry_lock:
+        _metrics.append(metric)
+    return metric
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    metric = Histogram(name, documentation, labelnames, buckets)
+    with _registry_lock:
+        _metrics.append(metric)
+    return metric
+
+
+def register_collector(collector: Callable):
+    """
+    Add a scrape-time source. ``collector()`` returns
+    ``[(name, kind, documentation, [(labels dict, value), ...]), ...]``.
+    """
+    with _registry_lock:
+        _collectors.append(collector)
+    return collector
+
+
+def _family(lines, name, kind, documentation, samples):
+    lines.append(f"# HELP {name} {documentation}")
+    lines.append(f"# TYPE {name} {kind}")
+    for sample_name, labels, value in samples:
+        lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _registry_lock:
+        metrics = list(_metrics)
+        collectors = list(_collectors)
+
+    lines = []
+    for metric in metrics:
+        _family(lines, metric.name, metric.kind, metric.documentation, metric.samples())
+    for collector in collectors:
+        try:
+            families = collector()
+        except Exception as e:
+            logger.warning("event=collector_failed collector=%s error=%r",
+                           getattr(collector, "__name__", collector), e)
+            continue
+        for name, kind, documentation, samples in families:
+            _family(lines, name, kind, documentation,
+                    ((name, labels.items(), value) for labels, value in samples))
+    return "\n".join(lines) + "\n"
+
+
+# ============================================================
+# Request-path metrics
+# ============================================================
+NODE_LATENCY = histogram(
+    "rag_node_latency_seconds", "Latency of each LangGraph node.", ["node"])
+UPSTREAM_LATENCY = histogram(
+    "rag_upstream_latency_seconds", "Latency of upstream calls (token, embedding, search, weather, llm).", ["call"])
+UPSTREAM_ERRORS = counter(
+    "rag_upstream_errors_total", "Upstream calls that raised.", ["call"])
+LLM_TOKENS = counter(
+    "rag_llm_tokens_total", "LLM tokens, as reported by the API or estimated when it reports none.", ["kind"])
+LLM_TOKENS_ESTIMATED = counter(
+    "rag_llm_tokens_estimated_total",
+    "Part of rag_llm_tokens_total counted locally: responses (mostly streamed) that carried no usage.", ["kind"])
+CACHE_LOOKUPS = counter(
+    "rag_cache_lookups_total", "Lookups in caches that don't keep their own stats.", ["cache", "result"])
+
+
+@contextmanager
+def timed(histogram_: Histogram, errors: Counter = None, **labels):
+    """Observe the block's wall time; count it in ``errors`` if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        if errors is not None:
+            errors.inc(**labels)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        histogram_.observe(elapsed, **labels)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("event=timed %s seconds=%.4f",
+                         " ".join(f"{k}={v}" for k, v in labels.items()), elapsed)
+
+
+def _timer(histogram_: Histogram, errors: Counter = None, **labels):
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with timed(histogram_, errors, **labels):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with timed(histogram_, errors, **labels):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def node_timer(node: str):
+    """Decorator recording a graph node's latency (sync or async)."""
+    return _timer(NODE_LATENCY, node=node)
+
+
+def upstream_timer(call: str):
+    """Decorator recording an upstream call's latency and failures (sync or async)."""
+    return _timer(UPSTREAM_LATENCY, UPSTREAM_ERRORS, call=call)
+
+
+# ============================================================
+# LLM callback
+# ============================================================
+def _token_usage(response) -> Tuple[int, int]:
+    """(prompt, completion) tokens from an LLMResult, streamed or not."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage.get("prompt_tokens") or 0, usage.get("completion_tokens") or 0
+    prompt = completion = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            prompt += metadata.get("input_tokens") or 0
+            completion += metadata.get("output_tokens") or 0
+    return prompt, completion
+
+
+def _message_text(content) -> str:
+    if isinstance(content, str):
+        return content
+    # Multimodal content: a list of strings and {"type": "text", "text": ...} parts
+    return "".join(part if isinstance(part, str) else part.get("text") or "" for part in content or [])
+
+
+def _estimate_usage(messages, response) -> Tuple[int, int]:
+    """(prompt, completion) tokens counted with tiktoken, for responses without usage."""
+    from utilities.tokens import count_tokens   # utilities.tokens imports this module
+
+    prompt_texts = [_message_text(m.content) for batch in messages or [] for m in batch]
+    completion_texts = [g.text for generations in response.generations for g in generations]
+    return sum(count_tokens(prompt_texts)) if prompt_texts else 0, \
+        sum(count_tokens(completion_texts)) if completion_texts else 0
+
+
+def _llm_metrics_handler_class():
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class LLMMetricsHandler(BaseCallbackHandler):
+        """Records chat-model latency, failures and token usage."""
+
+        run_inline = True            # cheap bookkeeping; no need for an executor hop
+
+        def __init__(self):
+            self._started = {}
+            self._messages = {}      # run_id -> prompt messages, in case usage doesn't come back
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._started[run_id] = time.perf_counter()
+            self._messages[run_id] = messages
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._started[run_id] = time.perf_counter()
+
+        def on_llm_end(self, response, *, run_id, **kwargs):
+            start = self._started.pop(run_id, None)
+            messages = self._messages.pop(run_id, None)
+            if start is not None:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, call="llm")
+            prompt, completion = _token_usage(response)
+            if not prompt and not completion:
+                # Streams only carry usage with stream_options (LLM_STREAM_USAGE);
+                # count locally rather than leave the token metrics at zero
+                prompt, completion = _estimate_usage(messages, response)
+                LLM_TOKENS_ESTIMATED.inc(prompt, kind="prompt")
+                LLM_TOKENS_ESTIMATED.inc(completion, kind="completion")
+            if prompt:
+                LLM_TOKENS.inc(prompt, kind="prompt")
+            if completion:
+                LLM_TOKENS.inc(completion, kind="completion")
+            logger.debug("event=llm_end prompt_tokens=%d completion_tokens=%d", prompt, completion)
+
+        def on_llm_error(self, error, *, run_id, **kwargs):
+            start = self._started.pop(run_id, None)
+            self._messages.pop(run_id, None)
+            if start is not None:
+                UPSTREAM_LATENCY.observe(time.perf_counter() - start, call="llm")
+            UPSTREAM_ERRORS.inc(call="llm")
+
+    return LLMMetricsHandler
+
+
+def __getattr__(name):
+    # LLMMetricsHandler subclasses a langchain class, so it is built on first
+    # access: importing this module (e.g. to serve /metrics) stays cheap
+    if name == "LLMMetricsHandler":
+        handler = globals()["LLMMetricsHandler"] = _llm_metrics_handler_class()
+        return handler
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,11 +1,9 @@
-from dotenv import load_dotenv
-load_dotenv(override=True) 
-import os, requests
-from langchain_openai import AzureChatOpenAI
-import json
-from openai import AzureOpenAI
-from azure.identity import ClientSecretCredential
-from azure.search.documents import SearchClient
+import utilities.config  # noqa: F401  (loads .env once)
+import os
+from utilities.loop_local import loop_local
+
+# The azure SDKs are imported inside the factories: only the "azure"
+# retrieval backend needs them, and they are slow to import.
 
 class Config:
 
@@ -25,6 +23,9 @@ class Config:
 config = Config()
 
 def get_search_client():
+    from azure.identity import ClientSecretCredential
+    from azure.search.documents import SearchClient
+
     spn_credential = ClientSecretCredential(
             tenant_id=config.tenant_id,
             client_id=config.client_id,
@@ -36,4 +37,23 @@ def get_search_client():
             index_name=config.azure_search_index,
             credential=spn_credential,
         )
-    return search_client
\ No newline at end of file
+    return search_client
+
+
+@loop_local
+def get_async_search_client():
+    """Async SearchClient shared by every request on the current event loop."""
+    from azure.identity.aio import ClientSecretCredential as AsyncClientSecretCredential
+    from azure.search.documents.aio import SearchClient as AsyncSearchClient
+
+    spn_credential = AsyncClientSecretCredential(
+            tenant_id=config.tenant_id,
+            client_id=config.client_id,
+            client_secret=config.client_secret,
+        )
+
+    return AsyncSearchClient(
+            endpoint=config.azure_search_endpoint,
+            index_name=config.azure_search_index,
+            credential=spn_credential,
+        )
@@ -0,0 +1,105 @@
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one execution: the first
+caller runs it, the others wait for and receive the same result (or
+exception). Works for threads (``do``) and for coroutines on any event
+loop (``ado``). Each group counts calls and executions, so
+``calls - executions`` is the number of upstream calls saved.
+"""
+import asyncio
+import threading
+import weakref
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+_groups: Dict[str, "SingleFlight"] = {}
+_groups_lock = threading.Lock()
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}                             # key -> Future (threads)
+        self._tasks = weakref.WeakKeyDictionary()       # loop -> {key: Task}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        with _groups_lock:
+            _groups[name] = self
+
+    def _loop_tasks(self):
+        loop = asyncio.get_running_loop()
+        tasks = self._tasks.get(loop)
+        if tasks is None:
+            tasks = self._tasks[loop] = {}
+        return tasks
+
+    def in_flight(self, key: Hashable) -> bool:
+        """Whether a sync execution (or, inside a loop, an async one) is running for key."""
+        with self._lock:
+            if key in self._inflight:
+                return True
+        try:
+            return key in self._loop_tasks()
+        except RuntimeError:
+            return False
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """Run ``fn()`` once per key among concurrent threads."""
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.executions += 1
+                future = self._inflight[key] = Future()
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def start(self, key: Hashable, coro_fn: Callable[[], Awaitable]) -> asyncio.Task:
+        """Return the running task for key on this loop, starting ``coro_fn()`` if there is none."""
+        tasks = self._loop_tasks()
+        with self._lock:
+            self.calls += 1
+            task = tasks.get(key)
+            if task is not None:
+                return task
+            self.executions += 1
+        task = tasks[key] = asyncio.ensure_future(coro_fn())
+
+        def done(t):
+            tasks.pop(key, None)
+            if not t.cancelled():
+                t.exception()       # retrieved here so unawaited failures aren't logged as lost
+
+        task.add_done_callback(done)
+        return task
+
+    async def ado(self, key: Hashable, coro_fn: Callable[[], Awaitable]) -> Any:
+        """Await ``coro_fn()`` once per key among concurrent coroutines on this loop."""
+        # Shielded so one cancelled caller doesn't cancel the shared execution
+        return await asyncio.shield(self.start(key, coro_fn))
+
+    def stats(self):
+        with self._lock:
+            return {"calls": self.calls, "executions": self.executions,
+                    "saved": self.calls - self.executions}
+
+
+def get_single_flight_stats():
+    """Counters of every coalescing group, by name."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
@@ -0,0 +1,48 @@
+"""
+tiktoken helpers shared by embedding batching and chunking.
+"""
+import os
+from functools import lru_cache
+from typing import List
+
+from utilities.metrics import get_logger
+
+logger = get_logger("tokens")
+
+DEFAULT_MODEL = os.getenv("AZURE_OPENAI_EMBEDDING_DEPLOYMENT", "text-embedding-ada-002")
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = None):
+    """
+    tiktoken encoding for the model (cl100k_base for unknown deployments).
+    Returns None when the BPE file cannot be loaded, e.g. on an air-gapped
+    host without TIKTOKEN_CACHE_DIR.
+    """
+    try:
+        import tiktoken     # loaded on first use; only token counting needs it
+        try:
+            return tiktoken.encoding_for_model(model or DEFAULT_MODEL)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("event=tiktoken_unavailable error=%s fallback=estimate", type(e).__name__)
+        return None
+
+
+def count_tokens(texts: List[str], model: str = None) -> List[int]:
+    encoding = get_encoding(model)
+    if encoding is None:
+        # ~4 characters per token for English text
+        return [len(text) // 4 + 1 for text in texts]
+    return [len(tokens) for tokens in encoding.encode_ordinary_batch(texts)]
+
+
+def split_by_tokens(text: str, max_tokens: int, model: str = None) -> List[str]:
+    """Hard-split text into pieces of at most max_tokens tokens."""
+    encoding = get_encoding(model)
+    if encoding is None:
+        step = max_tokens * 4
+        return [text[i:i + step] for i in range(0, len(text), step)]
+    tokens = encoding.encode_ordinary(text)
+    return [encoding.decode(tokens[i:i + max_tokens]) for i in range(0, len(tokens), max_tokens)]
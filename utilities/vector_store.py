@@ -0,0 +1,218 @@
+"""
+Embedded vector store.
+
+Embeddings are kept in a NumPy ``.npy`` matrix that is memory-mapped at
+query time, either as unit-norm float32 rows or as int8 rows with one
+float32 scale per row (4x smaller, approximate scores). Chunk metadata
+sits next to it in ``chunks.json``, row i describing vector i.
+
+Ingestion writes through ``LocalIndexClient``, which mimics the
+document methods of the async Azure SearchClient, so the same upload
+pipeline fills either backend.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+LOCAL_VECTOR_STORE_PATH = os.getenv(
+    "LOCAL_VECTOR_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "vector_store"),
+)
+LOCAL_VECTOR_DTYPE = os.getenv("LOCAL_VECTOR_DTYPE", "float32")   # "float32" or "int8"
+
+# Metadata kept per chunk; the embedding itself lives in the matrix
+CHUNK_FIELDS = ["chunk_id", "file_name", "chunk_text", "file_path", "page_start", "page_end", "chunk_index"]
+
+# Rows scored per block, so int8 -> float conversion never copies the whole matrix
+SCAN_BLOCK = 65536
+
+
+def _normalize(vector) -> np.ndarray:
+    row = np.asarray(vector, dtype=np.float32)
+    norm = float(np.linalg.norm(row))
+    return row / norm if norm else row
+
+
+class LocalVectorStore:
+    """Memory-mapped cosine top-k over chunk embeddings."""
+
+    def __init__(self, path: str = None, dtype: str = None):
+        self.path = path or LOCAL_VECTOR_STORE_PATH
+        self.dtype = dtype or LOCAL_VECTOR_DTYPE
+        if self.dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector dtype: {self.dtype}")
+        self._vectors = None        # (n, dim) float32 or int8, memory-mapped
+        self._scales = None         # (n,) float32 for int8 rows
+        self._chunks: List[Dict] = []
+        self._pending = None        # chunk_id -> (unit vector, metadata) while writing
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------
+    # Read side
+    # ------------------------------------------------------------
+    def load(self):
+        """Map the saved store; an absent store loads as empty."""
+        with self._lock:
+            self._pending = None
+            chunks_path = os.path.join(self.path, "chunks.json")
+            if not os.path.exists(chunks_path):
+                self._vectors, self._scales, self._chunks = None, None, []
+                return self
+            with open(os.path.join(self.path, "header.json")) as f:
+                header = json.load(f)
+            with open(chunks_path) as f:
+                self._chunks = json.load(f)
+            self.dtype = header["dtype"]
+            self._vectors = np.load(os.path.join(self.path, "vectors.npy"), mmap_mode="r")
+            self._scales = (np.load(os.path.join(self.path, "scales.npy"), mmap_mode="r")
+                            if self.dtype == "int8" else None)
+        return self
+
+    def __len__(self):
+        return len(self._chunks) if self._pending is None else len(self._pending)
+
+    @property
+    def chunks(self) -> List[Dict]:
+        """Metadata of the saved rows, row i describing vector i."""
+        return self._chunks
+
+    def _scan(self, vector, top: int):
+        # Arrays and chunk list are read together, so rows always match their metadata
+        with self._lock:
+            vectors, scales, chunks = self._vectors, self._scales, self._chunks
+        n_rows = len(chunks)
+        if vectors is None or not n_rows or top <= 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32), chunks
+
+        query = _normalize(vector)
+        scores = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, SCAN_BLOCK):
+            block = vectors[start:start + SCAN_BLOCK]
+            part = block @ query if scales is None else (block.astype(np.float32) @ query) * scales[start:start + SCAN_BLOCK]
+            scores[start:start + len(block)] = part
+
+        top = min(top, n_rows)
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        return best, scores[best], chunks
+
+    def top_rows(self, vector, top: int = 5):
+        """Return (row ids, cosine scores) of the best ``top`` rows, best first."""
+        rows, scores, _ = self._scan(vector, top)
+        return rows, scores
+
+    def search(self, vector, top: int = 5) -> List[Tuple[float, Dict]]:
+        """Return up to ``top`` (cosine score, chunk metadata), best first."""
+        rows, scores, chunks = self._scan(vector, top)
+        return [(float(score), chunks[row]) for row, score in zip(rows, scores)]
+
+    # ------------------------------------------------------------
+    # Write side
+    # ------------------------------------------------------------
+    def _materialize(self):
+        # Caller must hold self._lock
+        if self._pending is not None:
+            return self._pending
+        self._pending = OrderedDict()
+        for i, chunk in enumerate(self._chunks):
+            row = np.array(self._vectors[i], dtype=np.float32)
+            if self._scales is not None:
+                row *= self._scales[i]
+            self._pending[chunk["chunk_id"]] = (row, chunk)
+        return self._pending
+
+    def upsert(self, documents: List[Dict]) -> List[str]:
+        """Insert or replace documents that carry an "embedding"; returns their chunk IDs."""
+        with self._lock:
+            pending = self._materialize()
+            keys = []
+            for doc in documents:
+                meta = {field: doc.get(field) for field in CHUNK_FIELDS}
+                pending[doc["chunk_id"]] = (_normalize(doc["embedding"]), meta)
+                keys.append(doc["chunk_id"])
+            return keys
+
+    def delete(self, chunk_ids: List[str]) -> List[str]:
+        with self._lock:
+            pending = self._materialize()
+            for chunk_id in chunk_ids:
+                pending.pop(chunk_id, None)
+            return list(chunk_ids)
+
+    def clear(self):
+        with self._lock:
+            self._pending = OrderedDict()
+
+    def save(self, on_write=None):
+        """
+        Write pending changes atomically (new directory swapped in), then re-map.
+        ``on_write(directory, chunks)`` can add sidecar files (e.g. a keyword
+        index) that are swapped in together with the vectors.
+        """
+        with self._lock:
+            if self._pending is None:
+                return
+            rows = list(self._pending.values())
+            chunks = [meta for _, meta in rows]
+            matrix = np.stack([row for row, _ in rows]) if rows else np.zeros((0, 0), dtype=np.float32)
+
+            tmp = f"{self.path}.tmp-{uuid.uuid4().hex[:8]}"
+            os.makedirs(tmp)
+            if self.dtype == "int8":
+                scales = np.abs(matrix).max(axis=1) / 127.0 if rows else np.zeros(0, dtype=np.float32)
+                scales[scales == 0] = 1.0
+                quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+                np.save(os.path.join(tmp, "vectors.npy"), quantized)
+                np.save(os.path.join(tmp, "scales.npy"), scales.astype(np.float32))
+            else:
+                np.save(os.path.join(tmp, "vectors.npy"), matrix.astype(np.float32))
+            with open(os.path.join(tmp, "chunks.json"), "w") as f:
+                json.dump(chunks, f)
+            with open(os.path.join(tmp, "header.json"), "w") as f:
+                json.dump({"dtype": self.dtype, "count": len(chunks),
+                           "dim": int(matrix.shape[1]) if rows else 0}, f)
+            if on_write:
+                on_write(tmp, chunks)
+
+            old = f"{self.path}.old-{uuid.uuid4().hex[:8]}"
+            if os.path.exists(self.path):
+                os.replace(self.path, old)
+            os.replace(tmp, self.path)
+            shutil.rmtree(old, ignore_errors=True)
+        self.load()
+
+
+# ============================================================
+# SearchClient-compatible writer
+# ============================================================
+class IndexResult:
+    """Shape of azure.search.documents IndexingResult used by index_uploader."""
+
+    def __init__(self, key, succeeded=True, status_code=200, error_message=None):
+        self.key = key
+        self.succeeded = succeeded
+        self.status_code = status_code
+        self.error_message = error_message
+
+
+class LocalIndexClient:
+    """Async document API of SearchClient on top of a LocalVectorStore."""
+
+    def __init__(self, store: LocalVectorStore, key_field: str = "chunk_id"):
+        self.store = store
+        self.key_field = key_field
+
+    async def upload_documents(self, documents):
+        return [IndexResult(key) for key in self.store.upsert(documents)]
+
+    # Documents always carry every field, so merging is the same as replacing
+    merge_or_upload_documents = upload_documents
+
+    async def delete_documents(self, documents):
+        return [IndexResult(key) for key in self.store.delete([d[self.key_field] for d in documents])]
@@ -0,0 +1,198 @@
+"""
+Semantic answer cache for the full RAG pipeline.
+
+Answers are cached per normalized query. A repeat of the same query is
+served without any upstream call; a PDF query whose embedding is close
+enough to a cached PDF query (cosine >= ANSWER_CACHE_SIMILARITY) reuses
+that answer, provided both queries name the same specifics (numbers such
+as years, quarter tags, capitalised names): embeddings of "net income
+2022" and "net income 2023" are closer than the threshold. Weather answers
+only match exactly, since near-identical phrasings often differ in the city.
+
+Entries expire by route: weather after minutes, PDF answers after hours
+or as soon as ingestion bumps the index generation.
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional
+
+import numpy as np
+
+from utilities.embedding_cache import normalize_text
+from utilities.index_generation import current_index_generation
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "1") != "0"
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95"))
+ANSWER_CACHE_TTL = {
+    "weather": float(os.getenv("ANSWER_CACHE_TTL_WEATHER", "300")),       # 5 minutes
+    "pdf": float(os.getenv("ANSWER_CACHE_TTL_PDF", str(6 * 3600))),       # 6 hours
+}
+
+# Routes whose answers come from the search index
+INDEXED_ROUTES = {"pdf"}
+
+
+# Tokens that change the answer even when the embedding barely moves
+_NUMBER = re.compile(r"\d+(?:[.,]\d+)*")
+_PERIOD = re.compile(r"\b(?:q[1-4]|h[12]|fy\d*)\b", re.IGNORECASE)
+_NAME = re.compile(r"(?<![.?!]\s)(?<!^)\b[A-Z][\w&'-]*")
+
+
+def normalize_query(query: str) -> str:
+    return normalize_text(query).lower().rstrip(" ?!.")
+
+
+def query_specifics(query: str) -> FrozenSet[str]:
+    """Numbers, period tags and capitalised names (not sentence-initial) a semantic hit must share."""
+    text = normalize_text(query)
+    found = set(_NUMBER.findall(text))
+    found.update(m.lower() for m in _PERIOD.findall(text))
+    found.update(m.lower() for m in _NAME.findall(text))
+    return frozenset(found)
+
+
+class _Entry:
+    __slots__ = ("answer", "data_type", "expires", "generation", "slot", "specifics")
+
+    def __init__(self, answer, data_type, expires, generation, slot, specifics=frozenset()):
+        self.answer = answer
+        self.data_type = data_type
+        self.expires = expires
+        self.generation = generation
+        self.slot = slot
+        self.specifics = specifics
+
+
+class AnswerCache:
+    """Bounded LRU of final answers with an exact and a near-duplicate lookup."""
+
+    def __init__(self, max_entries: int = None, similarity: float = None, ttl: Dict[str, float] = None,
+                 generation=current_index_generation, clock=time.monotonic):
+        self.max_entries = max_entries or ANSWER_CACHE_MAX_ENTRIES
+        self.similarity = ANSWER_CACHE_SIMILARITY if similarity is None else similarity
+        self.ttl = dict(ANSWER_CACHE_TTL, **(ttl or {}))
+        self._generation = generation
+        self._clock = clock
+        self._entries = OrderedDict()    # normalized query -> _Entry
+        self._lock = threading.Lock()
+
+        # Unit-norm query embeddings, one row per slot; similarity is one matrix-vector product
+        self._vectors = None
+        self._slot_keys: List[Optional[str]] = [None] * self.max_entries
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+        self.lookups = 0
+        self.exact_hits = 0
+        self.semantic_hits = 0
+
+    # ------------------------------------------------------------
+    # Internals (caller holds self._lock)
+    # ------------------------------------------------------------
+    def _is_live(self, entry: _Entry, now: float, generation: str) -> bool:
+        if now >= entry.expires:
+            return False
+        return entry.data_type not in INDEXED_ROUTES or entry.generation == generation
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key)
+        if entry.slot is not None:
+            self._slot_keys[entry.slot] = None
+            self._free.append(entry.slot)
+
+    def _hit(self, key: str, entry: _Entry):
+        self._entries.move_to_end(key)
+        return dict(entry.answer)
+
+    # ------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------
+    def get(self, query: str) -> Optional[dict]:
+        """Exact lookup by normalized query. Every lookup starts here, so this counts them."""
+        key = normalize_query(query)
+        with self._lock:
+            self.lookups += 1
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._is_live(entry, self._clock(), self._generation()):
+                    self.exact_hits += 1
+                    return self._hit(key, entry)
+                self._drop(key)
+            return None
+
+    def get_similar(self, vector: List[float], query: str = None) -> Optional[dict]:
+        """
+        Near-duplicate lookup among cached PDF answers, after get() missed.
+        With ``query``, only entries naming the same specifics can match.
+        """
+        specifics = query_specifics(query) if query is not None else None
+        with self._lock:
+            if self._vectors is not None and vector is not None:
+                probe = np.asarray(vector, dtype=np.float32)
+                norm = float(np.linalg.norm(probe))
+                if norm and probe.shape[0] == self._vectors.shape[1]:
+                    scores = self._vectors @ (probe / norm)
+                    now, generation = self._clock(), self._generation()
+                    for slot in np.argsort(scores)[::-1]:
+                        if scores[slot] < self.similarity:
+                            break
+                        key = self._slot_keys[slot]
+                        if key is None:
+                            continue
+                        entry = self._entries[key]
+                        if specifics is not None and entry.specifics != specifics:
+                            continue
+                        if self._is_live(entry, now, generation):
+                            self.semantic_hits += 1
+                            return self._hit(key, entry)
+                        self._drop(key)
+            return None
+
+    def put(self, query: str, answer: dict, data_type: str, vector: List[float] = None):
+        ttl = self.ttl.get(data_type)
+        if not ttl:
+            return
+        key = normalize_query(query)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while len(self._entries) >= self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+            slot = None
+            if vector is not None and data_type in INDEXED_ROUTES:
+                row = np.asarray(vector, dtype=np.float32)
+                norm = float(np.linalg.norm(row))
+                if norm:
+                    if self._vectors is None:
+                        self._vectors = np.zeros((self.max_entries, row.shape[0]), dtype=np.float32)
+                    if row.shape[0] == self._vectors.shape[1]:
+                        slot = self._free.pop()
+                        self._vectors[slot] = row / norm
+                        self._slot_keys[slot] = key
+
+            self._entries[key] = _Entry(dict(answer), data_type, self._clock() + ttl,
+                                        self._generation(), slot, query_specifics(query))
+
+    def invalidate(self, data_type: str = None):
+        """Drop every entry, or only those of one route."""
+        with self._lock:
+            for key in [k for k, e in self._entries.items() if data_type in (None, e.data_type)]:
+                self._drop(key)
+
+    def stats(self):
+        with self._lock:
+            hits = self.exact_hits + self.semantic_hits
+            return {
+                "exact_hits": self.exact_hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.lookups - hits,
+                "hit_rate": hits / self.lookups if self.lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+
+answer_cache = AnswerCache() if ANSWER_CACHE_ENABLED else None
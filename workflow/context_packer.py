@@ -0,0 +1,141 @@
+"""
+Token-budgeted context packing for the summary prompt.
+
+Retrieved chunks arrive in relevance order. Chunks that are neighbours
+in the same file (consecutive ``chunk_index``) are merged into one span
+with their shared overlap text removed; spans are then packed best-first
+until SUMMARY_CONTEXT_TOKENS is reached. Tokens sent and saved versus
+the verbatim join are exported on /metrics.
+"""
+import os
+from typing import Dict, List
+
+from utilities.tokens import count_tokens, split_by_tokens
+from utilities.metrics import counter, get_logger
+
+SUMMARY_CONTEXT_TOKENS = int(os.getenv("SUMMARY_CONTEXT_TOKENS", "4000"))
+SUMMARY_TOKEN_MODEL = os.getenv("SUMMARY_TOKEN_MODEL", "gpt-4o")
+
+# Overlap search window and the prefix used to locate it
+MAX_OVERLAP_CHARS = 2000
+OVERLAP_PROBE_CHARS = 32
+
+logger = get_logger("context_packer")
+
+CONTEXT_TOKENS = counter(
+    "rag_context_tokens_total", "Summary context tokens: verbatim join (raw) and after packing (packed).", ["kind"])
+CONTEXT_TOKENS_SAVED = counter(
+    "rag_context_tokens_saved_total", "Prompt tokens saved by merging, de-duplicating and budgeting chunks.")
+
+
+def _format_context(texts: List[str]) -> str:
+    return "\n\n".join(f"Document {i+1}:\n{text}" for i, text in enumerate(texts))
+
+
+def overlap_length(left: str, right: str) -> int:
+    """Length of the longest suffix of ``left`` that is also a prefix of ``right``."""
+    probe = right[:OVERLAP_PROBE_CHARS]
+    if len(probe) < OVERLAP_PROBE_CHARS:
+        return 0
+    pos = left.find(probe, max(0, len(left) - MAX_OVERLAP_CHARS))
+    while pos != -1:
+        if right.startswith(left[pos:]):
+            return len(left) - pos
+        pos = left.find(probe, pos + 1)
+    return 0
+
+
+def _merge_adjacent(chunks: List[Dict]) -> List[Dict]:
+    """
+    Group chunks into spans of consecutive chunk_index within a file.
+    Each span keeps the best (lowest) retrieval rank of its members.
+    """
+    spans, by_file = [], {}
+    for rank, chunk in enumerate(chunks):
+        index = chunk.get("chunk_index")
+        source = chunk.get("file_path") or chunk.get("file_name")
+        if index is None or not source:
+            spans.append({"rank": rank, "chunks": [chunk]})
+        else:
+            by_file.setdefault(source, []).append((index, rank, chunk))
+
+    for members in by_file.values():
+        members.sort(key=lambda m: m[0])
+        run = [members[0]]
+        for member in members[1:]:
+            if member[0] == run[-1][0] + 1:
+                run.append(member)
+            else:
+                spans.append({"rank": min(r for _, r, _ in run), "chunks": [c for _, _, c in run]})
+                run = [member]
+        spans.append({"rank": min(r for _, r, _ in run), "chunks": [c for _, _, c in run]})
+
+    for span in spans:
+        text = span["chunks"][0].get("content") or ""
+        for chunk in span["chunks"][1:]:
+            following = chunk.get("content") or ""
+            shared = overlap_length(text, following)
+            text = text + following[shared:] if shared else f"{text}\n{following}"
+        span["text"] = text
+
+    spans.sort(key=lambda s: s["rank"])
+    return spans
+
+
+def pack_context(chunks: List[Dict], budget: int = None, model: str = None):
+    """
+    Build the summary context from ranked chunks.
+
+    Returns (context, used_chunks, stats). ``used_chunks`` are the chunks
+    that made it into the context; ``stats`` compares prompt tokens with
+    the old verbatim join.
+    """
+    budget = budget or SUMMARY_CONTEXT_TOKENS
+    model = model or SUMMARY_TOKEN_MODEL
+
+    unique, seen = [], set()
+    for chunk in chunks:
+        key = chunk.get("chunk_id")
+        if key is not None and key in seen:
+            continue
+        seen.add(key)
+        unique.append(chunk)
+
+    spans = _merge_adjacent(unique)
+    counts = count_tokens([span["text"] for span in spans], model)
+
+    texts, used_chunks, total = [], [], 0
+    for span, n_tokens in zip(spans, counts):
+        text = span["text"]
+        if total + n_tokens > budget:
+            if texts:
+                # Skip it; a later, smaller span may still fit
+                continue
+            # Even the best span is over budget: keep its head
+            text = split_by_tokens(text, budget, model)[0]
+            n_tokens = budget
+        texts.append(text)
+        used_chunks.extend(span["chunks"])
+        total += n_tokens
+
+    context = _format_context(texts)
+    raw_tokens, context_tokens = count_tokens(
+        [_format_context([c.get("content", "") for c in chunks]), context], model
+    )
+    stats = {
+        "chunks_in": len(chunks),
+        "chunks_used": len(used_chunks),
+        "spans": len(texts),
+        "raw_tokens": raw_tokens,
+        "context_tokens": context_tokens,
+        "saved_tokens": raw_tokens - context_tokens,
+    }
+    CONTEXT_TOKENS.inc(raw_tokens, kind="raw")
+    CONTEXT_TOKENS.inc(context_tokens, kind="packed")
+    if stats["saved_tokens"] > 0:
+        CONTEXT_TOKENS_SAVED.inc(stats["saved_tokens"])
+    logger.debug(
+        "event=context_packed chunks_used=%d chunks_in=%d spans=%d context_tokens=%d saved_tokens=%d",
+        stats["chunks_used"], stats["chunks_in"], stats["spans"], context_tokens, stats["saved_tokens"],
+    )
+    return context, used_chunks, stats
@@ -3,14 +3,10 @@ from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from utilities.create_llm_client import create_llm_client
 import json
+from functools import lru_cache
+from workflow.query_router import fast_route, record_route, ROUTER_CONFIDENCE_THRESHOLD
 
-def orchestration_logic(query: str):
-    """
-    Classifies the user query into two categories: weather or pdf.
-    If weather, also extract the city if present.
-    """
-
-    orchestration_prompt = """
+ORCHESTRATION_PROMPT = """
 You are a strict classification assistant. 
 Your job is to read the user query and output a JSON object with:
 
@@ -43,11 +39,64 @@ Output:
 User Query: "{query}"
 """
 
-    prompt = PromptTemplate.from_template(orchestration_prompt)
-    llm = create_llm_client()
-    chain = prompt | llm | StrOutputParser()
 
-    response = chain.invoke({"query": query}).strip()
+@lru_cache(maxsize=None)
+def get_orchestration_chain():
+    """Build the classification chain once and reuse it."""
+    prompt = PromptTemplate.from_template(ORCHESTRATION_PROMPT)
+    return prompt | create_llm_client() | StrOutputParser()
+
+
+def _local_route(query: str):
+    """Return the rule-based decision if it clears the confidence threshold."""
+    decision = fast_route(query)
+    if decision["confidence"] < ROUTER_CONFIDENCE_THRESHOLD:
+        return None
+    record_route("rules")
+    return {"data_type": decision["data_type"], "city": decision["city"], "route_stage": "rules"}
+
+
+def _llm_route(response: str):
+    record_route("llm")
+    parsed = parse_route(response)
+    parsed["route_stage"] = "llm"
+    return parsed
+
+
+def orchestration_logic(query: str):
+    """
+    Classifies the user query into two categories: weather or pdf.
+    If weather, also extract the city if present.
+    Confident cases are settled by the local router; the rest go to the LLM.
+    """
+
+    local = _local_route(query)
+    if local:
+        return local
+
+    chain = get_orchestration_chain()
+
+    response = chain.invoke({"query": query})
+    return _llm_route(response)
+
+
+async def aorchestration_logic(query: str):
+    """Async variant of orchestration_logic (uses chain.ainvoke)."""
+
+    local = _local_route(query)
+    if local:
+        return local
+
+    chain = get_orchestration_chain()
+
+    response = await chain.ainvoke({"query": query})
+    return _llm_route(response)
+
+
+def parse_route(response: str):
+    """Parse the classifier output into {"data_type", "city"}."""
+
+    response = response.strip()
 
     # Clean markdown fences
     if response.startswith("```"):
@@ -69,7 +118,3 @@ User Query: "{query}"
         parsed["city"] = parsed.get("city")
 
     return parsed
-
-
-
-
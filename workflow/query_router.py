@@ -0,0 +1,115 @@
+"""
+Local first-stage query router.
+
+Keyword rules plus a small city gazetteer settle the obvious queries
+("weather in Pune", "summarize the balance sheet") in-process; anything
+below the confidence threshold is left to the LLM classifier in
+orchestration_agent.py.
+"""
+import os
+import re
+import threading
+from typing import Optional
+
+ROUTER_CONFIDENCE_THRESHOLD = float(os.getenv("ROUTER_CONFIDENCE_THRESHOLD", "0.8"))
+
+WEATHER_PATTERN = re.compile(
+    r"\b(weather|temperature|temp|climate|forecast|rain(?:ing|y)?|humid(?:ity)?|"
+    r"wind(?:y)?|sunny|cloudy|snow(?:ing)?|storm|hot|cold|degrees?|celsius|umbrella)\b",
+    re.IGNORECASE,
+)
+
+# Weather words that rarely mean anything else. The rest of WEATHER_PATTERN
+# ("temp staffing", "hot selling", "storm of layoffs") needs the LLM even with a city.
+UNAMBIGUOUS_WEATHER_PATTERN = re.compile(
+    r"\b(weather|temperature|forecast|rain(?:ing|y)?|humid(?:ity)?|windy|sunny|cloudy|"
+    r"snow(?:ing)?|celsius|umbrella)\b",
+    re.IGNORECASE,
+)
+
+PDF_PATTERN = re.compile(
+    r"\b(pdf|document|report|page|section|summar(?:y|ise|ize)|statement|filing|"
+    r"balance sheet|cash flows?|income|revenue|profit|loss|ebitda|assets?|liabilit(?:y|ies)|"
+    r"equity|expenses?|receivables?|payables?|dividends?|depreciation|margin|fiscal|"
+    r"quarter(?:ly)?|audit(?:or)?|notes? to)\b",
+    re.IGNORECASE,
+)
+
+# "in X", "for X", "at X" — a place phrase the gazetteer may not know (users often skip capitals)
+PLACE_PHRASE = re.compile(r"\b(?:in|for|at|of)\s+([A-Z][\w.'-]*(?:\s+[A-Z][\w.'-]*)*)", re.IGNORECASE)
+
+CITY_GAZETTEER = {
+    # India
+    "mumbai", "delhi", "new delhi", "bengaluru", "bangalore", "hyderabad", "chennai",
+    "kolkata", "pune", "ahmedabad", "jaipur", "indore", "bhopal", "lucknow", "kanpur",
+    "nagpur", "surat", "patna", "chandigarh", "gurgaon", "gurugram", "noida", "kochi",
+    "coimbatore", "goa", "visakhapatnam", "vadodara", "nashik", "thane", "mysore", "mysuru",
+    # World
+    "london", "paris", "berlin", "madrid", "rome", "amsterdam", "dublin", "zurich",
+    "new york", "los angeles", "chicago", "san francisco", "seattle", "boston", "toronto",
+    "vancouver", "tokyo", "singapore", "hong kong", "shanghai", "beijing", "seoul",
+    "sydney", "melbourne", "dubai", "abu dhabi", "doha", "bangkok", "jakarta", "cairo",
+    "nairobi", "lagos", "johannesburg", "sao paulo", "mexico city", "moscow", "istanbul",
+}
+
+# Longest names first so "new delhi" wins over "delhi"
+_GAZETTEER_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(c) for c in sorted(CITY_GAZETTEER, key=len, reverse=True)) + r")\b",
+    re.IGNORECASE,
+)
+
+
+def _find_city(query: str) -> Optional[str]:
+    match = _GAZETTEER_PATTERN.search(query)
+    if match:
+        return match.group(1).title()
+    return None
+
+
+def fast_route(query: str):
+    """
+    Classify a query with local rules.
+    Returns {"data_type", "city", "confidence"}.
+    """
+    weather_hits = len(WEATHER_PATTERN.findall(query))
+    pdf_hits = len(PDF_PATTERN.findall(query))
+
+    if weather_hits and not pdf_hits:
+        city = _find_city(query)
+        if city and UNAMBIGUOUS_WEATHER_PATTERN.search(query):
+            confidence = 0.95
+        elif PLACE_PHRASE.search(query):
+            # Looks like a place we don't know; let the LLM extract it
+            confidence = 0.6
+        else:
+            # Weather words without a place, or only ambiguous ones, are often
+            # finance ("climate risk", "cold storage costs"), so the LLM decides
+            confidence = 0.7
+        return {"data_type": "weather", "city": city, "confidence": confidence}
+
+    if pdf_hits and not weather_hits:
+        return {"data_type": "pdf", "city": None, "confidence": 0.9}
+
+    # Mixed or no signal
+    return {"data_type": "pdf", "city": None, "confidence": 0.5}
+
+
+# ============================================================
+# Hit-rate accounting
+# ============================================================
+_stats_lock = threading.Lock()
+_route_stats = {"rules": 0, "llm": 0}
+
+
+def record_route(stage: str):
+    with _stats_lock:
+        _route_stats[stage] = _route_stats.get(stage, 0) + 1
+
+
+def get_route_stats():
+    """Counts per routing stage plus the local hit rate."""
+    with _stats_lock:
+        stats = dict(_route_stats)
+    total = sum(stats.values())
+    stats["hit_rate"] = stats.get("rules", 0) / total if total else 0.0
+    return stats
@@ -1,39 +1,169 @@
 """
 Main RAG workflow implementation
 """
+import utilities.config  # noqa: F401  (loads .env before the modules below read settings)
 from typing import Dict, Any
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from workflow.state_definitions import RAGState
-from workflow.orchestration_agent import orchestration_logic
-from workflow.search_handler import hybrid_search_logic
-from workflow.summary_handler import summary_logic
-from workflow.weather_api_handler import weather_api
+from workflow.orchestration_agent import orchestration_logic, aorchestration_logic, get_orchestration_chain
+from workflow.search_handler import hybrid_search_logic, ahybrid_search_logic
+from workflow.retrieval_backends import get_retrieval_backend
+from workflow.summary_handler import (
+    summary_logic, asummary_logic, get_summary_chain, source_metadata, NO_RESULTS, SUMMARY_ERROR,
+)
+from workflow.weather_api_handler import weather_api, aweather_api, is_weather_error, render_weather_answer
+from workflow.query_router import fast_route, get_route_stats, ROUTER_CONFIDENCE_THRESHOLD
+from workflow.answer_cache import answer_cache, normalize_query
+from utilities.create_llm_client import get_embedding_client, get_embedding, aget_embedding
+from utilities.embedding_batcher import aembed_texts
+from utilities.single_flight import SingleFlight, get_single_flight_stats
+from utilities.embedding_cache import embedding_cache
+from utilities.metrics import counter, get_logger, node_timer, register_collector
 import os
-from dotenv import load_dotenv
-load_dotenv(override=True) 
+import asyncio
+import gc
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = get_logger("rag_workflow")
 
 
 def orchestration_agent(state: RAGState):
     """Wrapper for orchestration decision"""
-    print("🔹 [orchestration_agent] Called")
     result = orchestration_logic(state.query)   # FIXED
-    print("[orchestration_agent] output", result)
+    logger.debug("event=routed node=orchestration_agent result=%s", result)
     return result
 
 
+async def aorchestration_agent(state: RAGState):
+    """Async wrapper for orchestration decision"""
+    result = await aorchestration_logic(state.query)
+    logger.debug("event=routed node=orchestration_agent result=%s", result)
+    return result
+
+
+# ============================================================
+# Speculative retrieval
+# ============================================================
+# Opt-in: start the PDF search while the LLM router is still deciding
+SPECULATIVE_RETRIEVAL = os.getenv("SPECULATIVE_RETRIEVAL", "0") == "1"
+SPECULATIVE_WORKERS = int(os.getenv("SPECULATIVE_WORKERS", "8"))
+
+# used: consumed by pdf_handler; cancelled/discarded: the router picked weather;
+# abandoned: the run failed, was cancelled or lost its client before retrieval
+SPECULATIVE_SEARCHES = counter(
+    "rag_speculative_searches_total", "Searches started before routing finished, by outcome.", ["outcome"])
+
+_speculations = {}          # speculation id -> Future (invoke) or Task (ainvoke); see _run_speculation
+_speculation_lock = threading.Lock()
+_speculation_pool = None
+
+
+def _get_speculation_pool():
+    global _speculation_pool
+    with _speculation_lock:
+        if _speculation_pool is None:
+            _speculation_pool = ThreadPoolExecutor(max_workers=SPECULATIVE_WORKERS,
+                                                   thread_name_prefix="speculative-search")
+        return _speculation_pool
+
+
+def _should_speculate(query: str):
+    # Confident rule-based routes are instant, so there is nothing to overlap with
+    decision = fast_route(query)
+    return decision["confidence"] < ROUTER_CONFIDENCE_THRESHOLD and decision["data_type"] == "pdf"
+
+
+def _settle_speculation(route: Dict[str, Any], pending, cancel, speculation_id=None):
+    """Hand the in-flight search to pdf_handler, or drop it when the route is weather."""
+    if route.get("data_type") == "weather":
+        SPECULATIVE_SEARCHES.inc(outcome="cancelled" if cancel() else "discarded")
+        return route
+    speculation_id = speculation_id or uuid.uuid4().hex
+    with _speculation_lock:
+        _speculations[speculation_id] = pending
+    return {**route, "speculation_id": speculation_id}
+
+
+def _take_speculation(speculation_id):
+    if not speculation_id:
+        return None
+    with _speculation_lock:
+        pending = _speculations.pop(speculation_id, None)
+    if pending is not None:
+        SPECULATIVE_SEARCHES.inc(outcome="used")
+    return pending
+
+
+def _drop_speculation(speculation_id):
+    """Cancel a search no node consumed; every orchestrator calls this when its run ends."""
+    with _speculation_lock:
+        pending = _speculations.pop(speculation_id, None)
+    if pending is not None:
+        pending.cancel()
+        SPECULATIVE_SEARCHES.inc(outcome="abandoned")
+
+
+def _run_input(query: str):
+    """
+    Graph input for one run. The orchestrator picks the speculation id up
+    front, so it can drop the search in a ``finally`` however the run ends.
+    """
+    return {"query": query, "speculation_id": uuid.uuid4().hex}
+
+
+def speculative_orchestration_agent(state: RAGState):
+    """orchestration_agent that searches in a worker thread while the LLM routes."""
+    if not _should_speculate(state.query):
+        return orchestration_agent(state)
+    future = _get_speculation_pool().submit(hybrid_search_logic, state.query)
+    try:
+        route = orchestration_agent(state)
+    except BaseException:
+        future.cancel()
+        raise
+    return _settle_speculation(route, future, future.cancel, state.speculation_id)
+
+
+async def aspeculative_orchestration_agent(state: RAGState):
+    """Async variant: the search runs as a task on the same loop."""
+    if not _should_speculate(state.query):
+        return await aorchestration_agent(state)
+    task = asyncio.ensure_future(ahybrid_search_logic(state.query))
+    try:
+        route = await aorchestration_agent(state)
+    except BaseException:
+        task.cancel()
+        raise
+    return _settle_speculation(route, task, task.cancel, state.speculation_id)
+
+
 def pdf_handler(state: RAGState):
     """Wrapper for hybrid search / PDF RAG"""
-    print("🔹 [pdf_handler] Called")
+    speculative = _take_speculation(state.speculation_id)
+    if speculative is not None:
+        return {"retrieved_chunks": speculative.result()}
+
     result = hybrid_search_logic(
         state.query
     )
     return {"retrieved_chunks": result}
 
 
+async def apdf_handler(state: RAGState):
+    """Async wrapper for hybrid search / PDF RAG"""
+    speculative = _take_speculation(state.speculation_id)
+    if speculative is not None:
+        return {"retrieved_chunks": await speculative}
+
+    result = await ahybrid_search_logic(state.query)
+    return {"retrieved_chunks": result}
+
+
 def weather_handler(state: RAGState):
     """Wrapper for Weather API"""
-    print("🔹 [weather_handler] Called")
-
     api_key = os.getenv("weather_secret")
 
     result = weather_api(
@@ -41,13 +171,33 @@ def weather_handler(state: RAGState):
         state.city,     # FIXED
         api_key
     )
-    return {"retrieved_chunks": result}
+    return _weather_update(state.query, result)
+
+
+async def aweather_handler(state: RAGState):
+    """Async wrapper for Weather API"""
+    api_key = os.getenv("weather_secret")
+
+    result = await aweather_api(state.query, state.city, api_key)
+    return _weather_update(state.query, result)
+
+
+WEATHER_ANSWERS = counter(
+    "rag_weather_answers_total", "Weather answers by how they were produced (template or llm).", ["mode"])
+
+
+def _weather_update(query: str, chunks):
+    """Retrieved chunks, plus the final answer when a template can state it without the LLM."""
+    update = {"retrieved_chunks": chunks}
+    answer = render_weather_answer(query, chunks)
+    WEATHER_ANSWERS.inc(mode="llm" if answer is None else "template")
+    if answer is not None:
+        update.update(final_answer=answer, metadata=source_metadata(chunks))
+    return update
 
 
 def llm_summary_handler(state: RAGState):
     """Wrapper for LLM Summary"""
-    print("🔹 [llm_summary_handler] Called")
-
     result = summary_logic(
         chunks=state.retrieved_chunks or [],   # FIXED
         query=state.query                      # FIXED
@@ -59,15 +209,43 @@ def llm_summary_handler(state: RAGState):
     }
 
 
-def rag_app_builder():
-    """Build and compile the main RAG workflow"""
+async def allm_summary_handler(state: RAGState):
+    """Async wrapper for LLM Summary"""
+    result = await asummary_logic(
+        chunks=state.retrieved_chunks or [],
+        query=state.query
+    )
+
+    return {
+        "final_answer": result.get("summary"),
+        "metadata": result.get("metadata", [])
+    }
+
+
+def _node(name, func, afunc):
+    # One node serves both app.invoke (func) and app.ainvoke (afunc); both are timed
+    timer = node_timer(name)
+    return RunnableLambda(timer(func), afunc=timer(afunc), name=name)
+
+
+def rag_app_builder(speculative: bool = None):
+    """
+    Build and compile the main RAG workflow.
+    With ``speculative`` (default: SPECULATIVE_RETRIEVAL) the PDF search
+    starts alongside LLM routing and is dropped if the route is weather.
+    """
+    speculative = SPECULATIVE_RETRIEVAL if speculative is None else speculative
     workflow = StateGraph(RAGState)
 
     # Add nodes
-    workflow.add_node("orchestration_agent", orchestration_agent)
-    workflow.add_node("pdf_handler", pdf_handler)
-    workflow.add_node("weather_handler", weather_handler)
-    workflow.add_node("llm_summary_handler", llm_summary_handler)
+    if speculative:
+        route = _node("orchestration_agent", speculative_orchestration_agent, aspeculative_orchestration_agent)
+    else:
+        route = _node("orchestration_agent", orchestration_agent, aorchestration_agent)
+    workflow.add_node("orchestration_agent", route)
+    workflow.add_node("pdf_handler", _node("pdf_handler", pdf_handler, apdf_handler))
+    workflow.add_node("weather_handler", _node("weather_handler", weather_handler, aweather_handler))
+    workflow.add_node("llm_summary_handler", _node("llm_summary_handler", llm_summary_handler, allm_summary_handler))
 
     # Entry point
     workflow.set_entry_point("orchestration_agent")
@@ -84,12 +262,122 @@ def rag_app_builder():
 
     # Edges
     workflow.add_edge("pdf_handler", "llm_summary_handler")
-    workflow.add_edge("weather_handler", "llm_summary_handler")
+    # Templated weather answers skip the summary
+    workflow.add_conditional_edges(
+        "weather_handler",
+        lambda state: "done" if state.final_answer else "summarize",
+        {
+            "done": END,
+            "summarize": "llm_summary_handler",
+        },
+    )
     workflow.add_edge("llm_summary_handler", END)
 
     return workflow.compile()
 
 
+_rag_app = None
+_rag_app_lock = threading.Lock()
+
+
+def get_rag_app():
+    """Return the compiled workflow, compiling it on first use."""
+    global _rag_app
+    if _rag_app is None:
+        with _rag_app_lock:
+            if _rag_app is None:
+                _rag_app = rag_app_builder()
+    return _rag_app
+
+
+def _warm_up_retrieval():
+    get_retrieval_backend().warm_up()
+
+
+def warm_up(freeze: bool = False):
+    """
+    Pre-build everything the first request would otherwise construct:
+    the compiled graph, the shared LLM/embedding clients, the prompt chains
+    and the retrieval backend's SDKs or index files.
+    With ``freeze`` (only before the process takes traffic), also move what
+    was loaded out of the garbage collector's way.
+    Failures are reported and left for the first request to surface.
+    """
+    get_rag_app()
+    for step in (get_orchestration_chain, get_summary_chain, get_embedding_client, _warm_up_retrieval):
+        try:
+            step()
+        except Exception as e:
+            logger.warning("event=warm_up_failed step=%s error=%r", step.__name__, e)
+    if freeze:
+        # The lazily imported SDKs leave a large heap behind; without this the next
+        # full collection (~100 ms, blocking the event loop) lands on live requests.
+        # The collection itself blocks too, hence not while requests are served.
+        gc.collect()
+        gc.freeze()
+
+
+def _final_output(state: Dict[str, Any]):
+    return {
+        "summary": state.get("final_answer", "No summary found."),
+        "metadata": state.get("metadata", [])
+    }
+
+
+# ============================================================
+# Answer cache
+# ============================================================
+def _cacheable(state: Dict[str, Any]):
+    # Never cache failures; they may be transient
+    answer = state.get("final_answer")
+    if not answer or answer in (NO_RESULTS["summary"], SUMMARY_ERROR):
+        return False
+    return not any(is_weather_error(c) for c in state.get("retrieved_chunks") or [])
+
+
+def _wants_similarity(query: str):
+    # Only PDF answers are matched by similarity, so weather queries skip the embedding
+    return fast_route(query)["data_type"] == "pdf"
+
+
+def _cached_answer(query: str):
+    """Return (cached output or None, query embedding or None)."""
+    if answer_cache is None:
+        return None, None
+    output = answer_cache.get(query)
+    if output is not None or not _wants_similarity(query):
+        return output, None
+    try:
+        vector = get_embedding(query)
+    except Exception as e:
+        logger.warning("event=answer_cache_embedding_failed error=%r", e)
+        return None, None
+    return answer_cache.get_similar(vector, query), vector
+
+
+async def _acached_answer(query: str):
+    """Async variant of _cached_answer."""
+    if answer_cache is None:
+        return None, None
+    output = answer_cache.get(query)
+    if output is not None or not _wants_similarity(query):
+        return output, None
+    try:
+        vector = await aget_embedding(query)
+    except Exception as e:
+        logger.warning("event=answer_cache_embedding_failed error=%r", e)
+        return None, None
+    return answer_cache.get_similar(vector, query), vector
+
+
+def _store_answer(query: str, state: Dict[str, Any], output, vector):
+    if answer_cache is not None and _cacheable(state):
+        answer_cache.put(query, output, state.get("data_type"), vector)
+
+
+# Concurrent identical queries share one pipeline run
+pipeline_flight = SingleFlight("pipeline")
+
 
 def rag_agent_orchestrator(query: str):
     """
@@ -99,28 +387,295 @@ def rag_agent_orchestrator(query: str):
         - Finance (PDF) queries
     """
 
-    print("🚀 [rag_agent_orchestrator] Starting RAG/Weather workflow")
+    logger.info("event=query_started mode=sync")
 
-    # Build workflow
-    app = rag_app_builder()
+    cached, vector = _cached_answer(query)
+    if cached is not None:
+        logger.info("event=query_cached mode=sync")
+        return cached
 
-    # Initial state
-    initial_state = {
-        "query": query
-    }
+    def run():
+        # Compiled once per process
+        app = get_rag_app()
 
-    print("🟦 Initial State:", initial_state)
+        # Initial state
+        initial_state = _run_input(query)
 
-    # Run graph
-    state = app.invoke(initial_state)
+        logger.debug("event=initial_state state=%s", initial_state)
 
-    print("📦 Final State After Pipeline:", state)
+        # Run graph
+        try:
+            state = app.invoke(initial_state)
+        finally:
+            _drop_speculation(initial_state["speculation_id"])
 
-    final_output = {
-        "summary": state.get("final_answer", "No summary found."),
-        "metadata": state.get("metadata", [])
-    }
+        logger.debug("event=final_state state=%s", state)
 
-    print("✅ Final Output:", final_output)
+        final_output = _final_output(state)
+        _store_answer(query, state, final_output, vector)
+        return final_output
+
+    # Each caller gets its own copy of the shared result
+    final_output = dict(pipeline_flight.do(normalize_query(query), run))
+
+    logger.debug("event=final_output output=%s", final_output)
 
     return final_output
+
+
+# ============================================================
+# Streaming
+# ============================================================
+STREAM_MODES = ["updates", "messages"]
+
+
+def _stream_events(mode, chunk, final):
+    """
+    Translate one LangGraph stream item into client-facing events.
+    The route, retrieved chunks and summary are stashed in ``final`` for
+    the "done" event and the answer cache.
+    """
+    if mode == "messages":
+        message, meta = chunk
+        if meta.get("langgraph_node") == "llm_summary_handler" and message.content:
+            yield {"event": "token", "text": message.content}
+        return
+
+    for node, update in chunk.items():
+        update = update or {}
+        if node == "orchestration_agent":
+            final["data_type"] = update.get("data_type")
+            yield {
+                "event": "route",
+                "data_type": update.get("data_type"),
+                "city": update.get("city"),
+                "route_stage": update.get("route_stage"),
+            }
+        elif node in ("pdf_handler", "weather_handler"):
+            chunks = update.get("retrieved_chunks") or []
+            final["retrieved_chunks"] = chunks
+            yield {
+                "event": "retrieval",
+                "node": node,
+                "chunks": len(chunks),
+                "sources": sorted({c.get("file_name") or "unknown" for c in chunks}),
+            }
+            if update.get("final_answer"):
+                # Templated answer: no summary tokens will follow
+                final.update(final_answer=update["final_answer"], metadata=update.get("metadata", []))
+                yield {"event": "token", "text": update["final_answer"]}
+        elif node == "llm_summary_handler":
+            final.update(update)
+
+
+def _done_event(output, cached=False):
+    return {"event": "done", **output, "cached": cached}
+
+
+def stream_rag_agent_orchestrator(query: str):
+    """
+    Run the workflow and yield events as they happen:
+    route -> retrieval -> token* -> done.
+    A cached answer is a single "done" event with cached=True.
+    """
+    cached, vector = _cached_answer(query)
+    if cached is not None:
+        yield _done_event(cached, cached=True)
+        return
+
+    final, run_input = {}, _run_input(query)
+    try:
+        for mode, chunk in get_rag_app().stream(run_input, stream_mode=STREAM_MODES):
+            yield from _stream_events(mode, chunk, final)
+    finally:
+        # Also runs when the client disconnects and the generator is closed
+        _drop_speculation(run_input["speculation_id"])
+    output = _final_output(final)
+    _store_answer(query, final, output, vector)
+    yield _done_event(output)
+
+
+async def astream_rag_agent_orchestrator(query: str):
+    """Async variant of stream_rag_agent_orchestrator."""
+    cached, vector = await _acached_answer(query)
+    if cached is not None:
+        yield _done_event(cached, cached=True)
+        return
+
+    final, run_input = {}, _run_input(query)
+    try:
+        async for mode, chunk in get_rag_app().astream(run_input, stream_mode=STREAM_MODES):
+            for event in _stream_events(mode, chunk, final):
+                yield event
+    finally:
+        _drop_speculation(run_input["speculation_id"])
+    output = _final_output(final)
+    _store_answer(query, final, output, vector)
+    yield _done_event(output)
+
+
+async def arag_agent_orchestrator(query: str):
+    """
+    Async orchestrator: same graph as rag_agent_orchestrator, but every
+    node awaits its upstream calls so the event loop stays free.
+    """
+
+    logger.info("event=query_started mode=async")
+
+    cached, vector = await _acached_answer(query)
+    if cached is not None:
+        logger.info("event=query_cached mode=async")
+        return cached
+
+    async def run():
+        run_input = _run_input(query)
+        try:
+            state = await get_rag_app().ainvoke(run_input)
+        finally:
+            _drop_speculation(run_input["speculation_id"])
+        final_output = _final_output(state)
+        _store_answer(query, state, final_output, vector)
+        return final_output
+
+    final_output = dict(await pipeline_flight.ado(normalize_query(query), run))
+
+    logger.debug("event=final_output output=%s", final_output)
+
+    return final_output
+
+
+# ============================================================
+# Batch
+# ============================================================
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+
+
+async def _abatch_answer(query: str, route: Dict[str, Any], vector, semaphore):
+    """Retrieve and summarize one already-routed query of a batch."""
+    async with semaphore:
+        state = RAGState(query=query, **route)
+        if state.data_type == "weather":
+            update = await aweather_handler(state)
+        else:
+            update = {"retrieved_chunks": await ahybrid_search_logic(query, embedding_vector=vector)}
+        state = state.model_copy(update=update)
+        if not state.final_answer:
+            state = state.model_copy(update=await allm_summary_handler(state))
+
+    final = state.model_dump()
+    output = _final_output(final)
+    _store_answer(query, final, output, vector)
+    return output
+
+
+async def abatch_rag_agent_orchestrator(queries, max_concurrency: int = None, ordered: bool = True):
+    """
+    Answer many queries with shared upstream work:
+    cached answers are served first, all other queries are routed
+    concurrently, every PDF query is embedded in one batched embeddings
+    call, and searches/summaries run under a ``max_concurrency`` limit.
+
+    Yields {"index", "query", "result"} (or "error") per query, in input
+    order when ``ordered``, otherwise as each one completes.
+    """
+    queries = list(queries)
+    semaphore = asyncio.Semaphore(max_concurrency or BATCH_MAX_CONCURRENCY)
+    logger.info("event=batch_started queries=%d", len(queries))
+
+    results = {}
+    for i, query in enumerate(queries):
+        cached = answer_cache.get(query) if answer_cache is not None else None
+        if cached is not None:
+            results[i] = cached
+    pending = [i for i in range(len(queries)) if i not in results]
+
+    # Step 1: route everything together
+    async def route(query):
+        async with semaphore:
+            return await aorchestration_logic(query)
+
+    routes = dict(zip(pending, await asyncio.gather(*(route(queries[i]) for i in pending),
+                                                    return_exceptions=True)))
+
+    # Step 2: one batched embeddings call for every PDF query
+    pdf = [i for i in pending
+           if not isinstance(routes[i], BaseException) and routes[i].get("data_type") != "weather"]
+    vectors = {}
+    if pdf:
+        try:
+            vectors = dict(zip(pdf, await aembed_texts([queries[i] for i in pdf])))
+        except Exception as e:
+            logger.warning("event=batch_embedding_failed fallback=per_query error=%r", e)
+    if answer_cache is not None:
+        for i in pdf:
+            cached = answer_cache.get_similar(vectors.get(i), queries[i])
+            if cached is not None:
+                results[i] = cached
+
+    # Step 3: retrieval + summary under the concurrency limit
+    async def answer(i):
+        if i in results:
+            return {"index": i, "query": queries[i], "result": results[i]}
+        try:
+            if isinstance(routes[i], BaseException):
+                raise routes[i]
+            output = await _abatch_answer(queries[i], routes[i], vectors.get(i), semaphore)
+            return {"index": i, "query": queries[i], "result": output}
+        except Exception as e:
+            logger.error("event=batch_query_failed index=%d error=%r", i, e)
+            return {"index": i, "query": queries[i], "error": str(e)}
+
+    tasks = [asyncio.ensure_future(answer(i)) for i in range(len(queries))]
+    try:
+        if ordered:
+            for task in tasks:
+                yield await task
+        else:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def batch_rag_agent_orchestrator(queries, max_concurrency: int = None):
+    """Sync wrapper of abatch_rag_agent_orchestrator; returns the items in input order."""
+    async def collect():
+        return [item async for item in abatch_rag_agent_orchestrator(queries, max_concurrency)]
+
+    return asyncio.run(collect())
+
+
+# ============================================================
+# Metrics
+# ============================================================
+@register_collector
+def collect_pipeline_stats():
+    """Cache, router and coalescing counters, read at scrape time."""
+    families = []
+    hit_rates = []
+    if embedding_cache is not None:
+        stats = embedding_cache.stats()
+        hit_rates.append(({"cache": "embedding"}, stats["hit_rate"]))
+        families.append(("rag_embedding_cache_lookups_total", "counter", "Embedding cache lookups by result.",
+                         [({"result": r}, stats[r]) for r in ("memory_hits", "disk_hits", "misses")]))
+    if answer_cache is not None:
+        stats = answer_cache.stats()
+        hit_rates.append(({"cache": "answer"}, stats["hit_rate"]))
+        families.append(("rag_answer_cache_lookups_total", "counter", "Answer cache lookups by result.",
+                         [({"result": r}, stats[r]) for r in ("exact_hits", "semantic_hits", "misses")]))
+        families.append(("rag_answer_cache_entries", "gauge", "Answers currently cached.",
+                         [({}, stats["entries"])]))
+
+    routes = get_route_stats()
+    hit_rates.append(({"cache": "router_rules"}, routes.pop("hit_rate")))
+    families.append(("rag_cache_hit_ratio", "gauge", "Hit rate since start, per cache.", hit_rates))
+    families.append(("rag_route_decisions_total", "counter", "Routing decisions by stage.",
+                     [({"stage": stage}, count) for stage, count in routes.items()]))
+
+    flights = get_single_flight_stats()
+    families.append(("rag_single_flight_calls_total", "counter", "Calls entering a coalescing group.",
+                     [({"group": name}, s["calls"]) for name, s in flights.items()]))
+    families.append(("rag_single_flight_saved_total", "counter", "Calls served by another caller's execution.",
+                     [({"group": name}, s["saved"]) for name, s in flights.items()]))
+    return families
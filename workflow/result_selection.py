@@ -0,0 +1,102 @@
+"""
+Adaptive top-k selection over scored retrieval candidates.
+
+The backend returns up to RETRIEVAL_CANDIDATES chunks with a "score".
+Candidates are cut where the score falls below a fraction of the best
+one or drops sharply from its predecessor, then picked by maximal
+marginal relevance so near-duplicate chunks don't fill the context.
+How many are kept depends on how broad the query looks.
+"""
+import os
+import re
+from typing import Dict, List
+
+from utilities.bm25_index import tokenize
+from utilities.metrics import get_logger
+
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_MIN_K = int(os.getenv("RETRIEVAL_MIN_K", "2"))
+RETRIEVAL_MAX_K = int(os.getenv("RETRIEVAL_MAX_K", "8"))
+# Keep candidates scoring at least this fraction of the best one
+RETRIEVAL_MIN_SCORE_RATIO = float(os.getenv("RETRIEVAL_MIN_SCORE_RATIO", "0.5"))
+# Past RETRIEVAL_MIN_K, stop at a drop of more than this fraction from the previous score
+RETRIEVAL_SCORE_GAP = float(os.getenv("RETRIEVAL_SCORE_GAP", "0.3"))
+# MMR trade-off: 1.0 is pure relevance, 0.0 pure diversity
+MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+# Comparison, overview and explanation cues. Plain conjunctions ("and", "all")
+# are left out: nearly every question has one, which would push all queries to MAX_K.
+BROAD_QUERY_PATTERN = re.compile(
+    r"\b(compare|comparison|versus|vs\.?|trend|between|over time|breakdown|each|list|"
+    r"explain|why|how did|impact|overview|summar(?:y|ise|ize))\b",
+    re.IGNORECASE,
+)
+
+logger = get_logger("result_selection")
+
+
+def query_k(query: str) -> int:
+    """How many chunks a query deserves: short lookups few, broad questions more."""
+    terms = tokenize(query)
+    broad = len(BROAD_QUERY_PATTERN.findall(query))
+    k = RETRIEVAL_MIN_K + len(terms) // 4 + 2 * broad
+    return max(RETRIEVAL_MIN_K, min(RETRIEVAL_MAX_K, k))
+
+
+def cut_by_score(chunks: List[Dict], min_keep: int = None) -> List[Dict]:
+    """Drop the tail below the score-ratio threshold or after the first large gap."""
+    min_keep = RETRIEVAL_MIN_K if min_keep is None else min_keep
+    ranked = sorted(chunks, key=lambda c: c.get("score") or 0.0, reverse=True)
+    if not ranked or ranked[0].get("score") is None:
+        return ranked
+
+    best = ranked[0]["score"]
+    kept = ranked[:1]
+    for previous, chunk in zip(ranked, ranked[1:]):
+        score = chunk.get("score") or 0.0
+        if len(kept) >= min_keep:
+            if best > 0 and score < best * RETRIEVAL_MIN_SCORE_RATIO:
+                break
+            if previous["score"] > 0 and (previous["score"] - score) / previous["score"] > RETRIEVAL_SCORE_GAP:
+                break
+        kept.append(chunk)
+    return kept
+
+
+def _similarity(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def mmr_select(chunks: List[Dict], k: int, lambda_: float = None) -> List[Dict]:
+    """
+    Maximal marginal relevance over token-set (Jaccard) similarity of the
+    chunk texts; relevance is the score normalized to the best candidate.
+    """
+    lambda_ = MMR_LAMBDA if lambda_ is None else lambda_
+    if len(chunks) <= 1 or k <= 0:
+        return chunks[:k]
+
+    best = max((c.get("score") or 0.0) for c in chunks) or 1.0
+    relevance = [(c.get("score") or 0.0) / best for c in chunks]
+    terms = [set(tokenize(c.get("content") or "")) for c in chunks]
+
+    selected, remaining = [], list(range(len(chunks)))
+    while remaining and len(selected) < k:
+        def marginal(i):
+            redundancy = max((_similarity(terms[i], terms[j]) for j in selected), default=0.0)
+            return lambda_ * relevance[i] - (1 - lambda_) * redundancy
+
+        choice = max(remaining, key=marginal)
+        selected.append(choice)
+        remaining.remove(choice)
+    return [chunks[i] for i in selected]
+
+
+def select_chunks(query: str, chunks: List[Dict], k: int = None) -> List[Dict]:
+    """Score cut, then MMR down to the query's k. Results stay in selection order."""
+    k = k or query_k(query)
+    kept = cut_by_score(chunks, min_keep=min(RETRIEVAL_MIN_K, k))
+    selected = mmr_select(kept, k)
+    logger.debug("event=chunks_selected k=%d candidates=%d above_cut=%d selected=%d",
+                 k, len(chunks), len(kept), len(selected))
+    return selected
@@ -0,0 +1,195 @@
+"""
+Retrieval backends behind hybrid_search_logic.
+
+A backend takes the query text and its embedding and returns chunk
+dicts ({chunk_id, file_name, content, file_path, page_start, page_end,
+chunk_index, score}), best first; higher scores are more relevant.
+Pick one with RETRIEVAL_BACKEND:
+
+- "azure" (default): Azure AI Search hybrid (keyword + vector) query.
+- "local": the memory-mapped LocalVectorStore fused with its BM25
+  keyword index by reciprocal-rank fusion, no network round trip.
+"""
+import asyncio
+import os
+import threading
+from typing import Any, Dict, List
+
+from utilities.bm25_index import BM25Index, reciprocal_rank_fusion
+from utilities.index_generation import current_index_generation
+from utilities.search_client import get_search_client, get_async_search_client
+from utilities.vector_store import LocalVectorStore
+
+RETRIEVAL_BACKEND = os.getenv("RETRIEVAL_BACKEND", "azure")
+
+# Local hybrid fusion: weight_i / (RRF_K + rank_i) summed over the vector and keyword rankings
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "1.0"))
+HYBRID_KEYWORD_WEIGHT = float(os.getenv("HYBRID_KEYWORD_WEIGHT", "1.0"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+RRF_CANDIDATES = int(os.getenv("RRF_CANDIDATES", "50"))
+
+# Sub-directory of the local store holding the BM25 index
+KEYWORD_INDEX_DIR = "bm25"
+
+SELECT_FIELDS = ["chunk_id", "file_name", "chunk_text", "file_path", "page_start", "page_end", "chunk_index"]
+
+
+def _to_chunk(r, score=None) -> Dict[str, Any]:
+    return {
+        "chunk_id": r.get("chunk_id"),
+        "file_name": r.get("file_name"),
+        "content": r.get("chunk_text"),
+        "file_path": r.get("file_path"),
+        "page_start": r.get("page_start"),
+        "page_end": r.get("page_end"),
+        "chunk_index": r.get("chunk_index"),
+        "score": r.get("@search.score") if score is None else score,
+    }
+
+
+class RetrievalBackend:
+    """Interface: ``search`` and ``asearch`` return the top chunks for a query."""
+
+    name = "base"
+
+    def search(self, query: str, vector: List[float], top: int = 20) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    async def asearch(self, query: str, vector: List[float], top: int = 20) -> List[Dict[str, Any]]:
+        return self.search(query, vector, top)
+
+    def warm_up(self):
+        """Load whatever the first search would otherwise pay for (SDKs, index files)."""
+
+
+# ============================================================
+# Azure AI Search
+# ============================================================
+class AzureSearchBackend(RetrievalBackend):
+    name = "azure"
+
+    @staticmethod
+    def _vector_query(vector, top):
+        from azure.search.documents.models import VectorizedQuery
+        return VectorizedQuery(
+            vector=vector,
+            k_nearest_neighbors=max(top, 20),
+            fields="embedding"
+        )
+
+    def warm_up(self):
+        # Importing the async SDK and the query models takes ~0.3 s. The client
+        # itself is bound to its event loop, so build a throwaway one off-loop.
+        self._vector_query([0.0], 1)
+        get_async_search_client.__wrapped__()
+
+    def search(self, query, vector, top=20):
+        results = get_search_client().search(
+            search_text=query,                               # keyword part
+            vector_queries=[self._vector_query(vector, top)],  # semantic part
+            top=top,
+            select=SELECT_FIELDS
+        )
+        return [_to_chunk(r) for r in results]
+
+    async def asearch(self, query, vector, top=20):
+        results = await get_async_search_client().search(
+            search_text=query,
+            vector_queries=[self._vector_query(vector, top)],
+            top=top,
+            select=SELECT_FIELDS
+        )
+        return [_to_chunk(r) async for r in results]
+
+
+# ============================================================
+# Embedded vector store
+# ============================================================
+def write_keyword_index(directory, chunks):
+    """LocalVectorStore.save hook: build the BM25 index over the chunk texts next to the vectors."""
+    BM25Index.build([c.get("chunk_text") or "" for c in chunks]).save(os.path.join(directory, KEYWORD_INDEX_DIR))
+
+
+class LocalVectorBackend(RetrievalBackend):
+    """
+    Local hybrid search: cosine top-k on the vector store fused with BM25
+    by weighted reciprocal-rank fusion. Falls back to vectors only when
+    the store has no keyword index. Reloads after each ingestion run.
+    """
+
+    name = "local"
+
+    def __init__(self, store: LocalVectorStore = None, vector_weight: float = None,
+                 keyword_weight: float = None, rrf_k: int = None, candidates: int = None):
+        # (store, keyword index) from one snapshot, replaced as a whole on reload
+        self._snapshot = (store if store is not None else LocalVectorStore(), None)
+        self.vector_weight = HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight
+        self.keyword_weight = HYBRID_KEYWORD_WEIGHT if keyword_weight is None else keyword_weight
+        self.rrf_k = rrf_k or RRF_K
+        self.candidates = candidates or RRF_CANDIDATES
+        self._generation = None
+        self._lock = threading.Lock()
+
+    @property
+    def store(self) -> LocalVectorStore:
+        return self._snapshot[0]
+
+    @property
+    def keyword_index(self):
+        return self._snapshot[1]
+
+    def _refresh(self):
+        generation = current_index_generation()
+        if generation != self._generation:
+            with self._lock:
+                if generation != self._generation:
+                    # Load into fresh objects and swap them in with one assignment:
+                    # searches already running keep the vectors and chunks they started with
+                    current = self.store
+                    store = LocalVectorStore(path=current.path, dtype=current.dtype).load()
+                    keyword_index = BM25Index.load(os.path.join(store.path, KEYWORD_INDEX_DIR))
+                    # A keyword index from another snapshot would point at the wrong rows
+                    if keyword_index is not None and len(keyword_index) != len(store.chunks):
+                        keyword_index = None
+                    self._snapshot = (store, keyword_index)
+                    self._generation = generation
+
+    def warm_up(self):
+        self._refresh()
+
+    def search(self, query, vector, top=20):
+        self._refresh()
+        store, keyword_index = self._snapshot
+        if keyword_index is None or not self.keyword_weight:
+            return [_to_chunk(meta, score) for score, meta in store.search(vector, top)]
+
+        vector_rows, _ = store.top_rows(vector, max(top, self.candidates))
+        keyword_rows, _ = keyword_index.top(query, max(top, self.candidates))
+        fused = reciprocal_rank_fusion(
+            [vector_rows.tolist(), keyword_rows.tolist()],
+            weights=[self.vector_weight, self.keyword_weight],
+            k=self.rrf_k,
+        )
+        return [_to_chunk(store.chunks[row], score) for row, score in fused[:top]]
+
+    async def asearch(self, query, vector, top=20):
+        # Reloads, the NumPy scan and BM25 scoring are blocking work; keep them off the loop
+        return await asyncio.to_thread(self.search, query, vector, top)
+
+
+BACKENDS = {
+    "azure": AzureSearchBackend,
+    "local": LocalVectorBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_retrieval_backend(name: str = None) -> RetrievalBackend:
+    """Return the shared backend instance by name (default: RETRIEVAL_BACKEND)."""
+    name = name or RETRIEVAL_BACKEND
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = BACKENDS[name]()
+        return _backends[name]
@@ -1,70 +1,101 @@
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery, QueryType
 from typing import List, Dict, Any
-from utilities.create_llm_client import get_embedding
-from utilities.search_client import get_search_client
-from azure.search.documents.models import VectorizedQuery
+from utilities.create_llm_client import get_embedding, aget_embedding
+from workflow.retrieval_backends import get_retrieval_backend
+from workflow.result_selection import RETRIEVAL_CANDIDATES, select_chunks
+from utilities.embedding_cache import normalize_text
+from utilities.single_flight import SingleFlight
+from utilities.metrics import get_logger, upstream_timer
 
+logger = get_logger("search")
 
-def hybrid_search_logic(query: str) -> List[Dict[str, Any]]:
+# Identical queries searched concurrently share one backend call
+search_flight = SingleFlight("search")
+
+
+@upstream_timer("search")
+def _search(backend, query: str, vector: List[float]):
+    return backend.search(query, vector, top=RETRIEVAL_CANDIDATES)
+
+
+@upstream_timer("search")
+async def _asearch(backend, query: str, vector: List[float]):
+    return await backend.asearch(query, vector, top=RETRIEVAL_CANDIDATES)
+
+
+def hybrid_search_logic(query: str, embedding_vector: List[float] = None) -> List[Dict[str, Any]]:
     """
-    Perform hybrid (vector + keyword) search on Azure AI Search
-    for the simplified index that contains only:
+    Perform hybrid (vector + keyword) search on the configured retrieval
+    backend (Azure AI Search or the local vector store) for the
+    simplified index that contains only:
     - chunk_id
     - file_name
     - content
     - file_path
+    Pass ``embedding_vector`` when the query was already embedded (e.g. in a batch).
     """
 
-    print(f"🔹 [hybrid_search_logic] Running hybrid search for query: '{query}'")
+    logger.debug("event=search_started query=%r", query)
 
     # ============================================================
     # Step 1: Embed the query
     # ============================================================
     try:
-        embedding_vector = get_embedding(query)
+        if embedding_vector is None:
+            embedding_vector = get_embedding(query)
     except Exception as e:
-        print(f"⚠️ [hybrid_search_logic] Embedding failed: {e}")
+        logger.warning("event=embedding_failed error=%r", e)
         return []
 
     # ============================================================
-    # Step 2: Create vectorized query
+    # Step 2: Execute search on the backend
     # ============================================================
-    vector_query = VectorizedQuery(
-        vector=embedding_vector,
-        k_nearest_neighbors=20,
-        fields="embedding"
-    )
-
-    # ============================================================
-    # Step 3: Execute hybrid search (vector + keyword)
-    # ============================================================
-    search_client = get_search_client()
+    backend = get_retrieval_backend()
 
     try:
-        results = search_client.search(
-            search_text=query,           # keyword part
-            vector_queries=[vector_query],  # semantic part
-            top=5,
-            select=["chunk_id", "file_name", "chunk_text", "file_path"]
+        candidates = search_flight.do(
+            (backend.name, normalize_text(query)),
+            lambda: _search(backend, query, embedding_vector),
         )
     except Exception as e:
-        print(f"❌ [hybrid_search_logic] Search failed: {e}")
+        logger.error("event=search_failed backend=%s error=%r", backend.name, e)
         return []
 
     # ============================================================
-    # Step 4: Collect top chunks
+    # Step 3: Adaptive top-k (score cut + MMR)
     # ============================================================
-    chunks = []
-    for r in results:
-        chunks.append({
-            "chunk_id": r.get("chunk_id"),
-            "file_name": r.get("file_name"),
-            "content": r.get("chunk_text"),
-            "file_path": r.get("file_path"),
-        })
-
-    print(f"✅ [hybrid_search_logic] Retrieved {len(chunks)} chunks")
+    chunks = select_chunks(query, candidates)
+
+    logger.info("event=search_done backend=%s candidates=%d chunks=%d", backend.name, len(candidates), len(chunks))
     return chunks
 
 
+async def ahybrid_search_logic(query: str, embedding_vector: List[float] = None) -> List[Dict[str, Any]]:
+    """
+    Async variant of hybrid_search_logic using the async embeddings
+    client and the backend's async search.
+    """
+
+    logger.debug("event=search_started query=%r", query)
+
+    try:
+        if embedding_vector is None:
+            embedding_vector = await aget_embedding(query)
+    except Exception as e:
+        logger.warning("event=embedding_failed error=%r", e)
+        return []
+
+    backend = get_retrieval_backend()
+
+    try:
+        candidates = await search_flight.ado(
+            (backend.name, normalize_text(query)),
+            lambda: _asearch(backend, query, embedding_vector),
+        )
+    except Exception as e:
+        logger.error("event=search_failed backend=%s error=%r", backend.name, e)
+        return []
+
+    chunks = select_chunks(query, candidates)
+
+    logger.info("event=search_done backend=%s candidates=%d chunks=%d", backend.name, len(candidates), len(chunks))
+    return chunks
@@ -11,6 +11,8 @@ class RAGState(BaseModel):
     query: str = ""
     data_type: Optional[str] = None      # REQUIRED
     city: Optional[str] = None
+    route_stage: Optional[str] = None    # "rules" or "llm"
+    speculation_id: Optional[str] = None # in-flight speculative search, see rag_workflow
     retrieved_chunks: Optional[list] = None
     final_answer: Optional[str] = None
     metadata: Optional[list] = None
@@ -2,11 +2,90 @@ from typing import List
 from langchain_core.prompts import PromptTemplate
 
 from langchain_core.output_parsers import StrOutputParser
-from utilities.create_llm_client import create_llm_client 
+from functools import lru_cache
+from utilities.create_llm_client import create_llm_client
+from workflow.context_packer import pack_context
+from utilities.metrics import get_logger
+
+logger = get_logger("summary")
+
+SUMMARY_PROMPT = """
+You are a helpful AI assistant who summarizes information only from the provided context.
+
+**Your Task:**
+1. Read all document chunks.
+2. Combine the information to answer the query.
+3. Keep the answer factual, concise (150–250 words), and well structured.
+
+**User Query:** {query}
+
+**Context:**
+{context}
+
+**Rules:**
+- Do NOT use external knowledge.
+- If the context is insufficient, explicitly say so.
+"""
+
+
+@lru_cache(maxsize=None)
+def get_summary_chain():
+    """Build the summarization chain once and reuse it."""
+    prompt = PromptTemplate.from_template(SUMMARY_PROMPT)
+    return prompt | create_llm_client() | StrOutputParser()
+
 
 # ============================================================
 # LLM Summary Logic
 # ============================================================
+def source_metadata(chunks: List[dict]):
+    """One entry per source file: first chunk id, path and the pages covered."""
+    by_file = {}
+
+    for chunk in chunks:
+        fname = chunk.get("file_name", "unknown")
+        if fname not in by_file:
+            by_file[fname] = {
+                "chunk_id": chunk.get("chunk_id", ""),
+                "file_name": fname,
+                "file_path": chunk.get("file_path", ""),
+                "pages": set(),
+            }
+        start, end = chunk.get("page_start"), chunk.get("page_end")
+        if start is not None:
+            by_file[fname]["pages"].update(range(start, (end or start) + 1))
+
+    metadata = []
+    for entry in by_file.values():
+        entry["pages"] = sorted(entry["pages"])
+        metadata.append(entry)
+
+    return metadata
+
+
+def _prepare_summary_inputs(chunks: List[dict]):
+    """Build the prompt context and the de-duplicated source metadata."""
+
+    # ============================================================
+    # Step 1: Pack context from retrieved chunks within the token budget
+    # ============================================================
+    context, used_chunks, _ = pack_context(chunks)
+
+    # ============================================================
+    # Step 2: Build metadata for the chunks actually sent
+    # ============================================================
+    return context, source_metadata(used_chunks)
+
+
+NO_RESULTS = {
+    "summary": "No relevant information was found for your query.",
+    "metadata": []
+}
+
+
+SUMMARY_ERROR = "An error occurred during summarization."
+
+
 def summary_logic(chunks: List[dict], query: str = None):
     """
     Generate a summary using the retrieved chunks.
@@ -16,78 +95,60 @@ def summary_logic(chunks: List[dict], query: str = None):
     - SQL agent chunks
     """
 
-    print(f"[summary_handler] Summarizing {len(chunks)} chunks")
+    logger.debug("event=summary_started chunks=%d", len(chunks))
 
     if not chunks:
-        return {
-            "summary": "No relevant information was found for your query.",
-            "metadata": []
-        }
+        return dict(NO_RESULTS)
 
-    # ============================================================
-    # Step 1: Create LLM Client
-    # ============================================================
-    llm = create_llm_client()
+    context, metadata = _prepare_summary_inputs(chunks)
 
     # ============================================================
-    # Step 2: Build context from retrieved chunks
+    # Step 3: Shared prompt + LLM chain
     # ============================================================
-    context = "\n\n".join(
-        [f"Document {i+1}:\n{chunk.get('content', '')}" for i, chunk in enumerate(chunks)]
-    )
+    chain = get_summary_chain()
 
     # ============================================================
-    # Step 3: Build metadata
+    # Step 4: Execute summarization
     # ============================================================
-    seen = set()
-    metadata = []
+    try:
+        response = chain.invoke({
+            "query": query or "N/A",
+            "context": context
+        })
 
-    for chunk in chunks:
-        fname = chunk.get("file_name", "unknown")
-        if fname not in seen:
-            seen.add(fname)
-            metadata.append({
-                "chunk_id": chunk.get("chunk_id", ""),
-                "file_name": fname,
-                "file_path": chunk.get("file_path", ""),
-            })
+        logger.debug("event=summary_done")
 
-    # ============================================================
-    # Step 4: Define the prompt
-    # ============================================================
-    prompt = PromptTemplate.from_template("""
-You are a helpful AI assistant who summarizes information only from the provided context.
+        return {
+            "summary": response,
+            "metadata": metadata
+        }
 
-**Your Task:**
-1. Read all document chunks.
-2. Combine the information to answer the query.
-3. Keep the answer factual, concise (150–250 words), and well structured.
+    except Exception as e:
+        logger.error("event=summary_failed error=%r", e)
+        return {
+            "summary": SUMMARY_ERROR,
+            "metadata": metadata
+        }
 
-**User Query:** {query}
 
-**Context:**
-{context}
+async def asummary_logic(chunks: List[dict], query: str = None):
+    """Async variant of summary_logic (uses chain.ainvoke)."""
 
-**Rules:**
-- Do NOT use external knowledge.
-- If the context is insufficient, explicitly say so.
-""")
+    logger.debug("event=summary_started chunks=%d", len(chunks))
 
-    # ============================================================
-    # Step 5: Build chain
-    # ============================================================
-    chain = prompt | llm | StrOutputParser()
+    if not chunks:
+        return dict(NO_RESULTS)
+
+    context, metadata = _prepare_summary_inputs(chunks)
+    chain = get_summary_chain()
 
-    # ============================================================
-    # Step 6: Execute summarization
-    # ============================================================
     try:
-        response = chain.invoke({
+        response = await chain.ainvoke({
             "query": query or "N/A",
             "context": context
         })
 
-        print("✅ [summary_handler] Successfully generated summary.")
+        logger.debug("event=summary_done")
 
         return {
             "summary": response,
@@ -95,9 +156,8 @@ You are a helpful AI assistant who summarizes information only from the provided
         }
 
     except Exception as e:
-        print(f"❌ [summary_handler] LLM summarization failed: {e}")
+        logger.error("event=summary_failed error=%r", e)
         return {
-            "summary": "An error occurred during summarization.",
+            "summary": SUMMARY_ERROR,
             "metadata": metadata
         }
-
@@ -1,5 +1,186 @@
+import os
+import re
+import asyncio
+import threading
+import time
+
 import requests
+import httpx
 import uuid
+from requests.adapters import HTTPAdapter
+from utilities.loop_local import loop_local
+from utilities.metrics import CACHE_LOOKUPS, get_logger, upstream_timer
+from utilities.single_flight import SingleFlight
+
+WEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+WEATHER_CONNECT_TIMEOUT = float(os.getenv("WEATHER_CONNECT_TIMEOUT", "3"))
+WEATHER_READ_TIMEOUT = float(os.getenv("WEATHER_READ_TIMEOUT", "10"))
+WEATHER_TIMEOUT = httpx.Timeout(WEATHER_READ_TIMEOUT, connect=WEATHER_CONNECT_TIMEOUT)
+
+# OpenWeatherMap refreshes roughly every 10 minutes
+WEATHER_CACHE_TTL = float(os.getenv("WEATHER_CACHE_TTL", "300"))
+# Past the TTL, data up to this age is still served while a refresh runs
+WEATHER_STALE_TTL = float(os.getenv("WEATHER_STALE_TTL", "1800"))
+
+# Content prefixes of the chunk returned when a lookup fails
+WEATHER_ERROR_PREFIXES = ("Error fetching weather:", "Exception occurred:")
+
+# Plain lookups are answered from a template; set to 0 to always summarize with the LLM
+WEATHER_TEMPLATE_ANSWERS = os.getenv("WEATHER_TEMPLATE_ANSWERS", "1") != "0"
+
+# Questions that ask for advice, a judgement or more than current conditions
+WEATHER_REASONING_PATTERN = re.compile(
+    r"\b(umbrella|raincoat|jacket|coat|sweater|sunscreen|wear|carry|bring|pack|should|"
+    r"safe|good (?:day|time|idea)|ok(?:ay)? to|go out|outside|walk|run|jog|cycl(?:e|ing)|picnic|"
+    r"travel|fly|flight|drive|plan|recommend|advice|suggest|compare|better|worse|warmer|colder|"
+    r"why|tomorrow|tonight|later|weekend|week|forecasts?|"
+    r"will|won't|going to|gonna|expect(?:ed)?|next|upcoming|soon)\b",
+    re.IGNORECASE,
+)
+
+logger = get_logger("weather_api")
+
+
+class WeatherFetchError(Exception):
+    """OpenWeatherMap answered with a non-200 status."""
+
+
+def _weather_chunk(content: str, report: dict = None):
+    chunk = {
+        "chunk_id": str(uuid.uuid4()),
+        "file_name": "openweathermap",
+        "content": content,
+        "file_path": "",
+    }
+    if report is not None:
+        chunk["weather"] = report      # structured fields for render_weather_answer
+    return [chunk]
+
+
+def is_weather_error(chunk: dict) -> bool:
+    return (chunk.get("content") or "").startswith(WEATHER_ERROR_PREFIXES)
+
+
+def _weather_report(city: str, data: dict) -> dict:
+    return {
+        "city": city,
+        "condition": data["weather"][0]["description"],
+        "temperature": data["main"]["temp"],
+        "humidity": data["main"]["humidity"],
+    }
+
+
+def _format_weather(query: str, report: dict) -> str:
+    # Build the content
+    return (
+        f"Weather report for {report['city']}:\n"
+        f"- Condition: {report['condition']}\n"
+        f"- Temperature: {report['temperature']}°C\n"
+        f"- Humidity: {report['humidity']}%\n"
+        f"- User Query: {query}"
+    )
+
+
+def _params(city: str, api_key: str):
+    return {"q": city, "appid": api_key, "units": "metric"}
+
+
+# ============================================================
+# Per-city cache (shared by the sync and async paths)
+# ============================================================
+def normalize_city(city: str) -> str:
+    return " ".join((city or "").split()).casefold()
+
+
+class WeatherCache:
+    """Raw OpenWeatherMap payloads per normalized city, with fresh and stale ages."""
+
+    def __init__(self, ttl: float = None, stale_ttl: float = None, clock=time.monotonic):
+        self.ttl = WEATHER_CACHE_TTL if ttl is None else ttl
+        self.stale_ttl = WEATHER_STALE_TTL if stale_ttl is None else stale_ttl
+        self._clock = clock
+        self._entries = {}     # city key -> (payload, fetched_at)
+        self._lock = threading.Lock()
+
+    def lookup(self, key: str):
+        """Return (payload, is_fresh); (None, False) when missing or too old to serve."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            data, fetched_at = entry
+            age = self._clock() - fetched_at
+            if age >= max(self.stale_ttl, self.ttl):
+                del self._entries[key]
+                return None, False
+            return data, age < self.ttl
+
+    def store(self, key: str, data: dict):
+        with self._lock:
+            self._entries[key] = (data, self._clock())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+weather_cache = WeatherCache()
+
+# Concurrent lookups for one city share one upstream call
+weather_flight = SingleFlight("weather")
+
+
+# ============================================================
+# Sync client
+# ============================================================
+_session = requests.Session()
+_session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=32))
+
+
+@upstream_timer("weather")
+def _fetch_weather(city: str, api_key: str) -> dict:
+    resp = _session.get(WEATHER_URL, params=_params(city, api_key),
+                        timeout=(WEATHER_CONNECT_TIMEOUT, WEATHER_READ_TIMEOUT))
+    if resp.status_code != 200:
+        raise WeatherFetchError(resp.text)
+    return resp.json()
+
+
+def _single_flight(key: str, city: str, api_key: str) -> dict:
+    """Run one upstream call per city; concurrent callers wait for its result."""
+    def fetch_and_store():
+        data = _fetch_weather(city, api_key)
+        weather_cache.store(key, data)
+        return data
+
+    return weather_flight.do(key, fetch_and_store)
+
+
+def _refresh_in_background(key: str, city: str, api_key: str):
+    if weather_flight.in_flight(key):
+        return
+
+    def refresh():
+        try:
+            _single_flight(key, city, api_key)
+        except Exception as e:
+            logger.warning("event=weather_refresh_failed city=%s error=%r", city, e)
+
+    threading.Thread(target=refresh, daemon=True).start()
+
+
+def get_weather(city: str, api_key: str) -> dict:
+    """Cached OpenWeatherMap payload for a city (stale-while-revalidate)."""
+    key = normalize_city(city)
+    data, fresh = weather_cache.lookup(key)
+    CACHE_LOOKUPS.inc(cache="weather", result="miss" if data is None else "fresh" if fresh else "stale")
+    if data is not None:
+        if not fresh:
+            _refresh_in_background(key, city, api_key)
+        return data
+    return _single_flight(key, city, api_key)
+
 
 def weather_api(query: str, city: str, api_key: str):
     """
@@ -9,53 +190,105 @@ def weather_api(query: str, city: str, api_key: str):
     file_path = ""
     """
 
-    print("🌦️ [weather_api] Called")
+    logger.debug("event=weather_api_called city=%s", city)
 
-    url = (
-        f"http://api.openweathermap.org/data/2.5/weather"
-        f"?q={city}&appid={api_key}&units=metric"
-    )
+    try:
+        data = get_weather(city, api_key)
 
+        # Build chunks in your exact format
+        report = _weather_report(city, data)
+        chunks = _weather_chunk(_format_weather(query, report), report)
+
+        logger.debug("event=weather_retrieved chunks=%d", len(chunks))
+        return chunks
+
+    except WeatherFetchError as e:
+        return _weather_chunk(f"Error fetching weather: {e}")
+    except Exception as e:
+        return _weather_chunk(f"Exception occurred: {str(e)}")
+
+
+# ============================================================
+# Async client
+# ============================================================
+@loop_local
+def get_async_weather_client():
+    """Pooled httpx client shared by weather lookups on the current loop."""
+    return httpx.AsyncClient(timeout=WEATHER_TIMEOUT)
+
+
+@upstream_timer("weather")
+async def _afetch_and_store(key: str, city: str, api_key: str) -> dict:
     try:
-        resp = requests.get(url)
+        resp = await get_async_weather_client().get(WEATHER_URL, params=_params(city, api_key))
         if resp.status_code != 200:
-            return [{
-                "chunk_id": str(uuid.uuid4()),
-                "file_name": "openweathermap",
-                "content": f"Error fetching weather: {resp.text}",
-                "file_path": ""
-            }]
-
-        data = resp.json()
-
-        weather = data["weather"][0]["description"]
-        temp = data["main"]["temp"]
-        humidity = data["main"]["humidity"]
-
-        # Build the content
-        content = (
-            f"Weather report for {city}:\n"
-            f"- Condition: {weather}\n"
-            f"- Temperature: {temp}°C\n"
-            f"- Humidity: {humidity}%\n"
-            f"- User Query: {query}"
-        )
+            raise WeatherFetchError(resp.text)
+    except Exception as e:
+        # Logged once here; background refreshes have no caller to report to
+        logger.warning("event=weather_fetch_failed city=%s error=%r", city, e)
+        raise
+    data = resp.json()
+    weather_cache.store(key, data)
+    return data
 
-        # Build chunks in your exact format
-        chunks = [{
-            "chunk_id": str(uuid.uuid4()),
-            "file_name": "openweathermap",
-            "content": content,
-            "file_path": "",
-        }]
-
-        print(f"✅ [weather_api] Retrieved {len(chunks)} chunks")
+
+def _start_fetch(key: str, city: str, api_key: str) -> asyncio.Task:
+    return weather_flight.start(key, lambda: _afetch_and_store(key, city, api_key))
+
+
+async def aget_weather(city: str, api_key: str) -> dict:
+    """Async variant of get_weather; concurrent lookups share one request."""
+    key = normalize_city(city)
+    data, fresh = weather_cache.lookup(key)
+    CACHE_LOOKUPS.inc(cache="weather", result="miss" if data is None else "fresh" if fresh else "stale")
+    if data is not None:
+        if not fresh and not weather_flight.in_flight(key):
+            _start_fetch(key, city, api_key)
+        return data
+    # Shielded so one cancelled caller doesn't cancel the others' request
+    return await asyncio.shield(_start_fetch(key, city, api_key))
+
+
+async def aweather_api(query: str, city: str, api_key: str):
+    """Async variant of weather_api on a pooled httpx client."""
+
+    logger.debug("event=aweather_api_called city=%s", city)
+
+    try:
+        data = await aget_weather(city, api_key)
+
+        report = _weather_report(city, data)
+        chunks = _weather_chunk(_format_weather(query, report), report)
+
+        logger.debug("event=weather_retrieved chunks=%d", len(chunks))
         return chunks
 
+    except WeatherFetchError as e:
+        return _weather_chunk(f"Error fetching weather: {e}")
     except Exception as e:
-        return [{
-            "chunk_id": str(uuid.uuid4()),
-            "file_name": "openweathermap",
-            "content": f"Exception occurred: {str(e)}",
-            "file_path": ""
-        }]
+        return _weather_chunk(f"Exception occurred: {str(e)}")
+
+
+# ============================================================
+# Templated answers
+# ============================================================
+def needs_weather_reasoning(query: str) -> bool:
+    """Whether a weather question needs the LLM rather than a restatement of the numbers."""
+    return bool(WEATHER_REASONING_PATTERN.search(query or ""))
+
+
+def render_weather_answer(query: str, chunks) -> str:
+    """
+    Deterministic answer for a plain weather lookup, or None when the
+    question needs reasoning or the chunks carry no structured report
+    (failed lookups have none and are explained by the LLM).
+    """
+    if not WEATHER_TEMPLATE_ANSWERS or not chunks or needs_weather_reasoning(query):
+        return None
+    report = chunks[0].get("weather")
+    if not report:
+        return None
+    return (
+        f"Current weather in {report['city']}: {report['condition']}, "
+        f"{report['temperature']}°C with {report['humidity']}% humidity."
+    )